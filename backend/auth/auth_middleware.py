@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from auth.firebase import verify_firebase_token
+from auth.token_cache import verify_firebase_token_cached
 from database.user_model import record_user_login
 
 http_bearer = HTTPBearer(auto_error=False)
@@ -36,21 +36,21 @@ async def require_firebase_user(
             "picture": None
         }
         # We still try to record login, but user_model handles missing DB now
-        await record_user_login(mock_user)
+        record_user_login(mock_user)
         request.state.user = mock_user
         request.state.id_token = id_token
         return mock_user
     # ------------------------------
 
     try:
-        firebase_user = verify_firebase_token(id_token)
+        firebase_user = await verify_firebase_token_cached(id_token)
     except Exception as exc:  # firebase_admin raises several custom exceptions
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired Firebase ID token.",
         ) from exc
 
-    await record_user_login(firebase_user)
+    record_user_login(firebase_user)
 
     request.state.user = firebase_user
     request.state.id_token = id_token
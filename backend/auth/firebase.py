@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import firebase_admin
 from firebase_admin import auth as firebase_auth
@@ -43,9 +43,10 @@ def _initialize_app() -> firebase_admin.App:
     return firebase_admin.initialize_app(cred)
 
 
-def verify_firebase_token(id_token: str) -> Dict[str, Optional[str]]:
+def verify_firebase_token_with_expiry(id_token: str) -> Tuple[Dict[str, Optional[str]], int]:
     """
-    Verify the incoming Firebase ID token and return the normalized user info.
+    Verify the incoming Firebase ID token.
+    Returns the normalized user info and the token's `exp` (epoch seconds).
     """
     if not id_token:
         raise ValueError("Missing Firebase ID token")
@@ -53,10 +54,19 @@ def verify_firebase_token(id_token: str) -> Dict[str, Optional[str]]:
     app = _initialize_app()
     decoded = firebase_auth.verify_id_token(id_token, app=app)
 
-    return {
+    user = {
         "uid": decoded.get("uid"),
         "email": decoded.get("email"),
         "name": decoded.get("name") or decoded.get("displayName"),
         "picture": decoded.get("picture"),
     }
+    return user, int(decoded.get("exp", 0))
+
+
+def verify_firebase_token(id_token: str) -> Dict[str, Optional[str]]:
+    """
+    Verify the incoming Firebase ID token and return the normalized user info.
+    """
+    user, _ = verify_firebase_token_with_expiry(id_token)
+    return user
 
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from auth.firebase import verify_firebase_token_with_expiry
+from utils.metrics import token_verify_seconds
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long a verified token is trusted without re-verifying,
+# even if its own `exp` is further away.
+TOKEN_CACHE_MAX_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of decoded Firebase tokens keyed by SHA-256 of the raw token
+    (the token itself is never stored). Entries expire no later than the
+    token's own `exp`.
+    """
+
+    def __init__(self, max_entries: int, max_ttl: int):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Optional[str]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(id_token: str) -> str:
+        return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return user
+
+    def put(self, key: str, user: Dict[str, Optional[str]], exp: int):
+        expires_at = min(float(exp), time.time() + self.max_ttl)
+        if expires_at <= time.time():
+            return
+
+        self._entries[key] = (expires_at, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_MAX_TTL_SECONDS)
+
+
+async def verify_firebase_token_cached(id_token: str) -> Dict[str, Optional[str]]:
+    """
+    Return the user for a Firebase ID token, verifying it only on a cache miss.
+    Verification (signature check, possible cert fetch) runs on a worker thread.
+    """
+    start = time.perf_counter()
+    key = token_cache.key_for(id_token)
+    user = token_cache.get(key)
+    if user is not None:
+        token_cache.hits += 1
+        token_verify_seconds.observe(time.perf_counter() - start, result="cache_hit")
+        return dict(user)
+
+    token_cache.misses += 1
+    with token_verify_seconds.time(result="failed") as labels:
+        user, exp = await asyncio.to_thread(verify_firebase_token_with_expiry, id_token)
+        labels["result"] = "verified"
+    token_cache.put(key, user, exp)
+    return dict(user)
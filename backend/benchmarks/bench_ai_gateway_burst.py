@@ -0,0 +1,112 @@
+"""
+Burst benchmark for the AI gateway against a local fake model server.
+
+The fake server stands in for Gemini: every call takes LATENCY seconds and,
+like the real quota, it rejects calls with 429 (ResourceExhausted) once more
+than CAPACITY are in flight. A class of students then scans handouts at once:
+BURST uploads spread over DISTINCT images.
+
+"direct" calls the model once per upload with no limiter, coalescing or
+retry, the way detect_topic used to. "gateway" runs the real detect_topic
+through services/ai_gateway.
+
+Run from the backend directory:
+    python benchmarks/bench_ai_gateway_burst.py [burst] [distinct_images] [server_capacity]
+
+A server capacity below AI_MAX_CONCURRENCY_PER_MODEL exercises the 429 retry path.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import google.generativeai as genai  # noqa: E402
+from google.api_core.exceptions import ResourceExhausted  # noqa: E402
+
+from services import ai_detector, ai_gateway  # noqa: E402
+
+LATENCY = 0.3
+BURST = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DISTINCT = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+CAPACITY = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+
+class FakeModelServer:
+    def __init__(self):
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+
+    async def handle(self):
+        self.requests += 1
+        if self.in_flight >= CAPACITY:
+            self.rejected += 1
+            raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.in_flight -= 1
+        return _Response()
+
+
+class _Response:
+    text = '{"topic": "Projectile Motion", "variables": ["v0", "angle", "g"]}'
+
+
+server = FakeModelServer()
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, parts, **kwargs):
+        return await server.handle()
+
+
+async def direct_detect(image_path: str):
+    data = Path(image_path).read_bytes()
+    try:
+        await FakeGenerativeModel("gemini-2.0-flash").generate_content_async(["prompt", data])
+        return "Projectile Motion", []
+    except Exception:
+        return "Unknown", []
+
+
+async def run(label: str, detect, paths):
+    global server
+    server = FakeModelServer()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(detect(paths[i % len(paths)]) for i in range(BURST)))
+    elapsed = time.perf_counter() - start
+    unknown = sum(1 for result in results if result[0] == "Unknown")
+    print(
+        f"{label:<8} uploads={BURST} ok={BURST - unknown:<4} unknown={unknown:<4} "
+        f"model_requests={server.requests:<4} rejected_429={server.rejected:<4} "
+        f"elapsed={elapsed:5.2f}s goodput={(BURST - unknown) / elapsed:7.1f}/s"
+    )
+
+
+def main():
+    genai.GenerativeModel = FakeGenerativeModel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(DISTINCT):
+            path = Path(tmp) / f"handout{i}.png"
+            path.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes([i]) * 64 * 1024)
+            paths.append(str(path))
+
+        print(f"fake server: capacity={CAPACITY} latency={LATENCY}s, {DISTINCT} distinct images")
+        asyncio.run(run("direct", direct_detect, paths))
+        asyncio.run(run("gateway", ai_detector.detect_topic, paths))
+        print(f"gateway stats: {ai_gateway.gateway_stats}")
+
+
+if __name__ == "__main__":
+    main()
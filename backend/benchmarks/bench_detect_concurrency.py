@@ -0,0 +1,93 @@
+"""
+Load benchmark: concurrent `detect_topic` calls against a local stub model.
+
+The stub replaces `genai.GenerativeModel` so no network or API key is needed.
+Each call "takes" STUB_LATENCY seconds. If calls serialize on the event loop,
+total time grows linearly with the number of uploads; if they overlap it stays
+close to a single call.
+
+Run from the backend directory:
+    python benchmarks/bench_detect_concurrency.py [num_uploads]
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import google.generativeai as genai  # noqa: E402
+
+from services import ai_detector  # noqa: E402
+
+STUB_LATENCY = 0.2
+STUB_RESPONSE = '{"topic": "Projectile Motion", "variables": ["v0", "angle", "g"]}'
+
+
+class _StubResponse:
+    text = STUB_RESPONSE
+
+
+class StubModel:
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, parts, **kwargs):
+        time.sleep(STUB_LATENCY)
+        return _StubResponse()
+
+    async def generate_content_async(self, parts, **kwargs):
+        await asyncio.sleep(STUB_LATENCY)
+        return _StubResponse()
+
+
+async def blocking_detect(image_path: str):
+    """The previous implementation's shape: sync read + sync model call inside a coroutine."""
+    with open(image_path, "rb") as img:
+        img_bytes = img.read()
+    model = genai.GenerativeModel("gemini-2.0-flash")
+    model.generate_content(["prompt", {"mime_type": "image/png", "data": img_bytes}])
+
+
+async def run(label: str, detect, image_path: str, n: int):
+    # Latency is measured from when the burst arrives, so time spent queued
+    # behind other uploads counts (that is what clients experience).
+    latencies = []
+    start = time.perf_counter()
+
+    async def one():
+        await detect(image_path)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(
+        f"{label:<10} uploads={n:<4} total={total:6.2f}s "
+        f"p50={statistics.median(latencies):6.3f}s p99={p99:6.3f}s "
+        f"throughput={n / total:7.1f}/s"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    genai.GenerativeModel = StubModel
+
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+        tmp.write(b"\x89PNG\r\n\x1a\n" + b"\0" * 256 * 1024)
+        image_path = tmp.name
+
+    try:
+        asyncio.run(run("blocking", blocking_detect, image_path, n))
+        asyncio.run(run("async", ai_detector.detect_topic, image_path, n))
+    finally:
+        Path(image_path).unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Page latency vs history depth: keyset cursor pagination against skip/offset.
+
+Seeds one heavy user with N scan records (plus noise from other users) in a
+throwaway database, creates the startup indexes, then walks the user's
+history page by page through database.pagination.fetch_timeline_page. At
+several depths it records how long the keyset page took, and how long the
+equivalent skip()-based page takes.
+
+Requires a running mongod (default mongodb://localhost:27017). The database
+named below is dropped at the start and at the end of the run.
+
+Run from the backend directory:
+    python benchmarks/bench_history_pagination.py [records] [page_size] [mongo_uri]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from database.history_model import HISTORY_LIST_PROJECTION  # noqa: E402
+from database.indexes import USER_TIMELINE_INDEX  # noqa: E402
+from database.pagination import TIMELINE_SORT, fetch_timeline_page  # noqa: E402
+
+RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+PAGE_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+MONGO_URI = sys.argv[3] if len(sys.argv) > 3 else "mongodb://localhost:27017"
+DB_NAME = "stemly_bench_pagination"
+HEAVY_USER = "heavy-user"
+BATCH = 10_000
+
+
+async def seed(collection):
+    rng = random.Random(0)
+    start = datetime.utcnow() - timedelta(days=3 * 365)
+    inserted = 0
+    while inserted < RECORDS:
+        batch = []
+        for _ in range(min(BATCH, RECORDS - inserted)):
+            batch.append({
+                "user_id": HEAVY_USER if rng.random() < 0.5 else f"user-{rng.randrange(1000)}",
+                "topic": "Projectile Motion",
+                "variables": ["U", "theta", "g"],
+                "image_path": f"static/scans/{rng.getrandbits(128):032x}.png",
+                # Coarse timestamps force plenty of ties, which _id has to break.
+                "timestamp": start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60 // 10) * 10),
+            })
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    await collection.create_index(USER_TIMELINE_INDEX, name="user_id_timestamp_id_desc")
+
+
+async def skip_page(collection, page_number: int):
+    start = time.perf_counter()
+    await (
+        collection.find({"user_id": HEAVY_USER}, HISTORY_LIST_PROJECTION)
+        .sort(TIMELINE_SORT)
+        .skip(page_number * PAGE_SIZE)
+        .limit(PAGE_SIZE)
+        .to_list(length=PAGE_SIZE)
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URI)
+    await client.drop_database(DB_NAME)
+    collection = client[DB_NAME]["scans"]
+
+    try:
+        await seed(collection)
+        total = await collection.count_documents({"user_id": HEAVY_USER})
+        print(f"heavy user has {total} records, page size {PAGE_SIZE}")
+
+        checkpoints = {0, 1, 10, 100, 1000, total // PAGE_SIZE - 1}
+        cursor, page, seen = None, 0, set()
+        while True:
+            start = time.perf_counter()
+            items, cursor = await fetch_timeline_page(
+                collection, HEAVY_USER, HISTORY_LIST_PROJECTION, PAGE_SIZE, cursor
+            )
+            keyset_ms = (time.perf_counter() - start) * 1000
+            seen.update(item["_id"] for item in items)
+
+            if page in checkpoints:
+                print(
+                    f"page {page:>6}  keyset={keyset_ms:8.2f} ms  "
+                    f"skip={await skip_page(collection, page):8.2f} ms"
+                )
+            if cursor is None:
+                break
+            page += 1
+
+        print(f"walked {page + 1} pages, {len(seen)} unique records (expected {total})")
+    finally:
+        await client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+History listing benchmark against a local mongod with synthetic records.
+
+Seeds a throwaway database with N scan records spread over many users, then
+times the /scan/history query (filter by user_id, newest first, limit 50,
+list projection) without and with the (user_id, timestamp desc) index that
+database/indexes.py creates at startup. It also prints the winning plan's
+docsExamined, so you can see the index removing the collection scan and the
+in-memory sort.
+
+Requires a running mongod (default mongodb://localhost:27017). The database
+named below is dropped at the start and at the end of the run.
+
+Run from the backend directory:
+    python benchmarks/bench_history_queries.py [records] [users] [mongo_uri]
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import MongoClient  # noqa: E402
+
+from database.history_model import HISTORY_LIST_PROJECTION  # noqa: E402
+from database.indexes import USER_TIMELINE_INDEX  # noqa: E402
+
+RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+USERS = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+MONGO_URI = sys.argv[3] if len(sys.argv) > 3 else "mongodb://localhost:27017"
+DB_NAME = "stemly_bench"
+BATCH = 10_000
+QUERIES = 200
+
+TOPICS = ["Projectile Motion", "Free Fall", "Simple Harmonic Motion", "Optics", "Circuits"]
+
+
+def seed(collection):
+    start = datetime.utcnow() - timedelta(days=365)
+    rng = random.Random(0)
+    inserted = 0
+    while inserted < RECORDS:
+        batch = []
+        for _ in range(min(BATCH, RECORDS - inserted)):
+            batch.append({
+                "user_id": f"user-{rng.randrange(USERS)}",
+                "topic": rng.choice(TOPICS),
+                "variables": ["U", "theta", "g"],
+                "image_path": f"static/scans/{rng.getrandbits(128):032x}.png",
+                "timestamp": start + timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+                # Stand-in for the bulkier fields list views do not need.
+                "raw_model_output": "x" * 512,
+            })
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+        print(f"\rseeded {inserted}/{RECORDS}", end="", flush=True)
+    print()
+
+
+def time_queries(collection, label):
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(QUERIES):
+        user_id = f"user-{rng.randrange(USERS)}"
+        start = time.perf_counter()
+        list(
+            collection.find({"user_id": user_id}, HISTORY_LIST_PROJECTION)
+            .sort("timestamp", -1)
+            .limit(50)
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    explain = (
+        collection.find({"user_id": "user-0"}, HISTORY_LIST_PROJECTION)
+        .sort("timestamp", -1)
+        .limit(50)
+        .explain()
+    )
+    examined = explain.get("executionStats", {}).get("totalDocsExamined")
+
+    latencies.sort()
+    print(
+        f"{label:<10} p50={statistics.median(latencies):8.2f} ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:8.2f} ms docsExamined={examined}"
+    )
+
+
+def main():
+    client = MongoClient(MONGO_URI)
+    client.drop_database(DB_NAME)
+    collection = client[DB_NAME]["scans"]
+
+    try:
+        seed(collection)
+        time_queries(collection, "no index")
+        start = time.perf_counter()
+        collection.create_index(USER_TIMELINE_INDEX, name="user_id_timestamp_desc")
+        print(f"index build: {time.perf_counter() - start:.1f}s")
+        time_queries(collection, "indexed")
+    finally:
+        client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
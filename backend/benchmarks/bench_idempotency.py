@@ -0,0 +1,197 @@
+"""
+Cost of client retries on /scan/upload and /notes/generate, with and without
+an Idempotency-Key header.
+
+Clients have a read timeout shorter than the request, as on a bad mobile
+connection, and resend the same request after each timeout. Retries with the
+same key join the in-flight original or get its stored response replayed.
+
+The scan and notes routers run under a real uvicorn server on localhost.
+Topic detection is a stub that sleeps for the model latency (so it is not
+served from the detection cache). Notes use the real generation path with the
+Gemini chat model stubbed and `use_cache: false`, so only gateway coalescing
+stands between a retry and the model. MongoDB writes are skipped when
+MONGO_URI is unset; history and notes saves are counted instead.
+
+Run from the backend directory:
+    python benchmarks/bench_idempotency.py [clients] [model_ms] [client_timeout_ms]
+"""
+
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(Path(__file__).resolve().parent.parent)
+os.makedirs("static/scans", exist_ok=True)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import config  # noqa: E402
+from routers import jobs, notes, scan  # noqa: E402
+from services import ai_notes, structured_output  # noqa: E402
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+MODEL_S = (float(sys.argv[2]) if len(sys.argv) > 2 else 3000.0) / 1000
+TIMEOUT_S = (float(sys.argv[3]) if len(sys.argv) > 3 else 2000.0) / 1000
+RETRY_BACKOFF_S = 1.5
+MAX_ATTEMPTS = 5
+
+NOTES_ANSWER = json.dumps({
+    "explanation": "Projectile motion combines uniform horizontal motion with free fall.",
+    "variable_breakdown": {"U": "initial speed", "theta": "launch angle", "g": "gravity"},
+    "formulas": ["R = U^2 sin(2θ) / g"],
+    "example": "A ball at 20 m/s and 45° lands about 40.8 m away.",
+    "mistakes": ["Using degrees in radian formulas"],
+    "practice_questions": ["Find the range at 30°."],
+    "summary": ["Horizontal velocity is constant."],
+    "resources": ["HyperPhysics: Trajectories"],
+})
+
+counts = {"model_calls": 0, "saves": 0}
+
+
+class StubChatModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        counts["model_calls"] += 1
+        await asyncio.sleep(MODEL_S)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=NOTES_ANSWER))])
+
+
+async def stub_detect(model_path, content_hash):
+    counts["model_calls"] += 1
+    await asyncio.sleep(MODEL_S)
+    return "Projectile Motion", ["U", "theta", "g"], False
+
+
+async def counting_save(**kwargs):
+    counts["saves"] += 1
+    return "no-db-record"
+
+
+def install_stubs():
+    config.GEMINI_API_KEY = "benchmark-key"
+    config.llm = ai_notes.llm = StubChatModel()
+    structured_output.is_ai_enabled = ai_notes.is_ai_enabled = lambda: True
+    scan.detect_topic_cached = stub_detect
+    scan.save_scan_history = counting_save
+    notes.save_notes_entry = counting_save
+
+
+def start_server() -> int:
+    app = FastAPI()
+    app.include_router(scan.router, prefix="/scan")
+    app.include_router(notes.router)
+    app.include_router(jobs.router)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+def scan_image(seed: int) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def retrying_client(client, send, with_key: bool):
+    headers = {"Idempotency-Key": uuid.uuid4().hex} if with_key else {}
+    start, requests, replayed = time.perf_counter(), 0, False
+    for _ in range(MAX_ATTEMPTS):
+        requests += 1
+        try:
+            response = await send(client, headers)
+            if response.status_code == 200:
+                replayed = response.headers.get("Idempotent-Replayed") == "true"
+                return time.perf_counter() - start, requests, replayed
+        except httpx.TimeoutException:
+            pass
+        await asyncio.sleep(RETRY_BACKOFF_S)
+    return None, requests, replayed
+
+
+def notes_sender(index: int):
+    body = {"topic": f"Projectile Motion {index}", "variables": ["U", "theta", "g"], "use_cache": False}
+
+    def send(client, headers):
+        return client.post("/notes/generate", json=body, headers=headers, timeout=TIMEOUT_S)
+    return send
+
+
+def scan_sender(image: bytes):
+    def send(client, headers):
+        return client.post(
+            "/scan/upload", files={"file": ("scan.png", image, "image/png")}, headers=headers, timeout=TIMEOUT_S
+        )
+    return send
+
+
+async def run(client, label, senders, with_key):
+    for key in counts:
+        counts[key] = 0
+    results = await asyncio.gather(*(retrying_client(client, send, with_key) for send in senders))
+    done = [seconds for seconds, _, _ in results if seconds is not None]
+    requests = sum(count for _, count, _ in results)
+    replays = sum(1 for _, _, replayed in results if replayed)
+    avg = sum(done) / len(done) if done else float("nan")
+    print(
+        f"{label:<24} {len(done):>4}/{len(senders):<4} {avg * 1000:>9.0f}ms {requests:>9} "
+        f"{counts['model_calls']:>11} {counts['saves']:>6} {replays:>8}"
+    )
+
+
+async def main():
+    install_stubs()
+    port = start_server()
+    print(f"{CLIENTS} clients, model {MODEL_S * 1000:.0f} ms, client timeout {TIMEOUT_S * 1000:.0f} ms, "
+          f"retry backoff {RETRY_BACKOFF_S * 1000:.0f} ms\n")
+    print(f"{'endpoint':<24} {'ok':>9} {'to result':>11} {'requests':>9} {'model calls':>11} {'saves':>6} {'replayed':>8}")
+
+    existing = set(Path("static/scans").rglob("*"))
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        headers={"Authorization": "Bearer test-token"},
+    ) as client:
+        for with_key in (False, True):
+            suffix = "with key" if with_key else "no key"
+            await run(client, f"/notes/generate {suffix}", [notes_sender(i) for i in range(CLIENTS)], with_key)
+            images = [scan_image(i + (100 if with_key else 0)) for i in range(CLIENTS)]
+            await run(client, f"/scan/upload {suffix}", [scan_sender(image) for image in images], with_key)
+
+    for path in set(Path("static/scans").rglob("*")) - existing:
+        if path.is_file():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
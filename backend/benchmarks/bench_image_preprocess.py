@@ -0,0 +1,105 @@
+"""
+Payload size and end-to-end latency before/after model-image preprocessing.
+
+A synthetic 12 MP phone photo (with an EXIF orientation tag) is sent to a stub
+Gemini model three times, as happens for detect -> notes -> chat. The stub's
+latency scales with payload size to model upload bandwidth.
+
+Run from the backend directory:
+    python benchmarks/bench_image_preprocess.py [uplink_mbit_per_s]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import google.generativeai as genai  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from services import ai_gateway, image_preprocess  # noqa: E402
+
+MODEL_BASE_LATENCY = 0.4
+AI_CALLS_PER_SCAN = 3  # detect_topic, generate_notes, one chat turn
+UPLINK_MBIT = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+
+
+class _StubResponse:
+    text = "{}"
+
+
+class StubModel:
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, parts, **kwargs):
+        payload = sum(len(p["data"]) for p in parts if isinstance(p, dict))
+        await asyncio.sleep(MODEL_BASE_LATENCY + payload * 8 / (UPLINK_MBIT * 1_000_000))
+        return _StubResponse()
+
+
+def make_phone_photo(path: Path):
+    height, width = 3024, 4032
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    base = ((x / width) * 180 + (y / height) * 60).astype(np.uint8)
+    noise = rng.integers(0, 40, size=(height, width), dtype=np.uint8)
+    rgb = np.stack([base + noise, base, 255 - base], axis=-1)
+    image = Image.fromarray(rgb, "RGB")
+    exif = image.getexif()
+    exif[0x0112] = 6  # rotated 90° CW, as most phones write it
+    image.save(path, "JPEG", quality=95, exif=exif)
+
+
+async def ai_round_trips(path: Path) -> float:
+    start = time.perf_counter()
+    for _ in range(AI_CALLS_PER_SCAN):
+        data = await ai_gateway.read_image_bytes(path)
+        await ai_gateway.generate_content(
+            "gemini-2.0-flash", ["prompt", {"mime_type": "image/jpeg", "data": data}]
+        )
+    return time.perf_counter() - start
+
+
+async def main():
+    genai.GenerativeModel = StubModel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scans_dir = Path(tmp) / "static" / "scans"
+        scans_dir.mkdir(parents=True)
+        image_preprocess.PROJECT_ROOT = Path(tmp)
+        image_preprocess.MODEL_IMAGES_DIR = scans_dir / "model"
+
+        original = scans_dir / "photo.jpg"
+        make_phone_photo(original)
+
+        start = time.perf_counter()
+        derived_rel = await image_preprocess.prepare_model_image("static/scans/photo.jpg")
+        preprocess_s = time.perf_counter() - start
+        derived = Path(tmp) / derived_rel
+
+        before = await ai_round_trips(original)
+        after = await ai_round_trips(derived)
+
+        original_size, derived_size = original.stat().st_size, derived.stat().st_size
+        with Image.open(derived) as img:
+            size, has_exif = img.size, bool(img.getexif())
+
+    print(f"uplink={UPLINK_MBIT} Mbit/s, {AI_CALLS_PER_SCAN} model calls per scan")
+    print(f"before: payload/call={_kb(original_size)} end_to_end={before:.2f}s")
+    print(
+        f"after:  payload/call={_kb(derived_size)} end_to_end={after + preprocess_s:.2f}s "
+        f"(preprocess {preprocess_s:.2f}s, {size[0]}x{size[1]}, exif={has_exif})"
+    )
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:.0f} KB"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Hit rate, accuracy and latency of the local parameter-intent parser
+(services/intent_parser.py) on a labelled corpus.
+
+Each line of data/intent_corpus.jsonl has a template_id, a prompt and the
+expected updates (after unit conversion and clamping), or null when the prompt
+should go to the model. Current parameters are the template defaults.
+
+  hit rate           share of prompts answered locally
+  accuracy           answered locally with exactly the expected updates
+  false positives    answered locally but labelled for the model
+  missed edits       labelled as edits but sent to the model
+
+Run from the backend directory:
+    python benchmarks/bench_intent_parser.py [corpus.jsonl]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import visualiser_loader  # noqa: E402
+from services.intent_parser import parse_parameter_intent  # noqa: E402
+
+CORPUS = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "data" / "intent_corpus.jsonl"
+REPEAT = 200
+
+
+def same(updates, expected):
+    return updates.keys() == expected.keys() and all(
+        abs(updates[name] - expected[name]) <= 1e-4 * max(1.0, abs(expected[name])) for name in expected
+    )
+
+
+def main():
+    registry = visualiser_loader.load_templates()
+    cases = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    local = correct = false_positive = missed = 0
+    for case in cases:
+        template = registry.templates[case["template_id"]].data
+        intent = parse_parameter_intent(case["prompt"], template)
+        expected = case["expected"]
+
+        if intent is None:
+            if expected is not None:
+                missed += 1
+                print(f"  missed:  [{case['template_id']}] {case['prompt']!r}")
+            continue
+
+        local += 1
+        if expected is None:
+            false_positive += 1
+            print(f"  false +: [{case['template_id']}] {case['prompt']!r} -> {intent.updates}")
+        elif same(intent.updates, expected):
+            correct += 1
+        else:
+            print(f"  wrong:   [{case['template_id']}] {case['prompt']!r} -> {intent.updates}, expected {expected}")
+
+    edits = sum(1 for case in cases if case["expected"] is not None)
+    print(f"corpus: {len(cases)} prompts ({edits} edits, {len(cases) - edits} for the model)")
+    print(f"hit rate:        {local / len(cases):6.1%} answered locally")
+    print(f"accuracy:        {correct / max(local, 1):6.1%} of local answers exactly right")
+    print(f"edit coverage:   {correct / edits:6.1%} of labelled edits handled locally")
+    print(f"false positives: {false_positive}   missed edits: {missed}")
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for case in cases:
+            parse_parameter_intent(case["prompt"], registry.templates[case["template_id"]].data)
+    per_prompt = (time.perf_counter() - start) / (REPEAT * len(cases)) * 1_000_000
+    print(f"latency:         {per_prompt:6.1f} us per prompt (vs a Gemini round trip of ~1-2 s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Flaky-client behaviour of /notes/generate inline vs ?background=true.
+
+Clients have a read timeout shorter than notes generation, as on a bad mobile
+connection. Inline clients retry the POST after a timeout. Background clients
+submit once with an Idempotency-Key and long-poll /jobs/{id}?wait=N, each poll
+shorter than their timeout.
+
+The notes and jobs routers run under a real uvicorn server on localhost, with
+the Gemini chat model replaced by a stub that sleeps for the model latency.
+Notes generation itself is real: gateway coalescing, the notes cache and
+structured parsing all apply. MongoDB writes are skipped when MONGO_URI is
+unset; saved notes entries are counted instead.
+
+Before the benchmark, a worker whose MongoDB claim raises must fail that job
+and go on to the next one; the script exits non-zero if it does not.
+
+Run from the backend directory:
+    python benchmarks/bench_job_queue.py [clients] [model_ms] [client_timeout_ms]
+"""
+
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+
+import config  # noqa: E402
+from routers import jobs, notes  # noqa: E402
+from services import ai_notes, structured_output  # noqa: E402
+from services import job_queue as job_queue_module  # noqa: E402
+from services.job_queue import JobQueue, job_queue, register_job  # noqa: E402
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+MODEL_S = (float(sys.argv[2]) if len(sys.argv) > 2 else 3000.0) / 1000
+TIMEOUT_S = (float(sys.argv[3]) if len(sys.argv) > 3 else 2000.0) / 1000
+RETRY_BACKOFF_S = 1.5
+MAX_ATTEMPTS = 5
+
+NOTES_ANSWER = json.dumps({
+    "explanation": "Projectile motion combines uniform horizontal motion with free fall.",
+    "variable_breakdown": {"U": "initial speed", "theta": "launch angle", "g": "gravity"},
+    "formulas": ["R = U^2 sin(2θ) / g"],
+    "example": "A ball at 20 m/s and 45° lands about 40.8 m away.",
+    "mistakes": ["Using degrees in radian formulas"],
+    "practice_questions": ["Find the range at 30°."],
+    "summary": ["Horizontal velocity is constant."],
+    "resources": ["HyperPhysics: Trajectories"],
+})
+
+counts = {"model_calls": 0, "notes_saved": 0}
+
+
+class StubChatModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        counts["model_calls"] += 1
+        await asyncio.sleep(MODEL_S)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=NOTES_ANSWER))])
+
+
+async def counting_save_notes_entry(**kwargs):
+    counts["notes_saved"] += 1
+    return "no-db-record"
+
+
+def install_stubs():
+    config.GEMINI_API_KEY = "benchmark-key"
+    config.llm = ai_notes.llm = StubChatModel()
+    structured_output.is_ai_enabled = ai_notes.is_ai_enabled = lambda: True
+    notes.save_notes_entry = counting_save_notes_entry
+    # One worker per client, so queueing doesn't skew time-to-result (JOB_WORKERS caps it in production).
+    job_queue.workers = CLIENTS
+
+
+def start_server() -> int:
+    app = FastAPI()
+    app.include_router(notes.router)
+    app.include_router(jobs.router)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+async def inline_client(client, body):
+    start, requests = time.perf_counter(), 0
+    for _ in range(MAX_ATTEMPTS):
+        requests += 1
+        try:
+            response = await client.post("/notes/generate", json=body, timeout=TIMEOUT_S)
+            if response.status_code == 200:
+                return time.perf_counter() - start, requests
+        except httpx.TimeoutException:
+            pass
+        await asyncio.sleep(RETRY_BACKOFF_S)
+    return None, requests
+
+
+async def background_client(client, body):
+    start, requests = time.perf_counter(), 0
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    job = None
+    while job is None and requests < MAX_ATTEMPTS:
+        requests += 1
+        try:
+            job = (await client.post("/notes/generate?background=true", json=body, headers=headers, timeout=TIMEOUT_S)).json()
+        except httpx.TimeoutException:
+            await asyncio.sleep(RETRY_BACKOFF_S)
+
+    wait = max(TIMEOUT_S - 0.5, 0.1)
+    while True:
+        requests += 1
+        try:
+            job = (await client.get(f"/jobs/{job['job_id']}", params={"wait": wait}, timeout=TIMEOUT_S)).json()
+        except httpx.TimeoutException:
+            continue
+        if job["status"] == "succeeded":
+            return time.perf_counter() - start, requests
+        if job["status"] == "failed":
+            return None, requests
+
+
+async def run(client, mode, flow):
+    for key in counts:
+        counts[key] = 0
+    bodies = [
+        {"topic": f"Projectile Motion {mode} {index}", "variables": ["U", "theta", "g"], "use_cache": True}
+        for index in range(CLIENTS)
+    ]
+    results = await asyncio.gather(*(flow(client, body) for body in bodies))
+    done = [seconds for seconds, _ in results if seconds is not None]
+    requests = sum(count for _, count in results)
+    avg = sum(done) / len(done) if done else float("nan")
+    print(
+        f"{mode:<11} {len(done):>4}/{CLIENTS:<4} {avg * 1000:>9.0f}ms {requests:>9} "
+        f"{counts['model_calls']:>11} {counts['notes_saved']:>11}"
+    )
+
+
+async def check_claim_failure():
+    async def echo(user_id, params):
+        return params
+
+    async def flaky_claim(job_id, worker):
+        if not flaky_claim.failed:
+            flaky_claim.failed = True
+            raise ConnectionError("MongoDB connection dropped")
+        return await claim_job(job_id, worker)
+
+    flaky_claim.failed = False
+    claim_job = job_queue_module.claim_job
+    register_job("bench_echo", echo)
+    queue = JobQueue(1, 10)
+    job_queue_module.claim_job = flaky_claim
+    try:
+        first, _ = await queue.submit("bench_echo", "bench-user", {"n": 1})
+        second, _ = await queue.submit("bench_echo", "bench-user", {"n": 2})
+        first = await queue.wait(first["_id"], "bench-user", 5)
+        second = await queue.wait(second["_id"], "bench-user", 5)
+    finally:
+        job_queue_module.claim_job = claim_job
+        await queue.stop()
+
+    print(f"claim failure: first job {first['status']}, next job {second['status']}\n")
+    if first["status"] != "failed" or second["status"] != "succeeded":
+        raise SystemExit("a failed claim stopped the worker")
+
+
+async def main():
+    await check_claim_failure()
+    install_stubs()
+    port = start_server()
+    print(f"{CLIENTS} clients, model {MODEL_S * 1000:.0f} ms, client timeout {TIMEOUT_S * 1000:.0f} ms, "
+          f"retry backoff {RETRY_BACKOFF_S * 1000:.0f} ms\n")
+    print(f"{'mode':<11} {'ok':>9} {'to result':>11} {'requests':>9} {'model calls':>11} {'notes saved':>11}")
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        headers={"Authorization": "Bearer test-token"},
+    ) as client:
+        await run(client, "inline", inline_client)
+        await run(client, "background", background_client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Auth-path cost of recording logins: one awaited upsert per request vs the
+debounced UserLoginBatcher in database/user_model.py.
+
+A fake users collection charges DB_LATENCY per round trip (update_one or
+bulk_write, regardless of size) and counts the calls. SESSIONS users each send
+REQUESTS_PER_SESSION authenticated requests a few milliseconds apart, like a
+chat session. "inline" awaits an update_one per request the way
+require_firebase_user used to; "batched" calls record_user_login and lets the
+batcher flush, then drains it with stop().
+
+Run from the backend directory:
+    python benchmarks/bench_login_batching.py [sessions] [requests_per_session] [flush_seconds]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import user_model  # noqa: E402
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+REQUESTS_PER_SESSION = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+FLUSH_SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+DB_LATENCY = 0.004
+REQUEST_GAP = 0.01
+
+
+class FakeUsersCollection:
+    def __init__(self):
+        self.round_trips = 0
+        self.upserts = 0
+        self.users = {}
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(DB_LATENCY)
+        self.round_trips += 1
+        self.upserts += 1
+        self.users[query["_id"]] = update["$set"]
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(DB_LATENCY)
+        self.round_trips += 1
+        self.upserts += len(operations)
+        for op in operations:
+            self.users[op._filter["_id"]] = op._doc["$set"]
+
+
+async def inline_login(collection, user):
+    await collection.update_one(
+        {"_id": user["uid"]},
+        {"$set": {"name": user["name"], "email": user["email"]}, "$setOnInsert": {}},
+        upsert=True,
+    )
+
+
+async def run(label, batched):
+    collection = FakeUsersCollection()
+    user_model.users_collection = collection
+    user_model.login_batcher = user_model.UserLoginBatcher(FLUSH_SECONDS, user_model.USER_LOGIN_MAX_PENDING)
+    per_request = []
+
+    async def session(i):
+        user = {"uid": f"user-{i}", "name": f"User {i}", "email": f"user{i}@stemly.app", "picture": None}
+        for _ in range(REQUESTS_PER_SESSION):
+            start = time.perf_counter()
+            if batched:
+                user_model.record_user_login(user)
+            else:
+                await inline_login(collection, user)
+            per_request.append((time.perf_counter() - start) * 1_000_000)
+            await asyncio.sleep(REQUEST_GAP)
+
+    await asyncio.gather(*(session(i) for i in range(SESSIONS)))
+    if batched:
+        await user_model.login_batcher.stop()
+
+    per_request.sort()
+    total = len(per_request)
+    print(
+        f"{label:<8} requests={total} p50={per_request[total // 2]:9.1f} us "
+        f"p99={per_request[int(total * 0.99) - 1]:9.1f} us "
+        f"db_round_trips={collection.round_trips:<5} upserts={collection.upserts:<5} "
+        f"users_persisted={len(collection.users)}"
+    )
+    if batched:
+        print(f"batcher stats: {user_model.login_batcher.stats}")
+
+
+def main():
+    print(f"{SESSIONS} sessions x {REQUESTS_PER_SESSION} requests, db latency {DB_LATENCY * 1000:.0f} ms")
+    asyncio.run(run("inline", batched=False))
+    asyncio.run(run("batched", batched=True))
+
+
+if __name__ == "__main__":
+    main()
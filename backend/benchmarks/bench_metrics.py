@@ -0,0 +1,94 @@
+"""
+Overhead of the metrics middleware and of rendering GET /metrics.
+
+Requests go through httpx's in-process ASGI transport (no sockets), so the
+per-request cost of MetricsMiddleware is not hidden behind network time.
+A stub route behind a `/things/{thing_id}` template is used, so route
+resolution runs the same regex scan as on the real app. Rendering is timed
+after every route, status and stage histogram has samples.
+
+Run from the backend directory:
+    python benchmarks/bench_metrics.py [requests]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from utils import metrics  # noqa: E402
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+ROUNDS = 5
+ROUTES = 40  # about as many as main.py registers
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    for index in range(ROUTES):
+        @app.get(f"/route{index}/{{item_id}}")
+        async def route(item_id: str):
+            return {"id": item_id}
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: str):
+        return {"id": thing_id}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+    return app
+
+
+async def per_request_us(app: FastAPI) -> float:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for index in range(200):
+            await client.get(f"/things/{index}")
+        start = time.perf_counter()
+        for index in range(REQUESTS):
+            await client.get(f"/things/{index}")
+        return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def fill_stage_histograms():
+    rng = random.Random(0)
+    for _ in range(10000):
+        metrics.gemini_call_seconds.observe(rng.uniform(0.5, 8), model="gemini-2.0-flash", mode="call", outcome="ok")
+        metrics.json_parse_seconds.observe(rng.uniform(0.0001, 0.003))
+        metrics.mongo_insert_seconds.observe(rng.uniform(0.001, 0.02), collection="notes")
+        metrics.file_save_seconds.observe(rng.uniform(0.005, 0.05))
+        metrics.token_verify_seconds.observe(rng.uniform(0.00001, 0.0001), result="cache_hit")
+    for index in range(ROUTES):
+        for status in ("200", "400", "500"):
+            metrics.http_requests.inc(method="GET", route=f"/route{index}/{{item_id}}", status=status)
+        metrics.http_request_seconds.observe(0.01, method="GET", route=f"/route{index}/{{item_id}}")
+
+
+async def main():
+    plain, instrumented = build_app(False), build_app(True)
+    print(f"{REQUESTS} requests x {ROUNDS} rounds, {ROUTES + 1} routes\n")
+
+    results = {"without middleware": [], "with middleware": []}
+    for _ in range(ROUNDS):
+        results["without middleware"].append(await per_request_us(plain))
+        results["with middleware"].append(await per_request_us(instrumented))
+    for name, values in results.items():
+        print(f"{name:<20} {statistics.median(values):>8.1f} us/request (median of {ROUNDS})")
+    overhead = statistics.median(results["with middleware"]) - statistics.median(results["without middleware"])
+    print(f"{'overhead':<20} {overhead:>8.1f} us/request")
+
+    fill_stage_histograms()
+    start = time.perf_counter()
+    body = metrics.render_metrics()
+    render_ms = (time.perf_counter() - start) * 1000
+    print(f"\nrender /metrics: {render_ms:.2f} ms, {len(body.splitlines())} lines, {len(body) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Microbenchmark: per-request setup cost of the model client + parser + prompt.
+
+"before" rebuilds ChatGoogleGenerativeAI, PydanticOutputParser and the
+PromptTemplate on every call, as /visualiser/update used to. "after" fetches the
+prebuilt chain from the registry. No model call is made.
+
+Run from the backend directory:
+    python benchmarks/bench_model_registry.py [iterations]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Construction only; the key is never sent anywhere.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from langchain_core.output_parsers import PydanticOutputParser  # noqa: E402
+from langchain_core.prompts import PromptTemplate  # noqa: E402
+from langchain_google_genai import ChatGoogleGenerativeAI  # noqa: E402
+
+from config import GEMINI_API_KEY  # noqa: E402
+from services import model_registry  # noqa: E402
+from services.ai_visualiser import VISUALISER_UPDATE_PROMPT, ParameterUpdate  # noqa: E402
+
+
+def per_request_build():
+    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3, google_api_key=GEMINI_API_KEY)
+    parser = PydanticOutputParser(pydantic_object=ParameterUpdate)
+    prompt = PromptTemplate(
+        template=VISUALISER_UPDATE_PROMPT.template,
+        input_variables=["template_id", "current_params", "user_prompt"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    return prompt | llm | parser
+
+
+def registry_lookup():
+    return model_registry.get_chain("visualiser_update")
+
+
+def bench(label, fn, iterations):
+    fn()  # first call builds/caches for the registry path
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<8} {per_call_us:10.1f} µs/request")
+    return per_call_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    before = bench("before", per_request_build, iterations)
+    after = bench("after", registry_lookup, iterations * 100)
+    print(f"speedup  {before / after:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Prompt size and modeled latency of follow-up notes by follow-up depth, before
+and after compacting the previous notes (services/notes_context.py).
+
+Follow-up answers come back as full notes and are sent again as
+previous_notes on the next follow-up, so without compaction the prompt grows
+with every round. The synthetic notes here grow the same way: every round
+adds explanation paragraphs, a formula, a mistake and practice questions.
+
+Latency is modeled, not measured: a fixed overhead plus a per-input-token
+cost (prefill) taken from typical Gemini flash figures. Compaction itself is
+timed for real.
+
+Run from the backend directory:
+    python benchmarks/bench_notes_compaction.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.ai_notes import NOTES_FOLLOWUP_PROMPT  # noqa: E402
+from services.notes_context import (  # noqa: E402
+    NOTES_FOLLOWUP_TOKEN_BUDGET,
+    compact_notes_context,
+)
+from utils.token_utils import estimate_tokens  # noqa: E402
+
+MAX_DEPTH = 10
+BASE_SECONDS = 0.6
+SECONDS_PER_1K_INPUT_TOKENS = 0.35
+TOPIC = "Projectile Motion"
+
+SUBJECTS = [
+    ("horizontal velocity", "The horizontal component of velocity U cos θ stays constant because no force acts sideways once air resistance is ignored."),
+    ("vertical velocity", "The vertical component U sin θ falls by g every second, reaches zero at the apex and then grows downward again."),
+    ("time of flight", "The time of flight 2U sin θ / g doubles if the launch speed doubles and shrinks on planets with stronger gravity."),
+    ("range", "The range U² sin 2θ / g is largest at 45 degrees, and complementary angles such as 30 and 60 degrees land at the same point."),
+    ("max height", "The maximum height U² sin² θ / 2g depends only on the vertical component, so steeper launches climb higher."),
+    ("air resistance", "With air resistance the path is no longer a parabola, the descent is steeper than the ascent and the range shrinks."),
+    ("energy", "Kinetic energy is smallest at the apex where only the horizontal velocity remains, and potential energy is largest there."),
+    ("launch height", "Launching from a cliff lengthens the flight because the projectile falls below its starting height before landing."),
+]
+
+QUESTIONS = [
+    "why is the range largest at 45 degrees?",
+    "what happens to the time of flight on the moon?",
+    "explain the energy at the top of the path",
+    "how does air resistance change the trajectory?",
+    "what if I launch from a cliff?",
+]
+
+
+def notes_at_depth(depth):
+    """Notes as the client holds them after `depth` follow-ups."""
+    paragraphs = []
+    for round_ in range(depth + 1):
+        for name, text in SUBJECTS[: 3 + round_ % len(SUBJECTS)]:
+            paragraphs.append(f"Follow-up {round_}, on {name}: {text} Worked through again with the numbers from the scan.")
+    return {
+        "summary": "Projectile motion splits into constant horizontal velocity and uniformly accelerated vertical motion; "
+                   "range, height and flight time follow from U, θ and g.",
+        "formulas": [f"Formula {i}: R = U² sin 2θ / g (variant {i})" for i in range(4 + depth)],
+        "variable_breakdown": {"U": "launch speed (m/s)", "θ": "launch angle", "g": "gravity (m/s²)", "R": "range (m)"},
+        "explanation": "\n\n".join(paragraphs),
+        "example": "A ball thrown at 20 m/s and 30 degrees lands 35.3 m away after 2.04 s. " * (1 + depth // 2),
+        "mistakes": [f"Mistake {i}: using sin θ instead of sin 2θ in the range formula" for i in range(3 + depth)],
+        "practice_questions": [f"Question {i}: find the range at {10 + 5 * i} degrees" for i in range(5 + 2 * depth)],
+        "resources": [f"https://example.com/projectile/{i}" for i in range(3 + depth)],
+        "followup_depth": depth,
+    }
+
+
+def modeled_seconds(tokens):
+    return BASE_SECONDS + SECONDS_PER_1K_INPUT_TOKENS * tokens / 1000
+
+
+def main():
+    print(f"Budget: {NOTES_FOLLOWUP_TOKEN_BUDGET} tokens of previous notes\n")
+    header = f"{'depth':>5} {'raw prompt':>11} {'compacted':>10} {'kept':>5} {'dropped':>8} {'compact ms':>11} {'raw s':>7} {'compact s':>10}"
+    print(header)
+    print("-" * len(header))
+
+    raw_total = compact_total = 0.0
+    for depth in range(MAX_DEPTH + 1):
+        notes = notes_at_depth(depth)
+        question = QUESTIONS[depth % len(QUESTIONS)]
+
+        # What the prompt used to be: the whole notes dict, str()-formatted.
+        raw_prompt = NOTES_FOLLOWUP_PROMPT.format(topic=TOPIC, previous_notes=notes, user_prompt=question)
+
+        runs = 50
+        start = time.perf_counter()
+        for _ in range(runs):
+            context, info = compact_notes_context(notes, question)
+        compact_ms = (time.perf_counter() - start) * 1000 / runs
+        prompt = NOTES_FOLLOWUP_PROMPT.format(topic=TOPIC, previous_notes=context, user_prompt=question)
+
+        raw_tokens, tokens = estimate_tokens(raw_prompt), estimate_tokens(prompt)
+        raw_s, compact_s = modeled_seconds(raw_tokens), modeled_seconds(tokens) + compact_ms / 1000
+        raw_total += raw_s
+        compact_total += compact_s
+        print(
+            f"{depth:>5} {raw_tokens:>11} {tokens:>10} {info['kept_items']:>5} {info['dropped_items']:>8} "
+            f"{compact_ms:>11.2f} {raw_s:>7.2f} {compact_s:>10.2f}"
+        )
+
+    print(f"\nModeled time over {MAX_DEPTH + 1} follow-ups: {raw_total:.2f}s raw, {compact_total:.2f}s compacted")
+
+
+if __name__ == "__main__":
+    main()
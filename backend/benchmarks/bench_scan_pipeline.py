@@ -0,0 +1,154 @@
+"""
+Scan-to-ready time: the current three-request flow (/scan/upload, then
+/visualiser/generate and /notes/generate) vs a single /scan/upload?pipeline=true.
+
+The scan, notes and visualiser routers run under a real uvicorn server on
+localhost. Detection and notes generation are replaced by stubs that sleep for
+typical Gemini latencies. A mobile round trip is added to every request on
+the client side. Requests use the dev bypass token, and MongoDB writes are
+skipped when MONGO_URI is unset.
+
+Run from the backend directory:
+    python benchmarks/bench_scan_pipeline.py [rtt_ms] [detect_ms] [notes_ms]
+"""
+
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(Path(__file__).resolve().parent.parent)
+os.makedirs("static/scans", exist_ok=True)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from models.notes_models import NotesResponse  # noqa: E402
+from routers import notes, scan, visualiser_engine  # noqa: E402
+
+RTT_S = (float(sys.argv[1]) if len(sys.argv) > 1 else 150.0) / 1000
+DETECT_S = (float(sys.argv[2]) if len(sys.argv) > 2 else 1500.0) / 1000
+NOTES_S = (float(sys.argv[3]) if len(sys.argv) > 3 else 4000.0) / 1000
+RUNS = 3
+
+NOTES = NotesResponse(
+    explanation="Projectile motion combines uniform horizontal motion with free fall.",
+    variable_breakdown={"U": "initial speed", "theta": "launch angle", "g": "gravity"},
+    formulas=["R = U^2 sin(2θ) / g"],
+    example="A ball at 20 m/s and 45° lands about 40.8 m away.",
+    mistakes=["Using degrees in radian formulas"],
+    practice_questions=["Find the range at 30°."],
+    summary=["Horizontal velocity is constant."],
+    resources=["HyperPhysics: Trajectories"],
+)
+
+
+async def stub_detect(model_path, content_hash):
+    await asyncio.sleep(DETECT_S)
+    return "Projectile Motion", ["U", "theta", "g"], False
+
+
+async def stub_notes(topic, variables, image_path=None, use_cache=True):
+    await asyncio.sleep(NOTES_S)
+    return NOTES, False
+
+
+def install_stubs():
+    scan.detect_topic_cached = stub_detect
+    scan.generate_notes_cached = stub_notes
+    notes.generate_notes_cached = stub_notes
+
+
+def start_server() -> int:
+    app = FastAPI()
+    app.include_router(scan.router, prefix="/scan")
+    app.include_router(notes.router)
+    app.include_router(visualiser_engine.router)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+def scan_image(seed: int) -> bytes:
+    """A distinct photo-sized PNG per run, so nothing is served from a cache."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (600, 800, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def two_step(client, image: bytes):
+    """What the app does today: upload, then visualiser and notes as separate requests."""
+    start = time.perf_counter()
+    await asyncio.sleep(RTT_S)
+    scan_result = (await client.post("/scan/upload", files={"file": ("scan.png", image, "image/png")})).json()
+    scanned = time.perf_counter() - start
+
+    await asyncio.sleep(RTT_S)
+    await client.post("/visualiser/generate", json={"topic": scan_result["topic"]})
+    visualised = time.perf_counter() - start
+
+    await asyncio.sleep(RTT_S)
+    await client.post("/notes/generate", json={
+        "topic": scan_result["topic"],
+        "variables": scan_result["variables"],
+        "image_path": scan_result["image_path"],
+    })
+    return scanned, visualised, time.perf_counter() - start
+
+
+async def pipelined(client, image: bytes):
+    start = time.perf_counter()
+    seen = {}
+    await asyncio.sleep(RTT_S)
+    async with client.stream(
+        "POST", "/scan/upload", params={"pipeline": "true"}, files={"file": ("scan.png", image, "image/png")}
+    ) as response:
+        async for line in response.aiter_lines():
+            if line.strip():
+                seen[json.loads(line)["type"]] = time.perf_counter() - start
+    return seen["scan"], seen["visualiser"], seen["notes"]
+
+
+async def main():
+    install_stubs()
+    port = start_server()
+    print(f"rtt {RTT_S * 1000:.0f} ms, detect {DETECT_S * 1000:.0f} ms, notes {NOTES_S * 1000:.0f} ms, {RUNS} runs each\n")
+    print(f"{'flow':<12} {'scan ready':>11} {'visualiser':>11} {'notes ready':>12}")
+
+    images = [scan_image(run) for run in range(RUNS)]
+    existing = set(Path("static/scans").rglob("*"))
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        headers={"Authorization": "Bearer test-token"},
+        timeout=60,
+    ) as client:
+        for name, flow in (("two-step", two_step), ("pipeline", pipelined)):
+            results = [await flow(client, image) for image in images]
+            averages = [sum(column) / RUNS for column in zip(*results)]
+            print(f"{name:<12} " + " ".join(f"{value * 1000:>9.0f}ms" for value in averages))
+
+    # Don't leave the benchmark's scans (and their model copies) behind.
+    for path in set(Path("static/scans").rglob("*")) - existing:
+        if path.is_file():
+            path.unlink()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
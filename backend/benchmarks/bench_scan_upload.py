@@ -0,0 +1,105 @@
+"""
+Memory/throughput benchmark for `save_scan` under many concurrent uploads.
+
+Compares the previous buffered implementation (whole upload in a bytearray,
+then one synchronous write) with the streaming temp-file writer. Uploads are
+generated on the fly, so the source data itself does not count towards the
+Python heap measured by tracemalloc.
+
+Run from the backend directory:
+    python benchmarks/bench_scan_upload.py [num_uploads] [size_mb]
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import storage  # noqa: E402
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+
+class FakeUpload:
+    """Minimal async stand-in for `UploadFile` that yields a unique PNG-like stream."""
+
+    def __init__(self, seed: int, size: int):
+        self.seed = seed
+        self.size = size
+        self.pos = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        remaining = self.size - self.pos
+        if remaining <= 0:
+            return b""
+        n = remaining if n < 0 else min(n, remaining)
+        start = self.pos
+        self.pos += n
+        # Let other uploads interleave like a real network stream would.
+        await asyncio.sleep(0)
+        if start == 0:
+            body = PNG_MAGIC + self.seed.to_bytes(8, "big")
+            return (body + b"\0" * n)[:n]
+        return bytes([self.seed % 251]) * n
+
+    async def seek(self, offset: int):
+        self.pos = offset
+
+
+async def buffered_save(file):
+    """The previous implementation: buffer everything, then write synchronously."""
+    header = await file.read(1024)
+    await file.seek(0)
+    ext = ".png" if header.startswith(PNG_MAGIC) else ".jpg"
+
+    digest = hashlib.sha256()
+    contents = bytearray()
+    while True:
+        chunk = await file.read(1024 * 1024)
+        if not chunk:
+            break
+        digest.update(chunk)
+        contents.extend(chunk)
+
+    content_hash = digest.hexdigest()
+    path = os.path.join(storage.SCANS_DIR, f"{content_hash}{ext}")
+    with open(path, "wb") as f:
+        f.write(contents)
+    return path, content_hash
+
+
+async def run(label: str, save, n: int, size: int):
+    uploads = [FakeUpload(seed, size) for seed in range(n)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(save(upload) for upload in uploads))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_mb = n * size / (1024 * 1024)
+    print(
+        f"{label:<10} uploads={n:<4} elapsed={elapsed:6.2f}s "
+        f"throughput={total_mb / elapsed:7.1f} MB/s peak_heap={peak / (1024 * 1024):8.1f} MB"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    size = int(float(sys.argv[2]) * 1024 * 1024) if len(sys.argv) > 2 else 4 * 1024 * 1024
+
+    for label, save in (("buffered", buffered_save), ("streaming", storage.save_scan)):
+        with tempfile.TemporaryDirectory() as scans_dir:
+            storage.SCANS_DIR = scans_dir
+            asyncio.run(run(label, save, n, size))
+
+
+if __name__ == "__main__":
+    main()
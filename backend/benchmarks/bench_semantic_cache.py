@@ -0,0 +1,91 @@
+"""
+Hit rate and false-hit rate of the semantic answer cache in
+services/semantic_cache.py, swept over similarity thresholds, plus lookup cost
+on a full topic.
+
+data/chat_paraphrases.json has, per topic, groups of questions that should
+share an answer and "novel" questions that none of the stored answers fit.
+The first question of every group is stored with its group id as the
+"answer"; every other question is then looked up:
+  hit        a paraphrase got the answer of its own group
+  false hit  any question got an answer that does not fit it (a wrong
+             explanation served without the model)
+  miss       a paraphrase went to the model
+
+Run from the backend directory:
+    python benchmarks/bench_semantic_cache.py
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from services import semantic_cache  # noqa: E402
+
+DATA = Path(__file__).parent / "data" / "chat_paraphrases.json"
+THRESHOLDS = [0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90]
+
+
+def evaluate(threshold, topics):
+    cache = semantic_cache.SemanticAnswerCache(threshold, 200, 100)
+    hits = false_hits = misses = 0
+    for topic, data in topics.items():
+        groups = data["groups"]
+        scope = cache.scope(topic, None, None)
+        for group_id, questions in enumerate(groups):
+            cache.store(scope, questions[0], {"group": group_id})
+        for group_id, questions in enumerate(groups):
+            for question in questions[1:]:
+                answer = cache.lookup(scope, question)
+                if answer is None:
+                    misses += 1
+                elif answer["group"] == group_id:
+                    hits += 1
+                else:
+                    false_hits += 1
+                    if threshold == semantic_cache.SEMANTIC_CACHE_THRESHOLD:
+                        print(f"  false hit: {question!r} -> {groups[answer['group']][0]!r}")
+        for question in data["novel"]:
+            answer = cache.lookup(scope, question)
+            if answer is not None:
+                false_hits += 1
+                if threshold == semantic_cache.SEMANTIC_CACHE_THRESHOLD:
+                    print(f"  false hit: {question!r} -> {groups[answer['group']][0]!r}")
+    return hits, false_hits, misses
+
+
+def main():
+    topics = json.loads(DATA.read_text(encoding="utf-8"))
+    paraphrases = sum(len(questions) - 1 for data in topics.values() for questions in data["groups"])
+    novel = sum(len(data["novel"]) for data in topics.values())
+    print(f"{paraphrases} paraphrase lookups and {novel} novel questions in {len(topics)} topics")
+
+    for threshold in THRESHOLDS:
+        hits, false_hits, misses = evaluate(threshold, topics)
+        marker = "  <- default" if threshold == semantic_cache.SEMANTIC_CACHE_THRESHOLD else ""
+        print(
+            f"threshold {threshold:.2f}: paraphrase hit rate {hits / paraphrases:6.1%}  "
+            f"false hits {false_hits}/{paraphrases + novel}{marker}"
+        )
+
+    # Lookup cost with a topic at its size cap.
+    cache = semantic_cache.SemanticAnswerCache(0.86, 200, 1)
+    scope = cache.scope("Projectile Motion", None, None)
+    rng = np.random.default_rng(0)
+    words = "why how what does the ball angle range height speed velocity gravity time path curve".split()
+    for i in range(200):
+        cache.store(scope, " ".join(rng.choice(words, 8)) + f" {i}", {"i": i})
+    start = time.perf_counter()
+    for i in range(2000):
+        cache.lookup(scope, "why does the ball follow a curved path?")
+    per_lookup = (time.perf_counter() - start) / 2000 * 1_000_000
+    print(f"lookup on a full topic (200 entries): {per_lookup:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
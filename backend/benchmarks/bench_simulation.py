@@ -0,0 +1,86 @@
+"""
+Trajectory sampling throughput of services/simulation.py.
+
+For each template it reports:
+- "python": a per-sample pure-Python loop, the way a client integrates
+  the formula frame by frame.
+- "numpy": simulate_batch evaluating BATCH parameter sets x SAMPLES
+  points in one vectorized pass.
+- "request": simulate() for one parameter set, including clamping and
+  float32/base64 encoding, i.e. the per-request cost on /visualiser/update.
+
+The size line compares the encoded series with the same samples written as
+JSON number lists.
+
+Run from the backend directory:
+    python benchmarks/bench_simulation.py [batch] [samples]
+"""
+
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from services import simulation, visualiser_loader  # noqa: E402
+
+BATCH = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+SAMPLES = int(sys.argv[2]) if len(sys.argv) > 2 else 240
+REQUESTS = 2000
+
+
+def python_projectile(U, theta, g, samples):
+    theta = math.radians(theta)
+    flight_time = 2 * U * math.sin(theta) / g
+    points = []
+    for i in range(samples):
+        t = flight_time * i / (samples - 1)
+        vy = U * math.sin(theta) - g * t
+        points.append((t, U * math.cos(theta) * t, U * math.sin(theta) * t - 0.5 * g * t * t,
+                       math.hypot(U * math.cos(theta), vy)))
+    return points
+
+
+def main():
+    registry = visualiser_loader.load_templates()
+    rng = np.random.default_rng(0)
+
+    start = time.perf_counter()
+    for i in range(BATCH):
+        python_projectile(20 + i % 50, 10 + i % 70, 9.81, SAMPLES)
+    python_rate = BATCH * SAMPLES / (time.perf_counter() - start)
+    print(f"{'projectile_motion':<18} python  {python_rate / 1e6:8.2f} M samples/s")
+
+    for template_id in simulation.SIMULATORS:
+        data = registry.templates[template_id].data
+        params = {
+            name: rng.uniform(spec["min"], spec["max"], BATCH)
+            for name, spec in data["parameters"].items()
+        }
+        start = time.perf_counter()
+        series, _ = simulation.simulate_batch(template_id, params, SAMPLES)
+        elapsed = time.perf_counter() - start
+        rate = BATCH * SAMPLES * len(series) / elapsed
+        print(f"{template_id:<18} numpy   {BATCH * SAMPLES / elapsed / 1e6:8.2f} M samples/s "
+              f"({rate / 1e6:.1f} M values/s over {len(series)} series)")
+
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            result = simulation.simulate(data, {}, SAMPLES)
+        per_request = (time.perf_counter() - start) / REQUESTS * 1_000_000
+        encoded = len(json.dumps(result["series"]))
+        as_json = len(json.dumps({
+            name: [round(float(v), 4) for v in column[0]]
+            for name, column in simulation.simulate_batch(
+                template_id, {k: [v] for k, v in result["parameters"].items()}, SAMPLES
+            )[0].items()
+        }))
+        print(f"{'':<18} request {per_request:8.1f} us  series {encoded / 1024:.1f} KB vs {as_json / 1024:.1f} KB as JSON lists")
+
+
+if __name__ == "__main__":
+    main()
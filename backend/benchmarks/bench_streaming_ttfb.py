@@ -0,0 +1,136 @@
+"""
+Time-to-first-byte of /chat/ask and /notes/ask vs their /stream variants.
+
+The chat and notes routers are served by a real uvicorn server on localhost.
+The Gemini models are replaced by a stub chat model that emits its JSON answer
+token by token with a fixed per-token delay. Requests use the dev bypass token,
+and MongoDB writes are skipped when MONGO_URI is unset.
+
+Run from the backend directory:
+    python benchmarks/bench_streaming_ttfb.py [per_token_ms]
+"""
+
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+import config  # noqa: E402
+from routers import chat, notes  # noqa: E402
+from services import ai_notes, model_registry  # noqa: E402
+
+PER_TOKEN_S = (float(sys.argv[1]) if len(sys.argv) > 1 else 15.0) / 1000
+
+CHAT_ANSWER = json.dumps({
+    "response": " ".join(["The trajectory curves because gravity accelerates the ball downward"] * 6),
+    "parameter_updates": None,
+    "update_type": "explanation",
+})
+NOTES_ANSWER = json.dumps({
+    "explanation": " ".join(["Projectile motion combines uniform horizontal motion with free fall"] * 8),
+    "variable_breakdown": {"U": "initial speed", "theta": "launch angle", "g": "gravity"},
+    "formulas": ["R = U^2 sin(2θ) / g"],
+    "example": "A ball at 20 m/s and 45° lands about 40.8 m away.",
+    "mistakes": ["Using degrees in radian formulas"],
+    "practice_questions": ["Find the range at 30°."],
+    "summary": ["Horizontal velocity is constant."],
+    "resources": ["HyperPhysics: Trajectories"],
+})
+
+
+class StubChatModel(BaseChatModel):
+    answer: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _tokens(self) -> List[str]:
+        words = self.answer.split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(PER_TOKEN_S * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self._tokens():
+            await asyncio.sleep(PER_TOKEN_S)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def install_stubs():
+    config.GEMINI_API_KEY = "benchmark-key"
+    notes_model = StubChatModel(answer=NOTES_ANSWER)
+    config.llm = ai_notes.llm = notes_model
+    model_registry._chat_models[chat.CHAT_TEXT_MODEL] = StubChatModel(answer=CHAT_ANSWER)
+    model_registry._chains.clear()
+
+
+def start_server() -> int:
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.include_router(notes.router)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+async def measure(client: httpx.AsyncClient, path: str, body: dict):
+    start = time.perf_counter()
+    ttfb = None
+    async with client.stream("POST", path, json=body) as response:
+        async for chunk in response.aiter_bytes():
+            if ttfb is None and chunk.strip():
+                ttfb = time.perf_counter() - start
+    return ttfb, time.perf_counter() - start
+
+
+async def main():
+    install_stubs()
+    port = start_server()
+
+    chat_body = {"user_prompt": "why does it curve?", "topic": "Projectile Motion", "variables": ["U", "theta"]}
+    notes_body = {"topic": "Projectile Motion", "previous_notes": {}, "user_prompt": "explain the range formula"}
+
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        headers={"Authorization": "Bearer test-token"},
+        timeout=60,
+    ) as client:
+        print(f"stub model: {PER_TOKEN_S * 1000:.0f} ms/token")
+        for path, body in (
+            ("/chat/ask", chat_body),
+            ("/chat/ask/stream", chat_body),
+            ("/notes/ask", notes_body),
+            ("/notes/ask/stream", notes_body),
+        ):
+            ttfb, total = await measure(client, path, body)
+            print(f"{path:<20} ttfb={ttfb * 1000:8.1f} ms   total={total * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
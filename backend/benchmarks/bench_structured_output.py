@@ -0,0 +1,131 @@
+"""
+Recovery rate and retry cost of malformed notes JSON: the old
+clean_json_output (strip fences + json.loads, None on failure, which then
+meant a whole new request) vs services/structured_output.py (tolerant
+repair + regenerating only the broken fields).
+
+A realistic notes response is corrupted the ways Gemini output goes wrong
+(fences, prose around the JSON, trailing commas, raw newlines, invalid LaTeX
+escapes, Python literals, single quotes, cut off by the output token limit).
+Retry cost is in estimated tokens (prompt + output) and assumes the retry
+itself succeeds; no model is called.
+
+Run from the backend directory:
+    python benchmarks/bench_structured_output.py
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.notes_models import NotesResponse  # noqa: E402
+from services.ai_notes import NOTES_GENERATE_PROMPT  # noqa: E402
+from services.structured_output import _section_prompt, parse_structured  # noqa: E402
+from utils.token_utils import estimate_tokens  # noqa: E402
+
+NOTES = {
+    "explanation": "Projectile motion is the motion of an object launched into the air and moving under gravity alone. "
+                   "The horizontal velocity stays constant while the vertical velocity changes at g every second.\n\n"
+                   "Splitting the launch velocity into components makes every quantity a one-dimensional problem.",
+    "variable_breakdown": {"u": "launch speed in m/s", "θ": "launch angle above the horizontal", "g": "gravitational acceleration, 9.8 m/s²", "R": "horizontal range in m"},
+    "formulas": ["R = u² sin 2θ / g — range on level ground", "H = u² sin² θ / 2g — maximum height", "T = 2u sin θ / g — time of flight"],
+    "example": "A ball is kicked at 20 m/s at 30°. T = 2·20·0.5/9.8 = 2.04 s, R = 400·0.866/9.8 = 35.3 m, H = 400·0.25/19.6 = 5.1 m.",
+    "mistakes": ["Using sin θ instead of sin 2θ in the range formula", "Forgetting that horizontal velocity is constant", "Taking g as positive upward"],
+    "practice_questions": ["Find the range at 45° for u = 15 m/s.", "At what two angles is the range 20 m for u = 18 m/s?", "How long is a ball in the air when thrown at 12 m/s at 60°?"],
+    "summary": ["Split velocity into components", "Horizontal motion is uniform", "Vertical motion has constant acceleration g"],
+    "resources": ["https://www.khanacademy.org/science/physics/two-dimensional-motion", "http://hyperphysics.phy-astr.gsu.edu/hbase/traj.html"],
+}
+PRETTY = json.dumps(NOTES, ensure_ascii=False, indent=2)
+
+
+def _truncate(fraction):
+    return lambda text: text[: int(len(text) * fraction)]
+
+
+CORRUPTIONS = {
+    "clean": lambda text: text,
+    "fenced": lambda text: f"```json\n{text}\n```",
+    "prose around": lambda text: f"Here are your study notes:\n{text}\nLet me know if you need more!",
+    "trailing commas": lambda text: re.sub(r"(\]|\"|\})(\n\s*[\]\}])", r"\1,\2", text),
+    "raw newlines": lambda text: text.replace("\\n\\n", "\n\n"),
+    "latex escapes": lambda text: text.replace("sin 2θ", "\\\\sin 2\\\\theta").replace("\\\\", "\\").replace("θ", "\\alpha", 1),
+    "python literals": lambda text: text.replace('"resources": [', '"resources": None, "extra": True, "r": ['),
+    "single quotes": lambda text: text.replace('"', "'"),
+    "truncated 95%": _truncate(0.95),
+    "truncated 80%": _truncate(0.80),
+    "truncated 50%": _truncate(0.50),
+}
+
+
+def old_clean_json_output(text):
+    text = text.strip()
+    text = re.sub(r"```json", "", text)
+    text = re.sub(r"```", "", text)
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except Exception:
+        return None
+
+
+def old_ok(text):
+    data = old_clean_json_output(text)
+    if data is None:
+        return False
+    try:
+        NotesResponse(**data)
+        return True
+    except Exception:
+        return False
+
+
+def timed(fn, text, runs=300):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(text)
+    return (time.perf_counter() - start) * 1e6 / runs
+
+
+def main():
+    prompt_tokens = estimate_tokens(NOTES_GENERATE_PROMPT.format(topic="Projectile Motion", variables=["u", "θ", "g"]))
+    full_retry = prompt_tokens + estimate_tokens(PRETTY)
+    context = 'Structured STEM study notes for a scanned problem. Topic: "Projectile Motion". Variables: ["u", "θ", "g"].'
+
+    header = f"{'case':<16} {'old ok':>6} {'new ok':>6} {'missing':>28} {'old retry tok':>13} {'new retry tok':>13} {'old µs':>7} {'new µs':>7}"
+    print(header)
+    print("-" * len(header))
+
+    totals = {"old": 0, "new": 0}
+    for name, corrupt in CORRUPTIONS.items():
+        text = corrupt(PRETTY)
+        result = parse_structured(text, NotesResponse)
+        ok_old = old_ok(text)
+
+        old_cost = 0 if ok_old else full_retry
+        new_cost = 0
+        if result.missing:
+            section_prompt = _section_prompt(NotesResponse, result.data, result.missing, context)
+            section_output = json.dumps({field: NOTES[field] for field in result.missing}, ensure_ascii=False)
+            new_cost = estimate_tokens(section_prompt) + estimate_tokens(section_output)
+        totals["old"] += old_cost
+        totals["new"] += new_cost
+
+        missing = ",".join(result.missing) or "-"
+        if len(missing) > 28:
+            missing = f"{len(result.missing)} fields"
+        print(
+            f"{name:<16} {'yes' if ok_old else 'no':>6} {'yes' if not result.missing else 'part':>6} {missing:>28} "
+            f"{old_cost:>13} {new_cost:>13} {timed(old_clean_json_output, text):>7.1f} "
+            f"{timed(lambda t: parse_structured(t, NotesResponse), text):>7.1f}"
+        )
+
+    print(f"\nFull request retry: ~{full_retry} tokens (prompt {prompt_tokens} + output {full_retry - prompt_tokens}), plus the user's wait")
+    print(f"Retry tokens over all cases: old {totals['old']}, new {totals['new']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+/visualiser/generate template lookup: per-request file read + exact-match
+dict (the old visualiser_loader) vs the preloaded registry with its alias and
+token index and precomputed response body.
+
+Times ITERATIONS lookups over topic strings shaped like detect_topic output.
+It also prints which topics each approach resolves: the old loader only knew
+eight exact strings, so kinematics and optics were unreachable. Topics with no
+matching simulation must still get none; the script exits non-zero if any of
+them resolves to a template.
+
+Run from the backend directory:
+    python benchmarks/bench_template_lookup.py [iterations]
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import visualiser_loader  # noqa: E402
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+OLD_TOPIC_TO_TEMPLATE = {
+    "projectile motion": "projectile_motion.json",
+    "projectile_motion": "projectile_motion.json",
+    "projectile": "projectile_motion.json",
+    "free fall": "free_fall.json",
+    "free_fall": "free_fall.json",
+    "shm": "shm.json",
+    "simple harmonic motion": "shm.json",
+    "harmonic": "shm.json",
+}
+
+TOPICS = [
+    "Projectile Motion",
+    "projectile motion of a ball",
+    "Free Fall",
+    "Free-fall under gravity",
+    "Simple Harmonic Motion",
+    "SHM of a mass-spring system",
+    "Kinematics",
+    "Uniformly Accelerated Motion",
+    "Convex Lens",
+    "Optics: lens formula",
+    "Projectle motion",
+    "Thermodynamics",
+]
+
+# Share a generic or look-alike word with an alias, but no template fits.
+UNMATCHED_TOPICS = [
+    "Linear algebra",
+    "Chemical kinetics",
+    "Uniform circular motion",
+    "Constant velocity",
+    "Accelerated motion of electrons",
+    "Simple pendulum",
+    "Free body diagram",
+]
+
+
+def old_lookup(topic):
+    filename = OLD_TOPIC_TO_TEMPLATE.get(topic.strip().lower())
+    if not filename:
+        return None
+    with open(os.path.join(visualiser_loader.TEMPLATES_DIR, filename), "r", encoding="utf-8") as f:
+        template = json.load(f)
+    return json.dumps({"template_id": template["template_id"], "template": template}).encode("utf-8")
+
+
+def new_lookup(topic):
+    template = visualiser_loader.resolve_template(topic)
+    return template.generate_body if template else None
+
+
+def time_lookups(fn, topics):
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(topics[i % len(topics)])
+    return (time.perf_counter() - start) / ITERATIONS * 1_000_000
+
+
+def main():
+    start = time.perf_counter()
+    visualiser_loader.load_templates()
+    print(f"registry build: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    print(f"{'topic':<32} {'old':<20} registry")
+    for topic in TOPICS:
+        old = old_lookup(topic)
+        new = visualiser_loader.resolve_template(topic)
+        print(
+            f"{topic:<32} {json.loads(old)['template_id'] if old else '-':<20} "
+            f"{new.template_id if new else '-'}"
+        )
+
+    wrong = {}
+    for topic in UNMATCHED_TOPICS:
+        template = visualiser_loader.resolve_template(topic)
+        print(f"{topic:<32} {'-':<20} {template.template_id if template else '-'}")
+        if template is not None:
+            wrong[topic] = template.template_id
+
+    # Only topics both resolve, so the old loader's free misses don't flatter it.
+    both = [topic for topic in TOPICS if old_lookup(topic)]
+    print(f"old loader: {time_lookups(old_lookup, both):7.2f} us/lookup")
+    print(f"registry:   {time_lookups(new_lookup, both):7.2f} us/lookup")
+    print(f"registry:   {time_lookups(new_lookup, TOPICS):7.2f} us/lookup over all topics above")
+
+    if wrong:
+        raise SystemExit(f"topics without a simulation resolved to a template: {wrong}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Per-request auth overhead: verifying the Firebase ID token every time vs the
+verified-token cache in auth/token_cache.py.
+
+Tokens are RS256 JWTs signed locally with a throwaway key. The fake
+`verify_id_token` checks them the way firebase_admin does (google.auth.jwt
+signature + claim checks against a cert map), minus the network cert fetch,
+so the numbers are a lower bound on the real cost of a miss.
+
+A chat session sends REQUESTS_PER_SESSION requests with the same token; many
+sessions run concurrently. "direct" verifies synchronously on the event loop
+like require_firebase_user used to; "cached" goes through
+verify_firebase_token_cached.
+
+Run from the backend directory:
+    python benchmarks/bench_token_verification.py [sessions] [requests_per_session]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cryptography import x509  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from cryptography.x509.oid import NameOID  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+
+from auth import firebase, token_cache  # noqa: E402
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+REQUESTS_PER_SESSION = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+PROJECT_ID = "stemly-bench"
+KEY_ID = "bench-key"
+
+
+def make_signing_material():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(1)
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode("ascii")
+    return crypt.RSASigner.from_string(private_pem, key_id=KEY_ID), {KEY_ID: cert_pem}
+
+
+def make_token(signer, uid: str) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "uid": uid,
+        "email": f"{uid}@stemly.app",
+        "name": uid,
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return jwt.encode(signer, payload).decode("ascii")
+
+
+def install_fake_firebase(certs):
+    def verify_id_token(id_token, app=None):
+        return jwt.decode(id_token, certs=certs, audience=PROJECT_ID)
+
+    firebase._initialize_app = lambda: None
+    firebase.firebase_auth.verify_id_token = verify_id_token
+
+
+async def direct(id_token):
+    return firebase.verify_firebase_token(id_token)
+
+
+async def run(label, verify, tokens):
+    per_request = []
+
+    async def session(id_token):
+        for _ in range(REQUESTS_PER_SESSION):
+            start = time.perf_counter()
+            await verify(id_token)
+            per_request.append((time.perf_counter() - start) * 1_000_000)
+            # Yield like a real request would between auth and the next call.
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(t) for t in tokens))
+    elapsed = time.perf_counter() - start
+
+    per_request.sort()
+    total = len(per_request)
+    print(
+        f"{label:<7} requests={total} mean={sum(per_request) / total:8.1f} us "
+        f"p50={per_request[total // 2]:8.1f} us p99={per_request[int(total * 0.99) - 1]:8.1f} us "
+        f"wall={elapsed:6.3f}s"
+    )
+
+
+def main():
+    signer, certs = make_signing_material()
+    install_fake_firebase(certs)
+    tokens = [make_token(signer, f"user-{i}") for i in range(SESSIONS)]
+
+    print(f"{SESSIONS} sessions x {REQUESTS_PER_SESSION} requests, RS256 tokens")
+    asyncio.run(run("direct", direct, tokens))
+    asyncio.run(run("cached", token_cache.verify_firebase_token_cached, tokens))
+    print(f"cache stats: {token_cache.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Parameter sweep cost: one simulate() per combination (what N calls to
+/visualiser/update do server-side, before any network round trips) vs the
+chunked, vectorized evaluation behind /visualiser/sweep.
+
+Both include building the JSON frame. The per-combination loop is capped at
+LOOP_CAP combinations and extrapolated beyond that.
+
+Run from the backend directory:
+    python benchmarks/bench_visualiser_sweep.py [template_id]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from routers import visualiser_sweep  # noqa: E402
+from services import simulation, visualiser_loader  # noqa: E402
+
+TEMPLATE_ID = sys.argv[1] if len(sys.argv) > 1 else "projectile_motion"
+SIZES = [1_000, 10_000, 50_000, 100_000]
+LOOP_CAP = 5_000
+
+
+def main():
+    data = visualiser_loader.load_templates().templates[TEMPLATE_ID].data
+    specs = data["parameters"]
+    names = list(specs)
+
+    for size in SIZES:
+        # Split the combinations over the first two parameters.
+        first = int(np.sqrt(size))
+        second = size // first
+        axes = {
+            names[0]: np.linspace(specs[names[0]]["min"], specs[names[0]]["max"], first),
+            names[1]: np.linspace(specs[names[1]]["min"], specs[names[1]]["max"], second),
+        }
+        fixed = {name: float(specs[name]["value"]) for name in names[2:]}
+        combinations = first * second
+
+        looped = min(combinations, LOOP_CAP)
+        block = simulation.grid_block(axes, fixed, 0, looped)
+        start = time.perf_counter()
+        for i in range(looped):
+            result = simulation.simulate(data, {name: float(block[name][i]) for name in block}, 2)
+            json.dumps(result["summary"])
+        loop_seconds = (time.perf_counter() - start) * combinations / looped
+
+        start = time.perf_counter()
+        payload = 0
+        offset = 0
+        while offset < combinations:
+            count = min(visualiser_sweep.SWEEP_CHUNK_SIZE, combinations - offset)
+            frame = visualiser_sweep._evaluate(TEMPLATE_ID, axes, fixed, offset, count, 2, False)
+            payload += len(json.dumps(frame))
+            offset += count
+        sweep_seconds = time.perf_counter() - start
+
+        print(
+            f"{combinations:>7} combinations  per-call loop {loop_seconds * 1000:9.1f} ms"
+            f"{' (extrapolated)' if looped < combinations else '               '}  "
+            f"sweep {sweep_seconds * 1000:7.1f} ms  ({combinations / sweep_seconds / 1e6:.2f} M/s, "
+            f"{payload / 1024:.0f} KB NDJSON)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Response-path cost of persisting history/notes/visualiser records: awaited
+insert_one per request vs the write-behind queue in database/write_behind.py.
+
+A fake collection charges DB_LATENCY per round trip (insert_one or
+insert_many, whatever the size) and counts calls. USERS users each do
+SAVES_PER_USER saves a few ms apart, like scans plus slider-driven
+/visualiser/update calls. The "write-behind" run drains the queue with stop()
+at the end and checks that every record arrived. Halfway through it injects one
+failed insert_many to exercise the retry path.
+
+Run from the backend directory:
+    python benchmarks/bench_write_behind.py [users] [saves_per_user]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo.errors import AutoReconnect  # noqa: E402
+
+from database import visualiser_model, write_behind as write_behind_module  # noqa: E402
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+SAVES_PER_USER = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+DB_LATENCY = 0.005
+SAVE_GAP = 0.01
+
+
+class FakeCollection:
+    name = "visualiser"
+
+    def __init__(self, fail_once_after=None):
+        self.docs = {}
+        self.round_trips = 0
+        self.fail_once_after = fail_once_after
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(DB_LATENCY)
+        self.round_trips += 1
+        self.docs[doc.setdefault("_id", len(self.docs))] = doc
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(DB_LATENCY)
+        self.round_trips += 1
+        if self.fail_once_after is not None and len(self.docs) >= self.fail_once_after:
+            self.fail_once_after = None
+            raise AutoReconnect("connection reset by peer")
+        for doc in docs:
+            self.docs[doc["_id"]] = doc
+
+
+async def run(label, queued, coalesce):
+    total = USERS * SAVES_PER_USER
+    collection = FakeCollection(fail_once_after=total // 4 if queued else None)
+    visualiser_model.visualiser_collection = collection
+    queue = write_behind_module.WriteBehindQueue(0.1, 100, 10_000)
+    visualiser_model.write_behind = queue
+    per_request = []
+
+    async def user(i):
+        for step in range(SAVES_PER_USER):
+            parameters = {"U": step, "theta": 45}
+            start = time.perf_counter()
+            if queued:
+                await visualiser_model.save_visualiser_entry(
+                    f"user-{i}", "projectile_motion", parameters, coalesce=coalesce
+                )
+            else:
+                await collection.insert_one({"user_id": f"user-{i}", "parameters": parameters})
+            per_request.append((time.perf_counter() - start) * 1_000_000)
+            await asyncio.sleep(SAVE_GAP)
+
+    await asyncio.gather(*(user(i) for i in range(USERS)))
+    depth_before_drain = queue.depth()
+    await queue.stop()
+
+    per_request.sort()
+    print(
+        f"{label:<22} saves={len(per_request)} p50={per_request[len(per_request) // 2]:8.1f} us "
+        f"p99={per_request[int(len(per_request) * 0.99) - 1]:8.1f} us "
+        f"round_trips={collection.round_trips:<5} stored={len(collection.docs):<5} "
+        f"drained_at_shutdown={depth_before_drain}"
+    )
+    if queued:
+        print(f"{'':<22} queue stats: {queue.stats()}")
+
+
+def main():
+    print(f"{USERS} users x {SAVES_PER_USER} saves, db latency {DB_LATENCY * 1000:.0f} ms")
+    asyncio.run(run("insert_one", queued=False, coalesce=False))
+    asyncio.run(run("write-behind", queued=True, coalesce=False))
+    asyncio.run(run("write-behind+coalesce", queued=True, coalesce=True))
+
+
+if __name__ == "__main__":
+    main()
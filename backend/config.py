@@ -11,6 +11,15 @@ load_dotenv()
 # Gemini API key used for both LangChain LLM and direct google.generativeai calls.
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Maximum number of concurrent Gemini calls per worker process.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+# ...and per model name, so one busy model cannot starve the others.
+AI_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("AI_MAX_CONCURRENCY_PER_MODEL", "8"))
+
+# Retries for rate-limited (429) or failed (5xx) Gemini calls, with jittered backoff.
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+
 llm = None  # type: ignore
 
 if not GEMINI_API_KEY:
@@ -0,0 +1,79 @@
+# backend/database/detection_cache_model.py
+
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from .db import db
+
+DETECTION_CACHE_TTL_SECONDS = int(os.getenv("DETECTION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+DETECTION_CACHE_MAX_ENTRIES = int(os.getenv("DETECTION_CACHE_MAX_ENTRIES", "50000"))
+
+# Handle case where db is None
+detection_cache_collection = db["detection_cache"] if db is not None else None
+
+
+async def ensure_detection_cache_indexes():
+    """TTL index on `expires_at` lets MongoDB expire entries on its own."""
+    if detection_cache_collection is None:
+        return
+
+    await detection_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+    await detection_cache_collection.create_index([("last_used", ASCENDING)])
+
+
+async def get_cached_detection(content_hash: str) -> Optional[Tuple[str, List[str]]]:
+    """Return the cached (topic, variables) for a scan hash, or None on a miss."""
+    if not content_hash or detection_cache_collection is None:
+        return None
+
+    now = datetime.utcnow()
+    doc = await detection_cache_collection.find_one_and_update(
+        {"_id": content_hash, "expires_at": {"$gt": now}},
+        {"$set": {"last_used": now}, "$inc": {"hits": 1}},
+    )
+    if doc is None:
+        return None
+
+    return doc["topic"], doc.get("variables", [])
+
+
+async def save_cached_detection(content_hash: str, topic: str, variables: List[str]):
+    if not content_hash or detection_cache_collection is None:
+        return
+
+    now = datetime.utcnow()
+    await detection_cache_collection.update_one(
+        {"_id": content_hash},
+        {
+            "$set": {
+                "topic": topic,
+                "variables": variables,
+                "last_used": now,
+                "expires_at": now + timedelta(seconds=DETECTION_CACHE_TTL_SECONDS),
+            },
+            "$setOnInsert": {"created_at": now, "hits": 0},
+        },
+        upsert=True,
+    )
+
+    await _evict_overflow()
+
+
+async def _evict_overflow():
+    """Keep the cache bounded by dropping the least recently used entries."""
+    count = await detection_cache_collection.estimated_document_count()
+    overflow = count - DETECTION_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+
+    cursor = (
+        detection_cache_collection.find({}, {"_id": 1})
+        .sort("last_used", ASCENDING)
+        .limit(overflow)
+    )
+    stale_ids = [doc["_id"] async for doc in cursor]
+    if stale_ids:
+        await detection_cache_collection.delete_many({"_id": {"$in": stale_ids}})
@@ -1,13 +1,19 @@
 # backend/database/history_model.py
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 
 from .db import db
+from .pagination import fetch_timeline_page
+from .write_behind import write_behind
 
 # Handle case where db is None
 scans_collection = db["scans"] if db is not None else None
 
+# Fields the history list view needs; served by the (user_id, timestamp) index.
+HISTORY_LIST_PROJECTION = {"topic": 1, "variables": 1, "image_path": 1, "timestamp": 1}
+MAX_HISTORY_LIMIT = 100
+
 
 async def save_scan_history(user_id: str, topic: str, variables: list, image_path: str):
     if not user_id:
@@ -25,22 +31,18 @@ async def save_scan_history(user_id: str, topic: str, variables: list, image_pat
         print("⚠ Database disabled, skipping save_scan_history")
         return "no-db-record"
 
-    result = await scans_collection.insert_one(doc)
-    return str(result.inserted_id)
+    return await write_behind.put(scans_collection, doc)
 
 
-async def get_user_history(user_id: str) -> List[dict]:
+async def get_user_history(
+    user_id: str, limit: int = 50, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of scan history, newest first. Returns (history, next_cursor)."""
     if not user_id:
-        return []
+        return [], None
 
     if scans_collection is None:
-        return []
-
-    history: List[dict] = []
-    cursor = scans_collection.find({"user_id": user_id}).sort("timestamp", -1)
-
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        history.append(doc)
+        return [], None
 
-    return history
\ No newline at end of file
+    limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+    return await fetch_timeline_page(scans_collection, user_id, HISTORY_LIST_PROJECTION, limit, cursor)
@@ -0,0 +1,86 @@
+# backend/database/idempotency_model.py
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import mongo_insert_seconds
+
+from .db import db
+
+# Completed responses are replayed for repeated Idempotency-Keys this long.
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+
+# Handle case where db is None (keys then live only in the worker's memory)
+idempotency_collection = db["idempotency_keys"] if db is not None else None
+
+
+async def ensure_idempotency_indexes():
+    if idempotency_collection is None:
+        return
+
+    await idempotency_collection.create_index("expires_at", expireAfterSeconds=0)
+
+
+async def claim_idempotency_key(key_id: str, fingerprint: str, lock_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Mark `key_id` as in progress for this request. Returns None when claimed,
+    otherwise the existing record. A record whose lock or TTL has lapsed (the
+    TTL monitor only runs once a minute) is taken over.
+    """
+    if idempotency_collection is None:
+        return None
+
+    now = datetime.utcnow()
+    record = {
+        "fingerprint": fingerprint,
+        "status": "in_progress",
+        "response": None,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=lock_seconds),
+    }
+    try:
+        with mongo_insert_seconds.time(collection="idempotency_keys"):
+            await idempotency_collection.insert_one({"_id": key_id, **record})
+        return None
+    except DuplicateKeyError:
+        pass
+
+    taken_over = await idempotency_collection.find_one_and_update(
+        {"_id": key_id, "expires_at": {"$lte": now}},
+        {"$set": record},
+    )
+    if taken_over is not None:
+        return None
+    return await idempotency_collection.find_one({"_id": key_id}) or {"fingerprint": fingerprint, "status": "in_progress"}
+
+
+async def get_idempotency_key(key_id: str) -> Optional[Dict[str, Any]]:
+    if idempotency_collection is None:
+        return None
+    return await idempotency_collection.find_one({"_id": key_id})
+
+
+async def complete_idempotency_key(key_id: str, response: Any):
+    if idempotency_collection is None:
+        return
+
+    now = datetime.utcnow()
+    await idempotency_collection.update_one(
+        {"_id": key_id},
+        {"$set": {
+            "status": "completed",
+            "response": response,
+            "completed_at": now,
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        }},
+    )
+
+
+async def release_idempotency_key(key_id: str):
+    """Drop an in-progress key whose request failed, so a retry runs it again."""
+    if idempotency_collection is None:
+        return
+    await idempotency_collection.delete_one({"_id": key_id, "status": "in_progress"})
@@ -0,0 +1,35 @@
+# backend/database/indexes.py
+
+from pymongo import ASCENDING, DESCENDING
+
+from .db import db
+from .detection_cache_model import ensure_detection_cache_indexes
+from .idempotency_model import ensure_idempotency_indexes
+from .jobs_model import ensure_jobs_indexes
+from .notes_cache_model import ensure_notes_cache_indexes
+
+# Every per-user listing filters on user_id and pages newest first by
+# (timestamp, _id); see database/pagination.py.
+USER_TIMELINE_COLLECTIONS = ("scans", "notes", "visualiser")
+USER_TIMELINE_INDEX = [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+
+async def ensure_indexes():
+    """
+    Create the indexes the app relies on. Safe to run on every startup:
+    `create_index` is a no-op when an identical index already exists.
+    """
+    if db is None:
+        return
+
+    for name in USER_TIMELINE_COLLECTIONS:
+        collection = db[name]
+        await collection.create_index(USER_TIMELINE_INDEX, name="user_id_timestamp_id_desc")
+        # Superseded by the index above, which has it as a prefix.
+        if "user_id_timestamp_desc" in await collection.index_information():
+            await collection.drop_index("user_id_timestamp_desc")
+
+    await ensure_detection_cache_indexes()
+    await ensure_notes_cache_indexes()
+    await ensure_jobs_indexes()
+    await ensure_idempotency_indexes()
@@ -0,0 +1,103 @@
+# backend/database/jobs_model.py
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.metrics import mongo_insert_seconds
+
+from .db import db
+
+# Finished jobs (and their results) are kept this long for polling, then expire.
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", str(24 * 3600)))
+
+# Handle case where db is None (jobs then live only in the worker's memory)
+jobs_collection = db["jobs"] if db is not None else None
+
+
+async def ensure_jobs_indexes():
+    if jobs_collection is None:
+        return
+
+    await jobs_collection.create_index("expires_at", expireAfterSeconds=0)
+    await jobs_collection.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
+    # One job per (user, kind, idempotency key); jobs without a key are not constrained.
+    await jobs_collection.create_index(
+        [("user_id", ASCENDING), ("kind", ASCENDING), ("idempotency_key", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"idempotency_key": {"$type": "string"}},
+        name="user_kind_idempotency_key",
+    )
+
+
+def job_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+
+
+async def insert_job(job: Dict[str, Any]) -> bool:
+    """False when a job with the same idempotency key already exists."""
+    if jobs_collection is None:
+        return True
+
+    try:
+        with mongo_insert_seconds.time(collection="jobs"):
+            await jobs_collection.insert_one(job)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if jobs_collection is None:
+        return None
+    return await jobs_collection.find_one({"_id": job_id})
+
+
+async def find_job_by_key(user_id: str, kind: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+    if jobs_collection is None:
+        return None
+    return await jobs_collection.find_one(
+        {"user_id": user_id, "kind": kind, "idempotency_key": idempotency_key}
+    )
+
+
+async def claim_job(job_id: str, worker: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically move a queued job to running. None if another worker (or
+    process) got there first. Without a database every claim succeeds.
+    """
+    if jobs_collection is None:
+        return {}
+
+    now = datetime.utcnow()
+    return await jobs_collection.find_one_and_update(
+        {"_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "worker": worker, "started_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def update_job(job_id: str, fields: Dict[str, Any]):
+    if jobs_collection is None:
+        return
+    await jobs_collection.update_one({"_id": job_id}, {"$set": fields})
+
+
+async def requeue_stale_jobs(stale_seconds: float) -> List[Dict[str, Any]]:
+    """
+    Jobs left running by a worker that died (no update for `stale_seconds`)
+    go back to queued. Returns every queued job, for the caller to schedule.
+    """
+    if jobs_collection is None:
+        return []
+
+    now = datetime.utcnow()
+    await jobs_collection.update_many(
+        {"status": "running", "updated_at": {"$lt": now - timedelta(seconds=stale_seconds)}},
+        {"$set": {"status": "queued", "updated_at": now}},
+    )
+    cursor = jobs_collection.find({"status": "queued"}).sort("created_at", ASCENDING)
+    return [job async for job in cursor]
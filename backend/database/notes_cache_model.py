@@ -0,0 +1,49 @@
+# backend/database/notes_cache_model.py
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .db import db
+
+NOTES_CACHE_TTL_SECONDS = int(os.getenv("NOTES_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Sibling of `notes`: one shared document per cache key, not per user.
+notes_cache_collection = db["notes_cache"] if db is not None else None
+
+
+async def ensure_notes_cache_indexes():
+    if notes_cache_collection is None:
+        return
+
+    await notes_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+
+
+async def get_cached_notes(cache_key: str) -> Optional[Dict[str, Any]]:
+    if not cache_key or notes_cache_collection is None:
+        return None
+
+    doc = await notes_cache_collection.find_one(
+        {"_id": cache_key, "expires_at": {"$gt": datetime.utcnow()}},
+        {"notes": 1},
+    )
+    return doc["notes"] if doc else None
+
+
+async def save_cached_notes(cache_key: str, notes_payload: Dict[str, Any], meta: Dict[str, Any]):
+    if not cache_key or notes_cache_collection is None:
+        return
+
+    now = datetime.utcnow()
+    await notes_cache_collection.update_one(
+        {"_id": cache_key},
+        {
+            "$set": {
+                "notes": notes_payload,
+                **meta,
+                "expires_at": now + timedelta(seconds=NOTES_CACHE_TTL_SECONDS),
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
+    )
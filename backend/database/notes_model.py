@@ -2,10 +2,16 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 from .db import db
+from .pagination import fetch_timeline_page
+from .write_behind import write_behind
 
 # Handle case where db is None
 notes_collection = db["notes"] if db is not None else None
 
+# List views only show the topic and a short recap, not the full notes body.
+NOTES_LIST_PROJECTION = {"topic": 1, "image_path": 1, "timestamp": 1, "notes.summary": 1}
+MAX_NOTES_LIMIT = 100
+
 
 async def save_notes_entry(
     user_id: str,
@@ -28,22 +34,13 @@ async def save_notes_entry(
         print("⚠ Database disabled, skipping save_notes_entry")
         return "no-db-record"
 
-    result = await notes_collection.insert_one(doc)
-    return str(result.inserted_id)
+    return await write_behind.put(notes_collection, doc)
 
 
-async def get_notes_for_user(user_id: str, limit: int = 20):
+async def get_notes_for_user(user_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """One page of saved notes, newest first. Returns (notes, next_cursor)."""
     if not user_id or notes_collection is None:
-        return []
-
-    cursor = (
-        notes_collection.find({"user_id": user_id})
-        .sort("timestamp", -1)
-        .limit(limit)
-    )
-
-    notes = []
-    async for entry in cursor:
-        entry["_id"] = str(entry["_id"])
-        notes.append(entry)
-    return notes
+        return [], None
+
+    limit = max(1, min(limit, MAX_NOTES_LIMIT))
+    return await fetch_timeline_page(notes_collection, user_id, NOTES_LIST_PROJECTION, limit, cursor)
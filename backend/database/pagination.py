@@ -0,0 +1,63 @@
+# backend/database/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Keyset order for every per-user timeline: newest first, _id breaks ties.
+TIMELINE_SORT = [("timestamp", -1), ("_id", -1)]
+
+
+def encode_cursor(timestamp: datetime, object_id: Any) -> str:
+    """Opaque token pointing just past the given (timestamp, _id)."""
+    payload = json.dumps({"t": timestamp.isoformat(), "id": str(object_id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError if the token was not produced by `encode_cursor`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError, InvalidId) as exc:
+        raise ValueError("Invalid pagination cursor.") from exc
+
+
+async def fetch_timeline_page(
+    collection,
+    user_id: str,
+    projection: Dict[str, int],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of a user's records, newest first, using keyset pagination on
+    (timestamp, _id). Each page is a bounded index range scan no matter how deep
+    it is, unlike skip/offset. Returns (items, next_cursor).
+    """
+    query: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        timestamp, object_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": object_id}},
+        ]
+
+    # Fetch one extra document to learn whether another page exists.
+    docs = await collection.find(query, projection).sort(TIMELINE_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last["timestamp"], last["_id"])
+
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    return docs, next_cursor
@@ -1,48 +1,133 @@
+import asyncio
+import os
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
 
 from .db import db
 
 # Handle case where db is None (MongoDB disabled)
 users_collection = db["users"] if db is not None else None
 
+# Logins are buffered and written in one bulk_write per window; repeat
+# requests from the same uid inside a window collapse into a single upsert.
+USER_LOGIN_FLUSH_SECONDS = float(os.getenv("USER_LOGIN_FLUSH_SECONDS", "5"))
+USER_LOGIN_MAX_PENDING = int(os.getenv("USER_LOGIN_MAX_PENDING", "500"))
+
+
+class UserLoginBatcher:
+    """
+    Debounces user upserts off the request path. `add` only records the
+    latest profile per uid; a background task flushes everything pending with
+    `bulk_write` every window, or early once `max_pending` uids are waiting.
+    """
+
+    def __init__(self, window: float, max_pending: int):
+        self.window = window
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.stats = {"queued": 0, "coalesced": 0, "flushes": 0, "written": 0, "errors": 0}
+
+    def add(self, user_info: Dict[str, Optional[str]]):
+        uid = user_info.get("uid")
+        if not uid:
+            raise ValueError("Firebase user info missing 'uid'.")
+
+        now = datetime.utcnow()
+        previous = self._pending.get(uid)
+        if previous is not None:
+            self.stats["coalesced"] += 1
+
+        self._pending[uid] = {
+            "name": user_info.get("name"),
+            "email": user_info.get("email"),
+            "profile_pic": user_info.get("picture"),
+            "first_seen": previous["first_seen"] if previous else now,
+            "last_login": now,
+        }
+        self.stats["queued"] += 1
+
+        self._ensure_started()
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending or users_collection is None:
+            return
+
+        batch, self._pending = self._pending, {}
+        operations = [
+            UpdateOne(
+                {"_id": uid},
+                {
+                    "$set": {
+                        "name": entry["name"],
+                        "email": entry["email"],
+                        "profile_pic": entry["profile_pic"],
+                        "last_login": entry["last_login"],
+                    },
+                    "$setOnInsert": {"created_at": entry["first_seen"]},
+                },
+                upsert=True,
+            )
+            for uid, entry in batch.items()
+        ]
+
+        try:
+            await users_collection.bulk_write(operations, ordered=False)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            print(f"⚠ Failed to flush {len(operations)} user logins, retrying next window: {exc}")
+            # Newer logins that arrived during the write take precedence.
+            for uid, entry in batch.items():
+                self._pending.setdefault(uid, entry)
+            return
+
+        self.stats["flushes"] += 1
+        self.stats["written"] += len(operations)
+
+    async def stop(self):
+        """Let the background task finish its current flush, then write whatever is left."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+
+login_batcher = UserLoginBatcher(USER_LOGIN_FLUSH_SECONDS, USER_LOGIN_MAX_PENDING)
+
 
-async def record_user_login(user_info: Dict[str, Optional[str]]):
+def record_user_login(user_info: Dict[str, Optional[str]]):
     """
-    Upsert the authenticated user inside MongoDB.
+    Queue an upsert of the authenticated user. Returns immediately; the write
+    happens in the next batch flush.
     """
     # Skip if database is disabled
     if users_collection is None:
         return
 
-    uid = user_info.get("uid")
-    if not uid:
-        raise ValueError("Firebase user info missing 'uid'.")
-
-    now = datetime.utcnow()
-
-    doc = {
-        "_id": uid,
-        "name": user_info.get("name"),
-        "email": user_info.get("email"),
-        "profile_pic": user_info.get("picture"),
-        "created_at": now,
-        "last_login": now,
-    }
-
-    await users_collection.update_one(
-        {"_id": uid},
-        {
-            "$set": {
-                "name": doc["name"],
-                "email": doc["email"],
-                "profile_pic": doc["profile_pic"],
-                "last_login": doc["last_login"],
-            },
-            "$setOnInsert": {"created_at": doc["created_at"]},
-        },
-        upsert=True,
-    )
+    login_batcher.add(user_info)
 
 
 async def get_user(uid: str):
@@ -1,13 +1,27 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Optional
 
 from .db import db
+from .pagination import fetch_timeline_page
+from .write_behind import write_behind
 
 # Handle case where db is None
 visualiser_collection = db["visualiser"] if db is not None else None
 
+VISUALISER_LIST_PROJECTION = {"template_id": 1, "parameters": 1, "timestamp": 1}
+MAX_VISUALISER_LIMIT = 100
 
-async def save_visualiser_entry(user_id: str, template_id: str, parameters: Dict[str, Any]):
+
+async def save_visualiser_entry(
+    user_id: str,
+    template_id: str,
+    parameters: Dict[str, Any],
+    coalesce: bool = False,
+):
+    """
+    With `coalesce`, a snapshot for the same user and template that has not been
+    flushed yet is replaced rather than kept (slider-driven updates).
+    """
     if not user_id:
         raise ValueError("user_id is required")
 
@@ -22,22 +36,14 @@ async def save_visualiser_entry(user_id: str, template_id: str, parameters: Dict
         print("⚠ Database disabled, skipping save_visualiser_entry")
         return "no-db-record"
 
-    result = await visualiser_collection.insert_one(doc)
-    return str(result.inserted_id)
+    coalesce_key = (user_id, template_id) if coalesce else None
+    return await write_behind.put(visualiser_collection, doc, coalesce_key=coalesce_key)
 
 
-async def get_visualiser_entries(user_id: str, limit: int = 20):
+async def get_visualiser_entries(user_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """One page of saved visualiser states, newest first. Returns (entries, next_cursor)."""
     if not user_id or visualiser_collection is None:
-        return []
-
-    cursor = (
-        visualiser_collection.find({"user_id": user_id})
-        .sort("timestamp", -1)
-        .limit(limit)
-    )
-
-    entries: List[Dict[str, Any]] = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        entries.append(doc)
-    return entries
+        return [], None
+
+    limit = max(1, min(limit, MAX_VISUALISER_LIMIT))
+    return await fetch_timeline_page(visualiser_collection, user_id, VISUALISER_LIST_PROJECTION, limit, cursor)
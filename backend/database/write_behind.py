@@ -0,0 +1,209 @@
+# backend/database/write_behind.py
+
+import asyncio
+import os
+from typing import Any, Dict, Hashable, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from utils.metrics import mongo_insert_seconds
+
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "1"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "100"))
+# Past this many queued documents, `put` flushes inline instead of buffering more;
+# if that flush fails too (MongoDB down), the oldest queued documents are dropped.
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+# A document MongoDB rejects (too large, failed validation) is dropped after this many tries.
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindQueue:
+    """
+    Buffers inserts per collection and writes them with `insert_many` once a
+    collection has `max_batch` documents queued or every `flush_interval`
+    seconds, whichever comes first.
+
+    `_id` is assigned on enqueue so callers can return it right away, and so a
+    retried batch can't insert a document twice. A record becomes visible to
+    reads at the next flush, not when the request returns.
+
+    Batches that fail as a whole (connection errors) are retried until the
+    queue is full; documents rejected individually are retried up to
+    `max_attempts` times and then dropped.
+    """
+
+    def __init__(self, flush_interval: float, max_batch: int, max_queue: int, max_attempts: int = 5):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self._collections: Dict[str, Any] = {}
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        # (collection, coalesce_key) -> position of the pending doc it can replace
+        self._coalesce: Dict[tuple, int] = {}
+        # _id -> failed write attempts, for documents MongoDB rejected
+        self._attempts: Dict[Any, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.counters = {"queued": 0, "coalesced": 0, "flushed": 0, "batches": 0, "errors": 0, "dropped": 0}
+
+    def depth(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def put(self, collection, doc: Dict[str, Any], coalesce_key: Optional[Hashable] = None) -> str:
+        """
+        Queue `doc` for insertion into `collection` and return its id.
+        With `coalesce_key`, a still-pending doc queued under the same key is
+        replaced instead of written alongside it; the replacement keeps the
+        pending doc's `_id`, which its caller has already been given.
+        """
+        if self.depth() >= self.max_queue:
+            await self.flush()
+            if self.depth() >= self.max_queue:
+                self._drop_oldest(self.depth() - self.max_queue + 1)
+
+        name = collection.name
+        self._collections[name] = collection
+        buffer = self._buffers.setdefault(name, [])
+
+        slot = self._coalesce.get((name, coalesce_key)) if coalesce_key is not None else None
+        if slot is not None:
+            doc["_id"] = buffer[slot]["_id"]
+            buffer[slot] = doc
+            self.counters["coalesced"] += 1
+        else:
+            if coalesce_key is not None:
+                self._coalesce[(name, coalesce_key)] = len(buffer)
+            doc.setdefault("_id", ObjectId())
+            buffer.append(doc)
+            self.counters["queued"] += 1
+
+        self._ensure_started()
+        if len(buffer) >= self.max_batch:
+            self._wake.set()
+        return str(doc["_id"])
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write every queued document now."""
+        for name in list(self._buffers):
+            batch = self._buffers.pop(name)
+            for key in [key for key in self._coalesce if key[0] == name]:
+                del self._coalesce[key]
+            if not batch:
+                continue
+
+            collection = self._collections[name]
+            for start in range(0, len(batch), self.max_batch):
+                chunk = batch[start:start + self.max_batch]
+                await self._insert_chunk(name, collection, chunk)
+
+    async def _insert_chunk(self, name: str, collection, chunk: List[Dict[str, Any]]):
+        try:
+            with mongo_insert_seconds.time(collection=name):
+                await collection.insert_many(chunk, ordered=False)
+        except BulkWriteError as exc:
+            # Duplicate _ids were written by an earlier attempt; retry the rest.
+            failed = {
+                error["index"] for error in exc.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY
+            }
+            self.counters["flushed"] += len(chunk) - len(failed)
+            self._forget_attempts([doc for i, doc in enumerate(chunk) if i not in failed])
+            if failed:
+                self._requeue(name, self._count_attempt(name, [chunk[i] for i in sorted(failed)], exc), exc)
+            return
+        except Exception as exc:
+            self._requeue(name, chunk, exc)
+            return
+
+        self.counters["flushed"] += len(chunk)
+        self.counters["batches"] += 1
+        self._forget_attempts(chunk)
+
+    def _count_attempt(self, name: str, docs: List[Dict[str, Any]], exc: Exception) -> List[Dict[str, Any]]:
+        """Docs MongoDB rejected individually that still have attempts left."""
+        retry = []
+        for doc in docs:
+            attempts = self._attempts.get(doc["_id"], 0) + 1
+            if attempts < self.max_attempts:
+                self._attempts[doc["_id"]] = attempts
+                retry.append(doc)
+            else:
+                self._attempts.pop(doc["_id"], None)
+        dropped = len(docs) - len(retry)
+        if dropped:
+            self.counters["dropped"] += dropped
+            print(f"❌ Write-behind dropped {dropped} docs for '{name}' after {self.max_attempts} attempts: {exc}")
+        return retry
+
+    def _forget_attempts(self, docs: List[Dict[str, Any]]):
+        if self._attempts:
+            for doc in docs:
+                self._attempts.pop(doc["_id"], None)
+
+    def _requeue(self, name: str, docs: List[Dict[str, Any]], exc: Exception):
+        self.counters["errors"] += 1
+        if not docs:
+            return
+        print(f"⚠ Write-behind flush to '{name}' failed for {len(docs)} docs, retrying: {exc}")
+        self._buffers[name] = docs + self._buffers.get(name, [])
+        # Positions shifted; drop coalescing for this collection until the next flush.
+        self._reset_coalesce(name)
+
+    def _reset_coalesce(self, name: str):
+        for key in [key for key in self._coalesce if key[0] == name]:
+            del self._coalesce[key]
+
+    def _drop_oldest(self, count: int):
+        """Make room when MongoDB is unreachable: drop the oldest queued docs, longest buffer first."""
+        while count > 0:
+            name = max(self._buffers, key=lambda name: len(self._buffers[name]))
+            buffer = self._buffers[name]
+            if not buffer:
+                return
+            dropped = buffer[:count]
+            del buffer[:count]
+            self._forget_attempts(dropped)
+            self._reset_coalesce(name)
+            self.counters["dropped"] += len(dropped)
+            count -= len(dropped)
+            print(f"❌ Write-behind queue full, dropped {len(dropped)} oldest docs for '{name}'")
+
+    async def stop(self):
+        """Drain the queue. Called on shutdown so buffered records are not lost."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "depth": self.depth(),
+            "depth_by_collection": {name: len(buffer) for name, buffer in self._buffers.items()},
+        }
+
+
+write_behind = WriteBehindQueue(
+    WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_QUEUE, WRITE_BEHIND_MAX_ATTEMPTS
+)
@@ -1,10 +1,27 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
 # Routers
 from auth import auth_router
-from routers import notes, scan, visualiser, visualiser_engine, chat
+from routers import notes, scan, visualiser, visualiser_engine, visualiser_sweep, chat, jobs
+from auth.token_cache import token_cache
+from database.indexes import ensure_indexes
+from database.user_model import login_batcher
+from database.write_behind import write_behind
+from services.ai_gateway import gateway_stats
+from services.idempotency import idempotency_store
+from services.image_cache import image_cache
+from services.intent_parser import intent_stats
+from services.job_queue import job_queue
+from services.model_registry import warm_up as warm_up_models
+from services.notes_cache import notes_cache
+from services.notes_context import followup_summary
+from services.semantic_cache import answer_cache
+from services.structured_output import structured_summary
+from services.visualiser_loader import load_templates, start_template_watcher
+from utils.metrics import MetricsMiddleware, register_stats, render_metrics
 
 app = FastAPI(title="Stemly Backend")
 
@@ -19,6 +36,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ----------------------------
+# Metrics (per-route latency, in-flight requests; scraped at /metrics)
+# ----------------------------
+app.add_middleware(MetricsMiddleware)
+
 # ----------------------------
 # Serve Static Files
 # ----------------------------
@@ -33,10 +55,57 @@ app.include_router(notes.router)
 app.include_router(chat.router)  # New unified chat endpoint
 app.include_router(visualiser.router)  # States storage
 app.include_router(visualiser_engine.router)  # Template generation
+app.include_router(visualiser_sweep.router)  # Batch parameter sweeps
+app.include_router(jobs.router)  # Background job status
+
+# ----------------------------
+# Startup
+# ----------------------------
+@app.on_event("startup")
+async def startup():
+    await ensure_indexes()
+    # Build shared model clients and chains before the first request needs them.
+    warm_up_models()
+    load_templates()
+    start_template_watcher()
+    # Pick up jobs that were queued (or interrupted) before the last restart.
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Interrupted jobs are requeued; stop them first since they write records.
+    await job_queue.stop()
+    # Don't lose buffered history/notes/visualiser records or last_login updates on a clean stop.
+    await write_behind.stop()
+    await login_batcher.stop()
 
 # ----------------------------
 # Root Route
 # ----------------------------
 @app.get("/")
 def root():
-    return {"message": "Backend is running!"}
\ No newline at end of file
+    return {"message": "Backend is running!"}
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+register_stats("ai_gateway", lambda: gateway_stats)
+register_stats("token_cache", token_cache.stats)
+register_stats("login_batcher", lambda: login_batcher.stats)
+register_stats("write_behind", write_behind.stats, label="collection")
+register_stats("job_queue", job_queue.stats)
+register_stats("idempotency", idempotency_store.stats)
+register_stats("notes_cache", notes_cache.stats)
+register_stats("image_cache", image_cache.stats)
+register_stats("answer_cache", answer_cache.stats)
+register_stats("intent_parser", lambda: intent_stats)
+register_stats("notes_followup", followup_summary, by="depth")
+register_stats("structured_output", structured_summary, by="label")
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: request/stage latency histograms plus the services' counters."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
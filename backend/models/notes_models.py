@@ -6,6 +6,8 @@ class NotesGenerateRequest(BaseModel):
     topic: str
     variables: List[str]
     image_path: Optional[str] = None
+    # Set to False to force a fresh generation instead of reusing cached notes.
+    use_cache: bool = True
 
 
 class NotesFollowUpRequest(BaseModel):
@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from auth.auth_middleware import require_firebase_user
-from config import llm, is_ai_enabled, GEMINI_API_KEY
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+from config import is_ai_enabled
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import Field
-import google.generativeai as genai
-import json
-import re
+from services.ai_gateway import ainvoke_chain, generate_content, stream_chat_model, stream_content
+from services.image_cache import load_scan_image
+from services.image_preprocess import model_image_for
+from services.intent_parser import local_parameter_update
+from services.semantic_cache import answer_cache
+from services.model_registry import get_chat_model, register_chain
+from services.structured_output import StructuredOutputError, parse_model_output
 from utils.file_utils import resolve_scan_path
+from utils.json_stream import JsonStringFieldStream, ndjson_lines
 
 
 router = APIRouter(
@@ -38,67 +44,72 @@ class ChatResponse(BaseModel):
     )
 
 
-def clean_json_output(text: str):
-    """Remove markdown code blocks from JSON output."""
-    text = text.strip()
-    text = re.sub(r"```json", "", text)
-    text = re.sub(r"```", "", text)
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except:
-        return None
+# Built once at import; reused by every chat request. The parser only renders
+# format instructions: replies are parsed by services.structured_output.
+CHAT_PARSER = PydanticOutputParser(pydantic_object=ChatResponse)
+CHAT_FORMAT_INSTRUCTIONS = CHAT_PARSER.get_format_instructions()
 
+CHAT_TEXT_PROMPT = PromptTemplate(
+    template="""
+You are an expert Physics Tutor and Simulation Controller.
 
-async def handle_unified_chat(
-    user_prompt: str,
-    topic: str,
-    variables: list,
-    image_path: Optional[str] = None,
-    current_params: Optional[Dict[str, Any]] = None,
-    template_id: Optional[str] = None,
-) -> ChatResponse:
-    """
-    Unified chat handler that can:
-    1. Answer questions about the physics problem
-    2. Update visualiser parameters
-    3. Do both
-    """
-    if not is_ai_enabled():
-        return ChatResponse(
-            response="AI is not configured.",
-            parameter_updates=None,
-            update_type="explanation",
-        )
+Context:
+{context}
 
-    try:
-        parser = PydanticOutputParser(pydantic_object=ChatResponse)
+User's message: "{user_prompt}"
 
-        # Build context about the problem
-        context_parts = [
-            f"Topic: {topic}",
-            f"Variables involved: {', '.join(variables)}",
-        ]
+Your tasks:
+1. If they want to change parameters, update them in "parameter_updates"
+2. If they ask a question, provide a clear answer in "response"
+3. Set "update_type" to: "explanation", "parameter_change", or "both"
 
-        if template_id:
-            context_parts.append(f"Current simulation: {template_id}")
+{format_instructions}
 
-        if current_params:
-            context_parts.append(f"Current parameters: {current_params}")
+Return ONLY valid JSON, no markdown.
+""",
+    input_variables=["context", "user_prompt"],
+    partial_variables={"format_instructions": CHAT_FORMAT_INSTRUCTIONS},
+)
 
-        context = "\n".join(context_parts)
+CHAT_TEXT_MODEL = ("gemini-2.0-flash", 0.7)
 
-        # If image is available, use Gemini Vision
-        if image_path:
-            try:
-                local_path = resolve_scan_path(image_path)
-                ext = local_path.suffix.lower()
-                mime_type = "image/jpeg" if ext in (".jpg", ".jpeg") else "image/png"
+register_chain(
+    "chat_text",
+    model=CHAT_TEXT_MODEL[0],
+    temperature=CHAT_TEXT_MODEL[1],
+    build=lambda chat_model: CHAT_TEXT_PROMPT | chat_model,
+    json_mode=True,
+)
+
+
+async def _parse_chat(text: str, context: str, user_prompt: str) -> ChatResponse:
+    retry_context = f'Physics tutor chat reply.\n{context}\nUser\'s message: "{user_prompt}"'
+    return await parse_model_output(text, ChatResponse, "chat", retry_context)
+
+
+def _build_context(
+    topic: str,
+    variables: list,
+    current_params: Optional[Dict[str, Any]],
+    template_id: Optional[str],
+) -> str:
+    """Context about the scanned problem shared by every chat prompt."""
+    context_parts = [
+        f"Topic: {topic}",
+        f"Variables involved: {', '.join(variables)}",
+    ]
+
+    if template_id:
+        context_parts.append(f"Current simulation: {template_id}")
 
-                with open(local_path, "rb") as img:
-                    img_bytes = img.read()
+    if current_params:
+        context_parts.append(f"Current parameters: {current_params}")
 
-                system_prompt = f"""
+    return "\n".join(context_parts)
+
+
+def _vision_prompt(context: str, user_prompt: str) -> str:
+    return f"""
 You are an expert Physics Tutor and Simulation Controller.
 
 Context from the scanned physics problem:
@@ -120,55 +131,92 @@ Your tasks:
 4. You can do both if needed.
 
 IMPORTANT: Return ONLY valid JSON in this exact format:
-{parser.get_format_instructions()}
+{CHAT_FORMAT_INSTRUCTIONS}
 
 No markdown, no code blocks, just raw JSON.
 """
 
-                model = genai.GenerativeModel("gemini-2.0-flash")
-                response = model.generate_content(
-                    [
-                        system_prompt,
-                        {"mime_type": mime_type, "data": img_bytes},
-                    ]
-                )
 
-                raw_text = response.text
-                data = clean_json_output(raw_text)
+async def _vision_parts(image_path: str, context: str, user_prompt: str) -> list:
+    local_path = model_image_for(resolve_scan_path(image_path))
+    img_bytes, mime_type = await load_scan_image(local_path)
+    return [
+        _vision_prompt(context, user_prompt),
+        {"mime_type": mime_type, "data": img_bytes},
+    ]
 
-                if data:
-                    return ChatResponse(**data)
 
-            except Exception as e:
-                print(f"⚠ Gemini Vision Error: {e}")
-                # Fall back to text-only mode
-
-        # Text-only mode (no image or image failed)
-        prompt_template = PromptTemplate(
-            template="""
-You are an expert Physics Tutor and Simulation Controller.
+def _cached_answer(scope, user_prompt: str) -> Optional[ChatResponse]:
+    cached = answer_cache.lookup(scope, user_prompt)
+    return ChatResponse(**cached) if cached else None
 
-Context:
-{context}
 
-User's message: "{user_prompt}"
+def _remember_answer(scope, user_prompt: str, response: ChatResponse):
+    # Only pure explanations are reusable; parameter changes depend on the current state.
+    if response.update_type == "explanation" and not response.parameter_updates:
+        answer_cache.store(scope, user_prompt, response.dict())
 
-Your tasks:
-1. If they want to change parameters, update them in "parameter_updates"
-2. If they ask a question, provide a clear answer in "response"
-3. Set "update_type" to: "explanation", "parameter_change", or "both"
 
-{format_instructions}
+async def handle_unified_chat(
+    user_prompt: str,
+    topic: str,
+    variables: list,
+    image_path: Optional[str] = None,
+    current_params: Optional[Dict[str, Any]] = None,
+    template_id: Optional[str] = None,
+) -> ChatResponse:
+    """
+    Unified chat handler that can:
+    1. Answer questions about the physics problem
+    2. Update visualiser parameters
+    3. Do both
+    """
+    # Plain edits ("set angle to 45") are answered without a model call.
+    intent = local_parameter_update(user_prompt, template_id, current_params)
+    if intent:
+        return ChatResponse(
+            response=intent.response,
+            parameter_updates=intent.updates,
+            update_type="parameter_change",
+        )
 
-Return ONLY valid JSON, no markdown.
-""",
-            input_variables=["context", "user_prompt"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
+    if not is_ai_enabled():
+        return ChatResponse(
+            response="AI is not configured.",
+            parameter_updates=None,
+            update_type="explanation",
         )
 
-        chain = prompt_template | llm | parser
+    # Students ask the same conceptual questions about a topic over and over.
+    scope = answer_cache.scope(topic, template_id, image_path, current_params)
+    cached = _cached_answer(scope, user_prompt)
+    if cached:
+        return cached
+
+    try:
+        context = _build_context(topic, variables, current_params, template_id)
+
+        # If image is available, use Gemini Vision
+        if image_path:
+            try:
+                response = await generate_content(
+                    "gemini-2.0-flash",
+                    await _vision_parts(image_path, context, user_prompt),
+                    json_mode=True,
+                )
+
+                result = await _parse_chat(response.text, context, user_prompt)
+                _remember_answer(scope, user_prompt, result)
+                return result
 
-        result = await chain.ainvoke({"context": context, "user_prompt": user_prompt})
+            except Exception as e:
+                print(f"⚠ Gemini Vision Error: {e}")
+                # Fall back to text-only mode
+
+        # Text-only mode (no image or image failed)
+        message = await ainvoke_chain("chat_text", {"context": context, "user_prompt": user_prompt})
+        result = await _parse_chat(message.content, context, user_prompt)
+        _remember_answer(scope, user_prompt, result)
 
         return result
 
@@ -184,6 +232,104 @@ Return ONLY valid JSON, no markdown.
         )
 
 
+async def _stream_text_model(context: str, user_prompt: str):
+    chat_model = get_chat_model(*CHAT_TEXT_MODEL)
+    prompt = CHAT_TEXT_PROMPT.format(context=context, user_prompt=user_prompt)
+    async for text in stream_chat_model(chat_model, prompt, json_mode=True):
+        yield text
+
+
+async def stream_unified_chat(
+    user_prompt: str,
+    topic: str,
+    variables: list,
+    image_path: Optional[str] = None,
+    current_params: Optional[Dict[str, Any]] = None,
+    template_id: Optional[str] = None,
+):
+    """
+    Streaming variant of `handle_unified_chat`.
+    Yields {"type": "token", "text": ...} frames with the natural-language
+    `response` as the model produces it, then one {"type": "final", ...} frame
+    carrying the full ChatResponse (including `parameter_updates`).
+    """
+    intent = local_parameter_update(user_prompt, template_id, current_params)
+    if intent:
+        yield {"type": "token", "text": intent.response}
+        yield {"type": "final", **ChatResponse(
+            response=intent.response,
+            parameter_updates=intent.updates,
+            update_type="parameter_change",
+        ).dict()}
+        return
+
+    if not is_ai_enabled():
+        yield {"type": "final", **ChatResponse(
+            response="AI is not configured.",
+            parameter_updates=None,
+            update_type="explanation",
+        ).dict()}
+        return
+
+    scope = answer_cache.scope(topic, template_id, image_path, current_params)
+    cached = _cached_answer(scope, user_prompt)
+    if cached:
+        yield {"type": "token", "text": cached.response}
+        yield {"type": "final", **cached.dict()}
+        return
+
+    context = _build_context(topic, variables, current_params, template_id)
+    field = JsonStringFieldStream("response")
+    streamed = []
+
+    sources = []
+    if image_path:
+        sources.append(("vision", image_path))
+    sources.append(("text", None))
+
+    try:
+        for kind, path in sources:
+            try:
+                if kind == "vision":
+                    parts = await _vision_parts(path, context, user_prompt)
+                    tokens = stream_content("gemini-2.0-flash", parts, json_mode=True)
+                else:
+                    tokens = _stream_text_model(context, user_prompt)
+
+                async for text in tokens:
+                    delta = field.feed(text)
+                    if delta:
+                        streamed.append(delta)
+                        yield {"type": "token", "text": delta}
+                break
+            except Exception as e:
+                # Only fall back to text-only mode if nothing was sent yet.
+                if kind != "vision" or streamed:
+                    raise
+                print(f"⚠ Gemini Vision Error: {e}")
+                field = JsonStringFieldStream("response")
+
+        try:
+            final = await _parse_chat(field.buffer, context, user_prompt)
+            _remember_answer(scope, user_prompt, final)
+        except StructuredOutputError:
+            final = ChatResponse(
+                response="".join(streamed) or "I'm having trouble processing your request. Please try again.",
+                parameter_updates=None,
+                update_type="explanation",
+            )
+
+    except Exception as e:
+        print(f"❌ Chat Stream Error: {e}")
+        final = ChatResponse(
+            response="I'm having trouble processing your request. Please try again.",
+            parameter_updates=None,
+            update_type="explanation",
+        )
+
+    yield {"type": "final", **final.dict()}
+
+
 @router.post("/ask")
 async def chat_ask(req: ChatRequest, request: Request):
     """
@@ -207,3 +353,24 @@ async def chat_ask(req: ChatRequest, request: Request):
         print(f"💬 Parameter updates: {response.parameter_updates}")
 
     return response.dict()
+
+
+@router.post("/ask/stream")
+async def chat_ask_stream(req: ChatRequest, request: Request):
+    """
+    Streaming version of /chat/ask (NDJSON). Token frames carry the response
+    text as it is generated; the last frame has the structured fields.
+    """
+    user_id = request.state.user["uid"]
+
+    print(f"💬 Chat stream request from {user_id}: {req.user_prompt}")
+
+    frames = stream_unified_chat(
+        user_prompt=req.user_prompt,
+        topic=req.topic,
+        variables=req.variables,
+        image_path=req.image_path,
+        current_params=req.current_params,
+        template_id=req.template_id,
+    )
+    return StreamingResponse(ndjson_lines(frames), media_type="application/x-ndjson")
@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from auth.auth_middleware import require_firebase_user
+from services.idempotency import IdempotencyInProgress, IdempotencyKeyReused, idempotency_store
+from services.job_queue import JobQueueFull, job_queue, public_job
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"],
+    dependencies=[Depends(require_firebase_user)],
+)
+
+
+async def submit_accepted(
+    kind: str,
+    user_id: str,
+    params: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+) -> JSONResponse:
+    """Queue a job and answer 202 with its status and where to poll it."""
+    try:
+        job, _ = await job_queue.submit(kind, user_id, params, idempotency_key)
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    location = f"/jobs/{job['_id']}"
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder({**public_job(job), "poll_url": location}),
+        headers={"Location": location},
+    )
+
+
+async def idempotent_response(
+    scope: str,
+    user_id: str,
+    idempotency_key: Optional[str],
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+):
+    """
+    Run `compute` once per Idempotency-Key; retries with the same key and
+    params get the first response back, marked `Idempotent-Replayed: true`.
+    """
+    if not idempotency_key:
+        return await compute()
+
+    try:
+        response, replayed = await idempotency_store.run(scope, user_id, idempotency_key, params, compute)
+    except IdempotencyKeyReused as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except IdempotencyInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+    if not replayed:
+        return response
+    return JSONResponse(content=jsonable_encoder(response), headers={"Idempotent-Replayed": "true"})
+
+
+@router.get("/{job_id}")
+async def job_status(job_id: str, request: Request, wait: float = 0):
+    """
+    Status of a background job; `result` is filled in once it has succeeded.
+    `?wait=N` holds the request up to N seconds (max 25) for the job to finish.
+    """
+    job = await job_queue.wait(job_id, request.state.user["uid"], wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return public_job(job)
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from auth.auth_middleware import require_firebase_user
-from database.notes_model import save_notes_entry
+from database.notes_model import get_notes_for_user, save_notes_entry
 from models.notes_models import NotesFollowUpRequest, NotesGenerateRequest, NotesResponse
-from services.ai_notes import follow_up_notes, generate_notes
+from routers.jobs import idempotent_response, submit_accepted
+from services.ai_notes import follow_up_notes, generate_notes_cached, stream_follow_up_notes
+from services.job_queue import register_job
+from services.notes_cache import notes_cache
+from services.notes_context import followup_depth, notes_payload
 from utils.file_utils import resolve_scan_path, scan_path_to_relative
+from utils.json_stream import ndjson_lines
 
 router = APIRouter(
     prefix="/notes",
@@ -18,7 +26,17 @@ router = APIRouter(
 # -----------------------------------------
 
 @router.post("/generate")
-async def generate_notes_route(req: NotesGenerateRequest, request: Request):
+async def generate_notes_route(
+    req: NotesGenerateRequest,
+    request: Request,
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    Generate (or reuse cached) notes for a scan. With `?background=true` the
+    response is 202 with a job id; poll /jobs/{id} for the notes. A retry
+    with the same Idempotency-Key gets the first response instead of new notes.
+    """
 
     local_path = None
     relative_path = None
@@ -33,22 +51,42 @@ async def generate_notes_route(req: NotesGenerateRequest, request: Request):
             ) from exc
 
     user_id = request.state.user["uid"]
+    params = {
+        "topic": req.topic,
+        "variables": req.variables,
+        "image_path": relative_path or req.image_path,
+        "use_cache": req.use_cache,
+    }
 
-    try:
-        image_arg = relative_path or req.image_path
-        notes = await generate_notes(req.topic, req.variables, image_arg)
-        await save_notes_entry(
-            user_id=user_id,
-            topic=req.topic,
-            notes_payload=notes.dict(),
-            image_path=relative_path or req.image_path,
-        )
-        # Wrap response to match Flutter's expected format
-        return {"notes": notes.dict()}
+    if background:
+        return await submit_accepted("notes_generate", user_id, params, idempotency_key)
 
-    except Exception as e:
-        print("❌ Error in /notes/generate:", e)
-        raise HTTPException(status_code=500, detail="Failed to generate notes.")
+    async def generate():
+        try:
+            return await _generate_and_save(user_id, params)
+
+        except Exception as e:
+            print("❌ Error in /notes/generate:", e)
+            raise HTTPException(status_code=500, detail="Failed to generate notes.")
+
+    return await idempotent_response("notes_generate", user_id, idempotency_key, params, generate)
+
+
+async def _generate_and_save(user_id: str, params):
+    notes, cache_hit = await generate_notes_cached(
+        params["topic"], params["variables"], params["image_path"], use_cache=params["use_cache"]
+    )
+    await save_notes_entry(
+        user_id=user_id,
+        topic=params["topic"],
+        notes_payload=notes.dict(),
+        image_path=params["image_path"],
+    )
+    # Wrap response to match Flutter's expected format
+    return {"notes": notes.dict(), "cache_hit": cache_hit}
+
+
+register_job("notes_generate", _generate_and_save, "Failed to generate notes.")
 
 
 
@@ -56,29 +94,92 @@ async def generate_notes_route(req: NotesGenerateRequest, request: Request):
 # 2. Follow-up Question
 # -----------------------------------------
 
+def _previous_image_reference(previous_notes):
+    if not isinstance(previous_notes, dict):
+        return None
+
+    raw_path = previous_notes.get("image_path")
+    if not isinstance(raw_path, str):
+        return None
+
+    try:
+        return scan_path_to_relative(resolve_scan_path(raw_path))
+    except ValueError:
+        return None
+
+
 @router.post("/ask")
 async def follow_up_notes_route(req: NotesFollowUpRequest, request: Request):
 
     try:
-        image_reference = None
-        if isinstance(req.previous_notes, dict):
-            raw_path = req.previous_notes.get("image_path")
-            if isinstance(raw_path, str):
-                try:
-                    image_reference = scan_path_to_relative(resolve_scan_path(raw_path))
-                except ValueError:
-                    image_reference = None
+        image_reference = _previous_image_reference(req.previous_notes)
 
         notes = await follow_up_notes(req.topic, req.previous_notes, req.user_prompt)
+        payload = notes_payload(notes.dict(), followup_depth(req.previous_notes))
         await save_notes_entry(
             user_id=request.state.user["uid"],
             topic=req.topic,
-            notes_payload=notes.dict(),
+            notes_payload=payload,
             image_path=image_reference,
         )
         # Wrap response to match Flutter's expected format
-        return {"notes": notes.dict()}
+        return {"notes": payload}
 
     except Exception as e:
         print("❌ Error in /notes/ask:", e)
-        raise HTTPException(status_code=500, detail="Failed to process follow-up question.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to process follow-up question.")
+
+
+@router.post("/ask/stream")
+async def follow_up_notes_stream_route(req: NotesFollowUpRequest, request: Request):
+    """
+    Streaming version of /notes/ask (NDJSON). The explanation is streamed as
+    it is generated; the last frame carries the full notes object.
+    """
+    user_id = request.state.user["uid"]
+    image_reference = _previous_image_reference(req.previous_notes)
+
+    async def frames():
+        try:
+            async for frame in stream_follow_up_notes(req.topic, req.previous_notes, req.user_prompt):
+                if frame["type"] != "final":
+                    yield frame
+                    continue
+
+                payload = notes_payload(frame["notes"].dict(), followup_depth(req.previous_notes))
+                await save_notes_entry(
+                    user_id=user_id,
+                    topic=req.topic,
+                    notes_payload=payload,
+                    image_path=image_reference,
+                )
+                yield {"type": "final", "notes": payload}
+
+        except Exception as e:
+            print("❌ Error in /notes/ask/stream:", e)
+            yield {"type": "error", "detail": "Failed to process follow-up question."}
+
+    return StreamingResponse(ndjson_lines(frames()), media_type="application/x-ndjson")
+
+
+# -----------------------------------------
+# 3. Saved Notes (paginated)
+# -----------------------------------------
+
+@router.get("/history")
+async def notes_history(request: Request, limit: int = 20, cursor: Optional[str] = None):
+    user_id = request.state.user["uid"]
+    try:
+        items, next_cursor = await get_notes_for_user(user_id, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# -----------------------------------------
+# 4. Notes Cache Metrics
+# -----------------------------------------
+
+@router.get("/cache/stats")
+async def notes_cache_stats():
+    return notes_cache.stats()
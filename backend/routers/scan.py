@@ -1,11 +1,24 @@
 # backend/routers/scan.py
 
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 
 from auth.auth_middleware import require_firebase_user
 from database.history_model import get_user_history, save_scan_history
-from services.ai_detector import detect_topic
+from database.notes_model import save_notes_entry
+from routers.jobs import idempotent_response, submit_accepted
+from services.ai_detector import detect_topic_cached
+from services.ai_notes import generate_notes_cached
+from services.image_preprocess import prepare_model_image
+from services.job_queue import register_job
 from services.storage import save_scan
+from services.visualiser_loader import resolve_template
+from utils.json_stream import ndjson_lines
 
 router = APIRouter(
     dependencies=[Depends(require_firebase_user)],
@@ -14,15 +27,45 @@ router = APIRouter(
 
 
 @router.post("/upload")
-async def upload_scan(request: Request, file: UploadFile = File(...)):
+async def upload_scan(
+    request: Request,
+    file: UploadFile = File(...),
+    pipeline: bool = False,
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    Store the scan and detect its topic. With `?pipeline=true` the response is
+    an NDJSON stream that goes on to deliver the visualiser template and the
+    notes too, so the client needs no follow-up /notes/generate round trip.
+    With `?background=true` the scan is stored and the rest runs as a job:
+    the response is 202 with a job id to poll at /jobs/{id}. A retry with the
+    same Idempotency-Key gets the first response instead of another detection
+    and history record (streamed pipeline responses are not replayed; use
+    `?background=true` for those).
+    """
     user_id = request.state.user["uid"]
 
     try:
-        saved_path = await save_scan(file)
+        saved_path, content_hash = await save_scan(file)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    topic, variables = await detect_topic(saved_path)
+    params = {"saved_path": saved_path, "content_hash": content_hash}
+    if background:
+        return await submit_accepted("scan_pipeline" if pipeline else "scan", user_id, params, idempotency_key)
+
+    if pipeline:
+        # Downscaled, metadata-free copy for the model; the original stays for display.
+        model_path = await prepare_model_image(saved_path)
+        frames = _scan_pipeline(user_id, saved_path, model_path, content_hash)
+        return StreamingResponse(ndjson_lines(frames), media_type="application/x-ndjson")
+
+    return await idempotent_response("scan", user_id, idempotency_key, params, lambda: _scan_job(user_id, params))
+
+
+async def _detect_and_record(user_id: str, saved_path: str, model_path: str, content_hash: str):
+    topic, variables, cache_hit = await detect_topic_cached(model_path, content_hash)
 
     record_id = await save_scan_history(
         user_id=user_id,
@@ -37,14 +80,124 @@ async def upload_scan(request: Request, file: UploadFile = File(...)):
         "variables": variables,
         "image_path": saved_path,
         "history_id": record_id,
+        "cache_hit": cache_hit,
+    }
+
+
+# Strong references to in-flight pipeline notes tasks (the loop only keeps weak ones).
+_pipeline_tasks = set()
+
+
+def _pipeline_task_done(task: asyncio.Task):
+    _pipeline_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Error in scan pipeline notes: {task.exception()}")
+
+
+async def _pipeline_notes(user_id: str, topic: str, variables: list, saved_path: str):
+    notes, cache_hit = await generate_notes_cached(topic, variables, saved_path)
+    await save_notes_entry(
+        user_id=user_id,
+        topic=topic,
+        notes_payload=notes.dict(),
+        image_path=saved_path,
+    )
+    return notes, cache_hit
+
+
+async def _scan_pipeline(user_id: str, saved_path: str, model_path: str, content_hash: str):
+    """
+    Frames, in order: "scan" (what /scan/upload returns), "visualiser" (same
+    body as /visualiser/generate, when a template fits the topic), "notes"
+    (same as /notes/generate) or "error" for a failed stage, then "done" with
+    per-stage timings. Notes generation starts as soon as the topic is known
+    and runs while the history record is saved and the template is resolved.
+    """
+    start = time.perf_counter()
+    topic, variables, cache_hit = await detect_topic_cached(model_path, content_hash)
+    detect_seconds = time.perf_counter() - start
+
+    notes_task = None
+    if topic != "Unknown":
+        # Not cancelled if the client disconnects: the notes still land in the
+        # notes cache and history, so a retry is served without the model.
+        notes_task = asyncio.create_task(_pipeline_notes(user_id, topic, variables, saved_path))
+        _pipeline_tasks.add(notes_task)
+        notes_task.add_done_callback(_pipeline_task_done)
+
+    record_id = await save_scan_history(
+        user_id=user_id,
+        image_path=saved_path,
+        topic=topic,
+        variables=variables,
+    )
+    yield {
+        "type": "scan",
+        "status": "success",
+        "topic": topic,
+        "variables": variables,
+        "image_path": saved_path,
+        "history_id": record_id,
+        "cache_hit": cache_hit,
+    }
+
+    template = resolve_template(topic)
+    if template:
+        yield {"type": "visualiser", **json.loads(template.generate_body)}
+
+    if notes_task is None:
+        yield {"type": "error", "stage": "notes", "detail": "Topic could not be detected."}
+    else:
+        notes_start = time.perf_counter()
+        try:
+            notes, notes_cache_hit = await asyncio.shield(notes_task)
+            yield {"type": "notes", "notes": notes.dict(), "cache_hit": notes_cache_hit}
+        except Exception:
+            # Logged by _pipeline_task_done.
+            yield {"type": "error", "stage": "notes", "detail": "Failed to generate notes."}
+        notes_wait = time.perf_counter() - notes_start
+
+    yield {
+        "type": "done",
+        "timings": {
+            "detect_seconds": round(detect_seconds, 3),
+            # Time spent waiting for notes after the scan/visualiser frames went out.
+            "notes_wait_seconds": round(notes_wait, 3) if notes_task is not None else None,
+            "total_seconds": round(time.perf_counter() - start, 3),
+        },
     }
 
 
+async def _scan_job(user_id: str, params):
+    model_path = await prepare_model_image(params["saved_path"])
+    return await _detect_and_record(user_id, params["saved_path"], model_path, params["content_hash"])
+
+
+async def _scan_pipeline_job(user_id: str, params):
+    """The pipeline frames collected into one result: {"scan", "visualiser", "notes", "errors"}."""
+    model_path = await prepare_model_image(params["saved_path"])
+    result = {"visualiser": None, "notes": None, "errors": []}
+    async for frame in _scan_pipeline(user_id, params["saved_path"], model_path, params["content_hash"]):
+        kind = frame.pop("type")
+        if kind == "error":
+            result["errors"].append(frame)
+        elif kind != "done":
+            result[kind] = frame
+    return result
+
+
+register_job("scan", _scan_job, "Failed to process scan.")
+register_job("scan_pipeline", _scan_pipeline_job, "Failed to process scan.")
+
+
 @router.get("/history")
-async def history(request: Request):
+async def history(request: Request, limit: int = 50, cursor: Optional[str] = None):
     user_id = request.state.user["uid"]
-    history_data = await get_user_history(user_id)
-    return {"history": history_data}
+    try:
+        history_data, next_cursor = await get_user_history(user_id, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"history": history_data, "next_cursor": next_cursor}
 
 
 @router.get("/ping")
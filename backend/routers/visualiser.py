@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from auth.auth_middleware import require_firebase_user
 from database.visualiser_model import (
@@ -26,7 +28,10 @@ async def save_visualiser_state(payload: VisualiserSaveRequest, request: Request
 
 
 @router.get("/states")
-async def list_visualiser_states(request: Request, limit: int = 20):
+async def list_visualiser_states(request: Request, limit: int = 20, cursor: Optional[str] = None):
     user_id = request.state.user["uid"]
-    entries = await get_visualiser_entries(user_id, limit=limit)
-    return {"items": entries}
+    try:
+        entries, next_cursor = await get_visualiser_entries(user_id, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"items": entries, "next_cursor": next_cursor}
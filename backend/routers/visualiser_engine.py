@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
-from services.visualiser_loader import get_template_by_topic, fill_template_defaults
+from services.simulation import simulate
+from services.visualiser_loader import get_template, resolve_template
+from services.ai_visualiser import adjust_parameters_with_ai
+from services.intent_parser import local_parameter_update
 from database.visualiser_model import save_visualiser_entry, get_visualiser_entries
 
 router = APIRouter(
@@ -25,66 +28,73 @@ class VisualiserUpdateRequest(BaseModel):
 
 @router.post("/generate")
 async def generate_visualiser(req: VisualiserGenerateRequest):
-    template = await get_template_by_topic(req.topic)
+    template = resolve_template(req.topic)
 
     if not template:
         raise HTTPException(status_code=404, detail="No template found for this topic.")
 
-    filled = fill_template_defaults(template, req.variables)
-
     # Save initial state if user_id provided (optional)
     if req.user_id:
         await save_visualiser_entry(
             user_id=req.user_id,
-            template_id=filled["template_id"],
-            parameters=filled["parameters"],
+            template_id=template.template_id,
+            parameters=template.to_dict()["parameters"],
         )
 
-    return {
-        "template_id": filled["template_id"],
-        "template": filled
-    }
+    # Templates are served as-is, so the response body is serialized once at load time.
+    return Response(content=template.generate_body, media_type="application/json")
 
 
 @router.post("/update")
 async def update_visualiser(req: VisualiserUpdateRequest):
     updated = {}
+    ai_response = ""
 
     if req.user_prompt and req.user_prompt.strip():
-        try:
-            from services.ai_visualiser import adjust_parameters_with_ai
-            ai_result = await adjust_parameters_with_ai(
-                req.template_id,
-                req.parameters,
-                req.user_prompt
-            )
-            updated = ai_result.get("updated_parameters", {})
-            ai_response = ai_result.get("ai_response", "Updated parameters.")
-            print(f"🤖 AI Updates: {updated}")
-        except Exception as e:
-            print(f"⚠ AI Update Error: {e}")
-            updated = {}
-            ai_response = "Sorry, I encountered an error processing your request."
+        # Plain edits ("set angle to 45") are parsed locally; anything else goes to the model.
+        intent = local_parameter_update(req.user_prompt, req.template_id, req.parameters)
+        if intent:
+            updated = intent.updates
+            ai_response = intent.response
+        else:
+            try:
+                ai_result = await adjust_parameters_with_ai(
+                    req.template_id,
+                    req.parameters,
+                    req.user_prompt
+                )
+                updated = ai_result.get("updated_parameters", {})
+                ai_response = ai_result.get("ai_response", "Updated parameters.")
+                print(f"🤖 AI Updates: {updated}")
+            except Exception as e:
+                print(f"⚠ AI Update Error: {e}")
+                updated = {}
+                ai_response = "Sorry, I encountered an error processing your request."
 
     merged = dict(req.parameters)
     merged.update(updated)
 
+    template = get_template(req.template_id)
+    simulation = simulate(template.data, merged) if template else None
+
     if req.user_id:
         await save_visualiser_entry(
             user_id=req.user_id,
             template_id=req.template_id,
-            parameters=merged
+            parameters=merged,
+            coalesce=True,
         )
 
     return {
         "template_id": req.template_id,
         "parameters": merged,
         "ai_updates": updated,
-        "ai_response": ai_response
+        "ai_response": ai_response,
+        "simulation": simulation,
     }
 
 
 @router.get("/history/{user_id}")
 async def visualiser_history(user_id: str):
-    history = await get_visualiser_entries(user_id)
+    history, _ = await get_visualiser_entries(user_id)
     return {"history": history}
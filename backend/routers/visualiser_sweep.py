@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from auth.auth_middleware import require_firebase_user
+from services.simulation import (
+    MAX_SIMULATION_SAMPLES,
+    encode_series,
+    grid_block,
+    parameter_value,
+    simulate_batch,
+    supports,
+    to_json_list,
+)
+from services.visualiser_loader import get_template
+from utils.json_stream import ndjson_lines
+
+router = APIRouter(
+    prefix="/visualiser",
+    tags=["Visualiser Sweep"],
+    dependencies=[Depends(require_firebase_user)],
+)
+
+MAX_SWEEP_COMBINATIONS = int(os.getenv("MAX_SWEEP_COMBINATIONS", "100000"))
+# Full trajectories are large; only small sweeps may ask for them.
+MAX_SWEEP_SERIES_COMBINATIONS = int(os.getenv("MAX_SWEEP_SERIES_COMBINATIONS", "2000"))
+SWEEP_TIME_BUDGET_SECONDS = float(os.getenv("SWEEP_TIME_BUDGET_SECONDS", "2"))
+SWEEP_CHUNK_SIZE = 4096
+MAX_AXIS_VALUES = 1000
+
+
+class SweepAxis(BaseModel):
+    """Either explicit `values` or an inclusive `start`..`stop` range with `steps` points."""
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = None
+
+
+class VisualiserSweepRequest(BaseModel):
+    template_id: str
+    sweep: Dict[str, SweepAxis]
+    # Values for parameters not being swept (template defaults otherwise).
+    parameters: Dict[str, Any] = {}
+    include_series: bool = False
+    samples: int = 60
+
+
+def _axis_values(name: str, axis: SweepAxis, spec) -> np.ndarray:
+    if axis.values is not None:
+        raw = axis.values
+    elif axis.start is not None and axis.stop is not None and axis.steps:
+        if not 1 <= axis.steps <= MAX_AXIS_VALUES:
+            raise HTTPException(status_code=400, detail=f"'{name}': steps must be between 1 and {MAX_AXIS_VALUES}.")
+        raw = np.linspace(axis.start, axis.stop, axis.steps).tolist()
+    else:
+        raise HTTPException(status_code=400, detail=f"'{name}': give either values or start, stop and steps.")
+
+    if not raw or len(raw) > MAX_AXIS_VALUES:
+        raise HTTPException(status_code=400, detail=f"'{name}': between 1 and {MAX_AXIS_VALUES} values allowed.")
+    # Clamped to the template's [min, max]; clamping can merge points, so dedupe.
+    return np.unique([parameter_value(value, spec) for value in raw])
+
+
+def _evaluate(template_id: str, axes, fixed, offset: int, count: int, samples: int, include_series: bool):
+    block = grid_block(axes, fixed, offset, count)
+    series, summary = simulate_batch(template_id, block, samples)
+
+    frame = {
+        "type": "rows",
+        "offset": offset,
+        "parameters": {name: to_json_list(block[name]) for name in axes},
+        "summary": {name: to_json_list(values) for name, values in summary.items()},
+    }
+    if include_series:
+        frame["series"] = {name: [encode_series(row) for row in rows] for name, rows in series.items()}
+    return frame
+
+
+@router.post("/sweep")
+async def sweep_visualiser(req: VisualiserSweepRequest):
+    """
+    Evaluate every combination of the swept parameters in vectorized chunks and
+    stream the results as NDJSON: a "meta" frame, "rows" frames (columnar, in
+    grid order), then "done". Stops early with `truncated: true` once the time
+    budget is spent.
+    """
+    template = get_template(req.template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Unknown template_id.")
+    if not supports(template.template_id):
+        raise HTTPException(status_code=400, detail="This template has no simulation to sweep.")
+
+    specs = template.data["parameters"]
+    unknown = [name for name in req.sweep if name not in specs]
+    if not req.sweep or unknown:
+        raise HTTPException(status_code=400, detail=f"Sweep over template parameters only (unknown: {unknown}).")
+
+    axes = {name: _axis_values(name, axis, specs[name]) for name, axis in req.sweep.items()}
+    fixed = {
+        name: parameter_value(req.parameters.get(name), spec)
+        for name, spec in specs.items()
+        if name not in axes
+    }
+
+    combinations = int(np.prod([len(values) for values in axes.values()]))
+    if combinations > MAX_SWEEP_COMBINATIONS:
+        raise HTTPException(status_code=400, detail=f"Sweep too large ({combinations} > {MAX_SWEEP_COMBINATIONS}).")
+    if req.include_series and combinations > MAX_SWEEP_SERIES_COMBINATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"include_series is limited to {MAX_SWEEP_SERIES_COMBINATIONS} combinations.",
+        )
+
+    # Summaries only need the end points of each trajectory.
+    samples = max(2, min(req.samples, MAX_SIMULATION_SAMPLES)) if req.include_series else 2
+
+    async def frames():
+        started = time.perf_counter()
+        yield {
+            "type": "meta",
+            "template_id": template.template_id,
+            "combinations": combinations,
+            "axes": {name: to_json_list(values) for name, values in axes.items()},
+            "fixed": fixed,
+            "samples": samples if req.include_series else None,
+        }
+
+        offset = 0
+        while offset < combinations:
+            if time.perf_counter() - started > SWEEP_TIME_BUDGET_SECONDS:
+                break
+            count = min(SWEEP_CHUNK_SIZE, combinations - offset)
+            # NumPy work runs off the event loop so other requests keep moving.
+            yield await asyncio.to_thread(
+                _evaluate, template.template_id, axes, fixed, offset, count, samples, req.include_series
+            )
+            offset += count
+
+        yield {
+            "type": "done",
+            "evaluated": offset,
+            "truncated": offset < combinations,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    return StreamingResponse(ndjson_lines(frames()), media_type="application/x-ndjson")
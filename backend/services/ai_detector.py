@@ -1,26 +1,21 @@
 # services/ai_detector.py
 
-import google.generativeai as genai
-import json
-import re
-import os
+from database.detection_cache_model import get_cached_detection, save_cached_detection
+from services.ai_gateway import generate_content
+from services.image_cache import load_scan_image
+from services.structured_output import repair_json, strip_fences
 
 async def detect_topic(image_path: str):
     """
     Detect STEM topic + variables from an image using Gemini 2.0 Flash.
     Ensures clean JSON output and supports various formats returned by Gemini.
+    Returns (topic, variables, parsed); parsed is False when the model call
+    failed or its reply was not a JSON object.
     """
 
-    # --- Read image bytes ---
-    with open(image_path, "rb") as img:
-        img_bytes = img.read()
-
-    # --- Auto-detect MIME type ---
-    ext = image_path.lower()
-    if ext.endswith(".jpg") or ext.endswith(".jpeg"):
-        mime_type = "image/jpeg"
-    else:
-        mime_type = "image/png"
+    # --- Read image bytes + MIME type (cached, off the event loop) ---
+    # Warms the cache for the notes/chat calls that follow on the same scan.
+    img_bytes, mime_type = await load_scan_image(image_path)
 
     # --- Strict JSON Prompt ---
     system_prompt = """
@@ -44,31 +39,32 @@ async def detect_topic(image_path: str):
     }
     """
 
-    # --- Gemini Model ---
-    model = genai.GenerativeModel("gemini-2.0-flash")
-
+    # --- Gemini Model (async, bounded concurrency) ---
     try:
-        response = model.generate_content(
+        response = await generate_content(
+            "gemini-2.0-flash",
             [
                 system_prompt,
                 {
                     "mime_type": mime_type,
                     "data": img_bytes
                 }
-            ]
+            ],
+            json_mode=True,
         )
         raw_text = response.text.strip()
     except Exception as e:
         print(f"❌ Gemini API Error in ai_detector: {e}")
-        return "Unknown", []
+        return "Unknown", [], False
 
     # --- Clean raw output ---
-    raw_text = re.sub(r"```json", "", raw_text)
-    raw_text = re.sub(r"```", "", raw_text).strip()
+    raw_text = strip_fences(raw_text)
 
-    # --- Try parsing JSON ---
+    # --- Try parsing JSON (tolerates trailing commas, single quotes, cut-off output) ---
     try:
-        parsed = json.loads(raw_text)
+        parsed, _, _ = repair_json(raw_text)
+        if not isinstance(parsed, dict):
+            raise ValueError("no JSON object in response")
 
         # --- Handle topic variations ---
         topic = (
@@ -92,11 +88,31 @@ async def detect_topic(image_path: str):
             else:
                 variables.append(str(item))
 
-        return topic, variables
+        return topic, variables, True
 
     except Exception as e:
         print("⚠ JSON Parse Error in ai_detector:", e)
         print("Raw Gemini Output:", raw_text)
 
         # Fallback to raw topic only
-        return raw_text, []
\ No newline at end of file
+        return raw_text, [], False
+
+
+async def detect_topic_cached(image_path: str, content_hash: str):
+    """
+    Look up the detection result for this exact image before calling Gemini.
+    Returns (topic, variables, cache_hit).
+    """
+    cached = await get_cached_detection(content_hash)
+    if cached is not None:
+        topic, variables = cached
+        return topic, variables, True
+
+    topic, variables, parsed = await detect_topic(image_path)
+
+    # Don't pin failures (or unparsed raw model text) in the cache; the next
+    # upload should retry the model.
+    if parsed and topic != "Unknown":
+        await save_cached_detection(content_hash, topic, variables)
+
+    return topic, variables, False
@@ -0,0 +1,216 @@
+# services/ai_gateway.py
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from config import (
+    AI_MAX_CONCURRENCY,
+    AI_MAX_CONCURRENCY_PER_MODEL,
+    AI_MAX_RETRIES,
+    AI_RETRY_BASE_DELAY,
+)
+from services.model_registry import JSON_MIME_TYPE, chain_model, get_chain, get_generative_model
+from utils.metrics import gemini_call_seconds, gemini_queue_seconds
+
+# Every outbound Gemini call from detector, notes, visualiser and chat passes
+# through here. The gateway:
+# - bounds concurrency globally and per model,
+# - coalesces identical in-flight requests into a single call,
+# - retries 429 / 5xx responses with jittered exponential backoff.
+
+# Bounds how many Gemini calls this worker keeps in flight at once.
+# Extra callers wait here instead of flooding the API.
+_ai_semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+_model_semaphores: Dict[str, asyncio.Semaphore] = {}
+_inflight: Dict[str, "asyncio.Future[Any]"] = {}
+
+RETRY_MAX_DELAY = 8.0
+
+gateway_stats = {"calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+
+def _model_semaphore(model_name: str) -> asyncio.Semaphore:
+    semaphore = _model_semaphores.get(model_name)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY_PER_MODEL)
+        _model_semaphores[model_name] = semaphore
+    return semaphore
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code"):
+        code = getattr(exc, attr, None)
+        if callable(code):
+            try:
+                code = code()
+            except Exception:
+                code = None
+        try:
+            return int(code)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429 (rate limit / quota) and 5xx are worth retrying; anything else is not."""
+    code = _status_code(exc)
+    if code is not None:
+        return code == 429 or 500 <= code < 600
+
+    # LangChain wraps the underlying API error; fall back to its message.
+    message = str(exc)
+    return any(marker in message for marker in ("429", "RESOURCE_EXHAUSTED", "503", "UNAVAILABLE"))
+
+
+async def _call_with_retry(model_name: str, call: Callable[[], Awaitable[Any]]):
+    attempt = 0
+    while True:
+        gateway_stats["calls"] += 1
+        queued = time.perf_counter()
+        try:
+            # Semaphores are held per attempt, not across backoff sleeps. The
+            # model slot comes first so callers queued on a busy model don't
+            # hold global slots other models could use.
+            async with _model_semaphore(model_name), _ai_semaphore:
+                gemini_queue_seconds.observe(time.perf_counter() - queued, model=model_name)
+                with gemini_call_seconds.time(model=model_name, mode="call", outcome="error") as labels:
+                    result = await call()
+                    labels["outcome"] = "ok"
+                return result
+        except Exception as exc:
+            if attempt >= AI_MAX_RETRIES or not is_retryable(exc):
+                gateway_stats["failures"] += 1
+                raise
+
+            # Full jitter keeps a burst of rate-limited callers from retrying in lockstep.
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * 2 ** attempt))
+            attempt += 1
+            gateway_stats["retries"] += 1
+            print(f"⚠ Gemini {model_name} attempt {attempt} failed ({exc}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+async def call_model(model_name: str, call: Callable[[], Awaitable[Any]], key: Optional[str] = None):
+    """
+    Run `call()` (a fresh coroutine per attempt) through the gateway.
+    Callers passing the same `key` while a call is in flight share its result.
+    """
+    if key is None:
+        return await _call_with_retry(model_name, call)
+
+    key = f"{model_name}:{key}"
+    future = _inflight.get(key)
+    if future is not None:
+        gateway_stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    future = asyncio.ensure_future(_call_with_retry(model_name, call))
+    _inflight[key] = future
+    future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so one cancelled caller does not cancel the call for everyone else.
+    return await asyncio.shield(future)
+
+
+def request_key(*parts: Any) -> str:
+    """Stable hash of a request's inputs (prompts, image bytes, chain inputs)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(part)
+        elif isinstance(part, dict) and isinstance(part.get("data"), (bytes, bytearray)):
+            digest.update(part.get("mime_type", "").encode())
+            digest.update(part["data"])
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _model_name(chat_model) -> str:
+    return str(getattr(chat_model, "model", "default")).replace("models/", "")
+
+
+async def generate_content(model_name: str, parts: List[Any], json_mode: bool = False):
+    """
+    Non-blocking Gemini `generate_content` call.
+    Uses the native async client so the event loop keeps serving other requests
+    while the model is working. Identical (prompt, image) calls are coalesced.
+    `json_mode` asks Gemini for a bare JSON response.
+    """
+    model = get_generative_model(model_name, json_mode)
+    return await call_model(
+        model_name,
+        lambda: model.generate_content_async(parts),
+        key=request_key(json_mode, *parts),
+    )
+
+
+async def ainvoke_chain(name: str, inputs: Dict[str, Any]):
+    """`ainvoke` a registered LangChain chain through the gateway."""
+    chain = get_chain(name)
+    return await call_model(
+        chain_model(name),
+        lambda: chain.ainvoke(inputs),
+        key=request_key(name, inputs),
+    )
+
+
+def _json_kwargs(json_mode: bool) -> Dict[str, Any]:
+    return {"response_mime_type": JSON_MIME_TYPE} if json_mode else {}
+
+
+async def ainvoke_model(chat_model, messages: List[Any], json_mode: bool = False):
+    """`ainvoke` a LangChain chat model through the gateway."""
+    model_name = _model_name(chat_model)
+    return await call_model(
+        model_name,
+        lambda: chat_model.ainvoke(messages, **_json_kwargs(json_mode)),
+        key=request_key(model_name, json_mode, [getattr(m, "content", m) for m in messages]),
+    )
+
+
+async def stream_content(model_name: str, parts: List[Any], json_mode: bool = False):
+    """
+    Async generator over the text chunks of a streamed Gemini response.
+    Streams are rate-limited but not coalesced or retried: tokens may already
+    have reached the client when an error happens.
+    """
+    model = get_generative_model(model_name, json_mode)
+    queued = time.perf_counter()
+    async with _model_semaphore(model_name), _ai_semaphore:
+        gemini_queue_seconds.observe(time.perf_counter() - queued, model=model_name)
+        with gemini_call_seconds.time(model=model_name, mode="stream", outcome="error") as labels:
+            response = await model.generate_content_async(parts, stream=True)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only).
+                    continue
+                if text:
+                    yield text
+            labels["outcome"] = "ok"
+
+
+async def stream_chat_model(chat_model, prompt: Any, json_mode: bool = False):
+    """Async generator over the text chunks of a streamed LangChain chat model."""
+    model_name = _model_name(chat_model)
+    queued = time.perf_counter()
+    async with _model_semaphore(model_name), _ai_semaphore:
+        gemini_queue_seconds.observe(time.perf_counter() - queued, model=model_name)
+        with gemini_call_seconds.time(model=model_name, mode="stream", outcome="error") as labels:
+            async for chunk in chat_model.astream(prompt, **_json_kwargs(json_mode)):
+                if isinstance(chunk.content, str) and chunk.content:
+                    yield chunk.content
+            labels["outcome"] = "ok"
+
+
+async def read_image_bytes(path: Union[str, Path]) -> bytes:
+    """Read an image from disk on a worker thread instead of the event loop."""
+    return await asyncio.to_thread(Path(path).read_bytes)
@@ -5,9 +5,18 @@ from typing import Optional
 from config import llm, is_ai_enabled
 from models.notes_models import NotesResponse
 from utils.file_utils import resolve_scan_path
-import google.generativeai as genai
-import json
-import re
+from utils.json_stream import JsonStringFieldStream
+from utils.token_utils import estimate_tokens
+from services.ai_gateway import ainvoke_model, generate_content, stream_chat_model
+from services.image_cache import load_scan_image
+from services.image_preprocess import model_image_for
+from services.notes_cache import image_content_hash, notes_cache, notes_cache_key
+from services.notes_context import compact_notes_context, followup_depth, record_followup
+from services.structured_output import parse_model_output
+import time
+
+# Bump whenever NOTES_GENERATE_PROMPT changes so cached notes are not reused.
+NOTES_PROMPT_VERSION = "1"
 
 parser = PydanticOutputParser(pydantic_object=NotesResponse)
 FORMAT_INSTRUCTIONS = parser.get_format_instructions()
@@ -71,7 +80,8 @@ You are an AI Study Assistant continuing a study session about a scanned problem
 
 Context:
 - High‑level topic (from the image): {topic}
-- Existing structured notes (generated from the image): {previous_notes}
+- Relevant parts of the existing notes (generated from the image; the summary recaps the rest):
+{previous_notes}
 
 The student now asks a follow‑up question:
 "{user_prompt}"
@@ -85,15 +95,9 @@ STRICT RULES:
 )
 
 
-def clean_json_output(text: str):
-    text = text.strip()
-    text = re.sub(r"```json", "", text)
-    text = re.sub(r"```", "", text)
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except:
-        return None
+def _retry_context(topic: str, variables: list) -> str:
+    """What a section retry needs to know to regenerate part of the notes."""
+    return f'Structured STEM study notes for a scanned problem. Topic: "{topic}". Variables: {variables}.'
 
 
 async def generate_notes(topic: str, variables: list, image_path: Optional[str] = None):
@@ -103,46 +107,35 @@ async def generate_notes(topic: str, variables: list, image_path: Optional[str]
     # If we have access to the scanned image, let Gemini see it directly.
     if image_path:
         try:
-            local_path = resolve_scan_path(image_path)
+            local_path = model_image_for(resolve_scan_path(image_path))
         except ValueError as exc:
             print(f"⚠ Invalid scan path provided for notes: {exc}")
         else:
-            # Detect MIME type from extension.
-            ext = local_path.suffix.lower()
-            if ext in (".jpg", ".jpeg"):
-                mime_type = "image/jpeg"
-            else:
-                mime_type = "image/png"
-
-            with open(local_path, "rb") as img:
-                img_bytes = img.read()
+            # Served from the per-process image cache when the scan is unchanged.
+            img_bytes, mime_type = await load_scan_image(local_path)
 
             system_prompt = NOTES_GENERATE_PROMPT.format(
                 topic=topic,
                 variables=variables,
             )
 
-            model = genai.GenerativeModel("gemini-2.0-flash")
             try:
-                response = model.generate_content(
+                response = await generate_content(
+                    "gemini-2.0-flash",
                     [
                         system_prompt,
                         {
                             "mime_type": mime_type,
                             "data": img_bytes,
                         },
-                    ]
+                    ],
+                    json_mode=True,
                 )
             except Exception as e:
                 print(f"❌ Gemini API Error in ai_notes: {e}")
                 raise ValueError("Failed to generate notes from image due to AI service error.") from e
 
-            raw_text = response.text
-            data = clean_json_output(raw_text)
-            if data is None:
-                raise ValueError("Invalid JSON from Gemini Notes (image-based)")
-
-            return NotesResponse(**data)
+            return await parse_model_output(response.text, NotesResponse, "notes", _retry_context(topic, variables))
 
     # Fallback: text-only notes generation via LangChain using topic + variables.
     prompt = NOTES_GENERATE_PROMPT.format(
@@ -150,24 +143,95 @@ async def generate_notes(topic: str, variables: list, image_path: Optional[str]
         variables=variables,
     )
 
-    response = llm.invoke([HumanMessage(content=prompt)])
-    raw_text = response.content
-    data = clean_json_output(raw_text)
-    return NotesResponse(**data)
-
+    response = await ainvoke_model(llm, [HumanMessage(content=prompt)], json_mode=True)
+    return await parse_model_output(response.content, NotesResponse, "notes", _retry_context(topic, variables))
+
+
+async def generate_notes_cached(
+    topic: str,
+    variables: list,
+    image_path: Optional[str] = None,
+    use_cache: bool = True,
+):
+    """
+    `generate_notes` behind the notes cache, keyed by normalized topic, sorted
+    variables, prompt version and scan content hash.
+    Returns (NotesResponse, cache_hit).
+    """
+    if not use_cache:
+        notes_cache.bypassed += 1
+        return await generate_notes(topic, variables, image_path), False
+
+    local_path = None
+    if image_path:
+        try:
+            local_path = resolve_scan_path(image_path)
+        except ValueError:
+            local_path = None
+
+    key = notes_cache_key(topic, variables, NOTES_PROMPT_VERSION, await image_content_hash(local_path))
+    cached = await notes_cache.get(key)
+    if cached is not None:
+        return NotesResponse(**cached), True
+
+    start = time.perf_counter()
+    notes = await generate_notes(topic, variables, image_path)
+    await notes_cache.put(
+        key,
+        notes.dict(),
+        meta={"topic": topic, "variables": variables, "prompt_version": NOTES_PROMPT_VERSION},
+        generate_seconds=time.perf_counter() - start,
+    )
+    return notes, False
 
-async def follow_up_notes(topic: str, previous_notes: dict, user_prompt: str):
-    if not is_ai_enabled():
-        raise RuntimeError("Gemini AI is not configured.")
 
+def _follow_up_prompt(topic: str, previous_notes: dict, user_prompt: str):
+    """
+    Follow-up prompt with previous notes compacted to the token budget, instead
+    of the whole (and ever-growing) notes dict. Returns (prompt, info).
+    """
+    context, info = compact_notes_context(previous_notes, user_prompt)
     prompt = NOTES_FOLLOWUP_PROMPT.format(
         topic=topic,
-        previous_notes=previous_notes,
+        previous_notes=context,
         user_prompt=user_prompt
     )
+    return prompt, info
+
+
+async def follow_up_notes(topic: str, previous_notes: dict, user_prompt: str):
+    if not is_ai_enabled():
+        raise RuntimeError("Gemini AI is not configured.")
+
+    prompt, info = _follow_up_prompt(topic, previous_notes, user_prompt)
+
+    start = time.perf_counter()
+    response = await ainvoke_model(llm, [HumanMessage(content=prompt)], json_mode=True)
+    record_followup(followup_depth(previous_notes), info, estimate_tokens(prompt), time.perf_counter() - start)
+
+    context = f"{_retry_context(topic, [])} Follow-up question: \"{user_prompt}\""
+    return await parse_model_output(response.content, NotesResponse, "notes_followup", context)
+
+
+async def stream_follow_up_notes(topic: str, previous_notes: dict, user_prompt: str):
+    """
+    Streaming variant of `follow_up_notes`.
+    Yields {"type": "token", "section": "explanation", "text": ...} frames while
+    the explanation is generated, then {"type": "final", "notes": NotesResponse}.
+    """
+    if not is_ai_enabled():
+        raise RuntimeError("Gemini AI is not configured.")
+
+    prompt, info = _follow_up_prompt(topic, previous_notes, user_prompt)
 
-    response = llm.invoke([HumanMessage(content=prompt)])
-    raw_text = response.content
+    start = time.perf_counter()
+    field = JsonStringFieldStream("explanation")
+    async for text in stream_chat_model(llm, [HumanMessage(content=prompt)], json_mode=True):
+        delta = field.feed(text)
+        if delta:
+            yield {"type": "token", "section": "explanation", "text": delta}
+    record_followup(followup_depth(previous_notes), info, estimate_tokens(prompt), time.perf_counter() - start)
 
-    data = clean_json_output(raw_text)
-    return NotesResponse(**data)
\ No newline at end of file
+    context = f"{_retry_context(topic, [])} Follow-up question: \"{user_prompt}\""
+    notes = await parse_model_output(field.buffer, NotesResponse, "notes_followup", context)
+    yield {"type": "final", "notes": notes}
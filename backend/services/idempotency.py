@@ -0,0 +1,172 @@
+# services/idempotency.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from database.idempotency_model import (
+    IDEMPOTENCY_TTL_SECONDS,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    get_idempotency_key,
+    release_idempotency_key,
+)
+
+# The Flutter client retries /scan/upload and /notes/generate on timeouts.
+# With an Idempotency-Key header a retry joins the original request while it
+# is still running, or gets its stored response replayed once it has finished,
+# instead of running the model and saving history again.
+#
+# How long a retry waits for the original when that runs in another worker process.
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+# An in-progress key not completed within this long is treated as abandoned.
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+IDEMPOTENCY_MEMORY_MAX = 5000
+POLL_SECONDS = 0.25
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(ValueError):
+    """The key was already used for a request with different parameters."""
+
+
+class IdempotencyInProgress(RuntimeError):
+    """The original request is still running elsewhere after IDEMPOTENCY_WAIT_SECONDS."""
+
+
+def request_fingerprint(params: Dict[str, Any]) -> str:
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    In-process futures for requests running here, an LRU of recent responses,
+    and the MongoDB `idempotency_keys` collection (when configured) so the
+    guarantee holds across worker processes and restarts.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._completed: "OrderedDict[str, Tuple[str, Any, float]]" = OrderedDict()
+        self.counters = {"executed": 0, "joined": 0, "replayed": 0, "reused_key": 0, "in_progress": 0}
+
+    async def run(
+        self,
+        scope: str,
+        user_id: str,
+        key: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Returns (response, replayed). `compute` runs at most once per
+        (user, scope, key) while the key is remembered; its response must be
+        JSON/BSON-serializable. A failed request releases the key.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyKeyReused(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.")
+
+        key_id = f"{user_id}:{scope}:{key}"
+        fingerprint = request_fingerprint(params)
+
+        inflight = self._inflight.get(key_id)
+        if inflight is not None:
+            self._check(fingerprint, inflight[0])
+            self.counters["joined"] += 1
+            return await asyncio.shield(inflight[1]), True
+
+        completed = self._completed.get(key_id)
+        if completed is not None and completed[2] > time.monotonic():
+            self._check(fingerprint, completed[0])
+            self._completed.move_to_end(key_id)
+            self.counters["replayed"] += 1
+            return completed[1], True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key_id] = (fingerprint, future)
+        try:
+            response, replayed = await self._claim_and_run(key_id, fingerprint, compute)
+        except BaseException as exc:
+            if isinstance(exc, Exception):
+                future.set_exception(exc)
+                # Joined retries see the same error; don't warn if there were none.
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key_id, None)
+
+        future.set_result(response)
+        self._remember(key_id, fingerprint, response)
+        return response, replayed
+
+    async def _claim_and_run(self, key_id: str, fingerprint: str, compute):
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            try:
+                existing = await claim_idempotency_key(key_id, fingerprint, IDEMPOTENCY_LOCK_SECONDS)
+            except Exception as exc:
+                # Better to risk a duplicate than to fail the request.
+                print(f"⚠ Idempotency store unavailable, running without it: {exc}")
+                self.counters["executed"] += 1
+                return await compute(), False
+
+            if existing is None:
+                break
+
+            self._check(fingerprint, existing["fingerprint"])
+            if existing["status"] == "completed":
+                self.counters["replayed"] += 1
+                return existing["response"], True
+
+            # Running in another process: wait for it to finish or give up its key.
+            while existing is not None and existing["status"] != "completed":
+                if time.monotonic() >= deadline:
+                    self.counters["in_progress"] += 1
+                    raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress.")
+                await asyncio.sleep(POLL_SECONDS)
+                existing = await get_idempotency_key(key_id)
+            if existing is not None:
+                self.counters["replayed"] += 1
+                return existing["response"], True
+            # Released after a failure: claim it and run the request here.
+
+        try:
+            response = await compute()
+        except BaseException:
+            try:
+                await release_idempotency_key(key_id)
+            except Exception as exc:
+                print(f"⚠ Could not release idempotency key: {exc}")
+            raise
+
+        self.counters["executed"] += 1
+        try:
+            await complete_idempotency_key(key_id, response)
+        except Exception as exc:
+            print(f"⚠ Could not store idempotent response: {exc}")
+        return response, False
+
+    def _check(self, fingerprint: str, stored: str):
+        if fingerprint != stored:
+            self.counters["reused_key"] += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used for a different request.")
+
+    def _remember(self, key_id: str, fingerprint: str, response: Any):
+        self._completed[key_id] = (fingerprint, response, time.monotonic() + IDEMPOTENCY_TTL_SECONDS)
+        self._completed.move_to_end(key_id)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "inflight": len(self._inflight), "remembered": len(self._completed)}
+
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_MEMORY_MAX)
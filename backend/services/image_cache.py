@@ -0,0 +1,79 @@
+# services/image_cache.py
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+from services.ai_gateway import read_image_bytes
+
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def mime_type_for(path: Path) -> str:
+    return "image/jpeg" if path.suffix.lower() in (".jpg", ".jpeg") else "image/png"
+
+
+class ImageByteCache:
+    """
+    Per-process LRU of scan bytes + MIME type, bounded by total bytes.
+    Entries are keyed by resolved path and dropped when the file's mtime changes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, Tuple[int, bytes, str]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, path: Path) -> Tuple[bytes, str]:
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == mtime_ns:
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        data = await read_image_bytes(path)
+        mime_type = mime_type_for(path)
+        self._put(path, mtime_ns, data, mime_type)
+        return data, mime_type
+
+    def _put(self, path: Path, mtime_ns: int, data: bytes, mime_type: str):
+        self._drop(path)
+        if len(data) > self.max_bytes:
+            return
+
+        self._entries[path] = (mtime_ns, data, mime_type)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, path: Path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+image_cache = ImageByteCache(IMAGE_CACHE_MAX_BYTES)
+
+
+async def load_scan_image(path: Union[str, Path]) -> Tuple[bytes, str]:
+    """Return (bytes, mime_type) for a scan, served from memory when unchanged."""
+    return await image_cache.get(Path(path).resolve())
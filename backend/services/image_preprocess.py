@@ -0,0 +1,94 @@
+# services/image_preprocess.py
+
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+from PIL import Image, ImageOps
+
+from utils.file_utils import PROJECT_ROOT, STATIC_SCANS_DIR
+
+# Longest side (px) and JPEG quality of the derivative sent to Gemini.
+MODEL_IMAGE_MAX_SIDE = int(os.getenv("MODEL_IMAGE_MAX_SIDE", "1536"))
+MODEL_IMAGE_QUALITY = int(os.getenv("MODEL_IMAGE_QUALITY", "85"))
+
+# Derivatives live next to the originals, which stay untouched for display.
+MODEL_IMAGES_DIR = STATIC_SCANS_DIR / "model"
+
+
+def model_image_path(scan_path: Union[str, Path]) -> Path:
+    """Where the model-ready derivative of a scan is (or will be) stored."""
+    return MODEL_IMAGES_DIR / f"{Path(scan_path).stem}.jpg"
+
+
+def model_image_for(local_path: Path) -> Path:
+    """
+    Return the downscaled derivative for a resolved scan path, falling back to
+    the original for scans uploaded before preprocessing existed.
+    """
+    if local_path.parent == MODEL_IMAGES_DIR:
+        return local_path
+
+    derived = model_image_path(local_path)
+    return derived if derived.is_file() else local_path
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to a JPEG-compatible mode, compositing transparency onto white."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB")
+    return image
+
+
+def _build_derivative(source: Path, target: Path):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MODEL_IMAGE_MAX_SIDE, MODEL_IMAGE_MAX_SIDE), Image.LANCZOS)
+        image = _flatten(image)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file per writer: concurrent uploads of the same scan each
+        # write their own and atomically replace the target with it.
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=".derive-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                # No exif/icc arguments: the re-encoded file carries no metadata.
+                image.save(out, "JPEG", quality=MODEL_IMAGE_QUALITY, optimize=True)
+            os.replace(tmp_path, target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+async def prepare_model_image(saved_path: str) -> str:
+    """
+    Produce the bounded-resolution, metadata-free JPEG used by every AI call
+    for this scan. Returns its path relative to the project root, or the
+    original path if the image could not be processed.
+    """
+    source = (PROJECT_ROOT / saved_path).resolve()
+    target = model_image_path(source)
+
+    # Scans are content-addressed, so an existing derivative is always current.
+    if not target.is_file():
+        try:
+            await asyncio.to_thread(_build_derivative, source, target)
+        except Exception as e:
+            print(f"⚠ Image preprocessing failed for {saved_path}: {e}")
+            return saved_path
+
+        original_kb = source.stat().st_size / 1024
+        derived_kb = target.stat().st_size / 1024
+        print(f"🖼 Model image: {original_kb:.0f} KB → {derived_kb:.0f} KB")
+
+    return str(target.relative_to(PROJECT_ROOT))
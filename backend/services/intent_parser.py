@@ -0,0 +1,207 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from services.simulation import parameter_value
+from services.visualiser_loader import get_template
+
+# Prompts that ask for an explanation always go to the model.
+QUESTION_WORDS = ("why", "how", "what", "explain", "describe", "tell", "show", "can you", "could you", "does", "is it", "compare")
+
+# Extra names for a parameter, keyed by a word from its template label.
+LABEL_SYNONYMS = {
+    "velocity": ("speed", "velocity", "launch speed", "initial speed"),
+    "angle": ("angle", "launch angle", "elevation"),
+    "gravity": ("gravity", "gravitational acceleration", "g force"),
+    "height": ("height",),
+    "amplitude": ("amplitude",),
+    "mass": ("mass",),
+    "spring": ("spring constant", "stiffness", "spring stiffness"),
+    "acceleration": ("acceleration",),
+    "duration": ("duration", "time", "total time", "run time"),
+    "focal": ("focal length", "focus"),
+    "distance": ("object distance",),
+    "object height": ("object height", "object size"),
+}
+
+# unit -> (dimension, factor to the base unit of that dimension)
+UNITS = {
+    "m/s": ("speed", 1.0), "mps": ("speed", 1.0), "meters per second": ("speed", 1.0),
+    "km/h": ("speed", 1 / 3.6), "kmh": ("speed", 1 / 3.6), "kph": ("speed", 1 / 3.6),
+    "deg": ("angle", 1.0), "degree": ("angle", 1.0), "degrees": ("angle", 1.0), "°": ("angle", 1.0),
+    "rad": ("angle", 57.29577951308232), "radian": ("angle", 57.29577951308232), "radians": ("angle", 57.29577951308232),
+    "m/s²": ("acceleration", 1.0), "m/s2": ("acceleration", 1.0), "m/s^2": ("acceleration", 1.0),
+    "m": ("length", 1.0), "meter": ("length", 1.0), "meters": ("length", 1.0), "metre": ("length", 1.0), "metres": ("length", 1.0),
+    "cm": ("length", 0.01), "mm": ("length", 0.001), "km": ("length", 1000.0),
+    "kg": ("mass", 1.0), "g": ("mass", 0.001), "gram": ("mass", 0.001), "grams": ("mass", 0.001),
+    "n/m": ("stiffness", 1.0),
+    "s": ("time", 1.0), "sec": ("time", 1.0), "second": ("time", 1.0), "seconds": ("time", 1.0),
+    "ms": ("time", 0.001), "min": ("time", 60.0), "minute": ("time", 60.0), "minutes": ("time", 60.0),
+}
+
+NUMBER = r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?"
+UNIT = "|".join(sorted((re.escape(unit) for unit in UNITS), key=len, reverse=True))
+SET_VERBS = r"(?:please\s+)?(?:set|change|make|put|adjust|update|use|switch|let)?\s*(?:the\s+)?"
+CONNECTOR = r"\s*(?:to|=|:|at|is|be|of|equal to|equals)\s*"
+FILLER = re.compile(r"^(?:please|thanks|thank you|now|ok|okay|and|then|also)?[\s.!]*$")
+
+
+@dataclass
+class ParameterIntent:
+    updates: Dict[str, float]
+    response: str
+    notes: List[str] = field(default_factory=list)
+
+
+def _label_parts(label: str) -> Tuple[str, Optional[str]]:
+    """'Launch angle (θ)' -> ('launch angle', 'θ')."""
+    match = re.match(r"^(.*?)\s*\(([^)]*)\)\s*$", label)
+    if match:
+        return match.group(1).strip().lower(), match.group(2).strip()
+    return label.strip().lower(), None
+
+
+@lru_cache(maxsize=64)
+def _patterns(labels: Tuple[Tuple[str, str], ...]) -> List[Tuple[str, Any, Any, Any]]:
+    """
+    Compiled (parameter, set, relative, scale) patterns for every way of naming
+    a parameter, longest phrase first. Bare symbols like "a" or "u" need an
+    explicit "to"/"=" after them so ordinary words are not read as parameters.
+    """
+    out = []
+    for name, label in labels:
+        text, symbol = _label_parts(label)
+        phrases = {text}
+        for keyword, synonyms in LABEL_SYNONYMS.items():
+            if keyword in text:
+                phrases.update(synonyms)
+        for phrase in phrases:
+            out.append((phrase, name, False))
+        for symbol_name in {name, symbol} - {None}:
+            out.append((symbol_name.lower(), name, len(symbol_name) <= 2))
+
+    # A phrase that could name two parameters of the template is dropped.
+    owners: Dict[str, set] = {}
+    for phrase, name, _ in out:
+        owners.setdefault(phrase, set()).add(name)
+    unique = sorted(
+        {(phrase, name, strict) for phrase, name, strict in out if len(owners[phrase]) == 1},
+        key=lambda item: (-len(item[0]), item[0]),
+    )
+
+    compiled = []
+    for phrase, name, strict in unique:
+        escaped = re.escape(phrase)
+        connector = CONNECTOR if strict else r"(?:%s|\s+)" % CONNECTOR
+        compiled.append((
+            name,
+            re.compile(rf"{SET_VERBS}{escaped}{connector}({NUMBER})\s*({UNIT})?"),
+            re.compile(rf"(increase|raise|decrease|lower|reduce)\s+(?:the\s+)?{escaped}\s+by\s+({NUMBER})\s*(%|{UNIT})?"),
+            re.compile(rf"(double|halve|triple)\s+(?:the\s+)?{escaped}"),
+        ))
+    return compiled
+
+
+def _convert(value: float, unit: Optional[str], spec: Mapping[str, Any]) -> Optional[float]:
+    if not unit:
+        return value
+    given = UNITS.get(unit.lower())
+    target = UNITS.get(str(spec.get("unit", "")).lower())
+    if given is None or target is None or given[0] != target[0]:
+        return None
+    return value * given[1] / target[1]
+
+
+def _clause_update(clause: str, patterns, parameters, current: Dict[str, float]) -> Optional[Tuple[str, float]]:
+    for name, set_pattern, relative_pattern, scale_pattern in patterns:
+        spec = parameters[name]
+
+        match = set_pattern.fullmatch(clause)
+        if match:
+            value = _convert(float(match.group(1)), match.group(2), spec)
+            return (name, value) if value is not None else None
+
+        match = relative_pattern.fullmatch(clause)
+        if match:
+            amount, unit = float(match.group(2)), match.group(3)
+            if unit == "%":
+                amount = current[name] * amount / 100
+            else:
+                amount = _convert(amount, unit, spec)
+                if amount is None:
+                    return None
+            sign = 1 if match.group(1) in ("increase", "raise") else -1
+            return name, current[name] + sign * amount
+
+        match = scale_pattern.fullmatch(clause)
+        if match:
+            factor = {"double": 2.0, "halve": 0.5, "triple": 3.0}[match.group(1)]
+            return name, current[name] * factor
+    return None
+
+
+def parse_parameter_intent(
+    prompt: str,
+    template: Mapping[str, Any],
+    current_params: Optional[Mapping[str, Any]] = None,
+) -> Optional[ParameterIntent]:
+    """
+    Turn a plain edit like "set angle to 45" or "make gravity 3.7 and double
+    the speed" into parameter updates for `template`, without the model.
+
+    Returns None unless every clause of the prompt is an edit this parser is
+    sure about; questions, unknown names and unit mismatches go to the model.
+    """
+    text = " ".join((prompt or "").lower().split()).strip(" .!")
+    if not text or "?" in text or text.startswith(QUESTION_WORDS):
+        return None
+
+    parameters = template["parameters"]
+    current_params = current_params or {}
+    current = {name: parameter_value(current_params.get(name), spec) for name, spec in parameters.items()}
+    patterns = _patterns(tuple((name, str(spec.get("label", name))) for name, spec in parameters.items()))
+
+    updates: Dict[str, float] = {}
+    for clause in re.split(r"\s*(?:,|;|\band\b|\bthen\b|\balso\b)\s*", text):
+        if FILLER.match(clause):
+            continue
+        result = _clause_update(clause, patterns, parameters, current)
+        if result is None or result[0] in updates:
+            return None
+        name, value = result
+        updates[name] = value
+        current[name] = value
+
+    if not updates:
+        return None
+
+    parts, notes = [], []
+    for name, value in updates.items():
+        spec = parameters[name]
+        clamped = parameter_value(value, spec)
+        if clamped != value:
+            notes.append(f"{name} limited to its range {spec['min']}–{spec['max']} {spec.get('unit', '')}".strip())
+        updates[name] = round(clamped, 6)
+        parts.append(f"{spec.get('label', name)} to {updates[name]:g} {spec.get('unit', '')}".strip())
+
+    response = "Set " + ", ".join(parts) + "."
+    if notes:
+        response += " (" + "; ".join(notes) + ".)"
+    return ParameterIntent(updates=updates, response=response, notes=notes)
+
+
+# How often visualiser/chat prompts were answered here vs sent to the model.
+intent_stats = {"local": 0, "model": 0}
+
+
+def local_parameter_update(
+    prompt: str,
+    template_id: Optional[str],
+    current_params: Optional[Mapping[str, Any]] = None,
+) -> Optional[ParameterIntent]:
+    """`parse_parameter_intent` for a template id; None means "ask the model"."""
+    template = get_template(template_id) if template_id else None
+    intent = parse_parameter_intent(prompt, template.data, current_params) if template else None
+    intent_stats["local" if intent else "model"] += 1
+    return intent
@@ -0,0 +1,299 @@
+# services/job_queue.py
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database.jobs_model import (
+    claim_job,
+    find_job_by_key,
+    get_job,
+    insert_job,
+    job_expiry,
+    requeue_stale_jobs,
+    update_job,
+)
+
+# Long AI operations (scan detection, notes) run here instead of inside the
+# HTTP request, so a dropped mobile connection doesn't throw the result away:
+# the client polls GET /jobs/{id} until it is ready. Jobs are persisted in the
+# MongoDB `jobs` collection when it is configured (and resumed after a
+# restart); otherwise they live in this process only. No external broker.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "1000"))
+# A job interrupted by restarts this many times is failed instead of run again.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Running jobs not updated for this long belong to a dead worker and are requeued.
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+JOB_MEMORY_MAX = 5000
+MAX_WAIT_SECONDS = 25.0
+
+FINISHED = ("succeeded", "failed")
+
+JobHandler = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# kind -> (handler, message shown to the client when it fails)
+_handlers: Dict[str, Tuple[JobHandler, str]] = {}
+
+
+def register_job(kind: str, handler: JobHandler, error_message: str = "Job failed."):
+    """`handler(user_id, params)` returns the JSON-serializable job result."""
+    _handlers[kind] = (handler, error_message)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class JobQueue:
+    """
+    asyncio worker pool over an in-process queue of job ids. Submissions with
+    the same (user, kind, idempotency key) get the existing job back instead
+    of a new one.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._keys: Dict[Tuple[str, str, str], str] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self.counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "resumed": 0, "succeeded": 0, "failed": 0}
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        loop = asyncio.get_running_loop()
+        while len(self._tasks) < self.workers and not self._stopping:
+            self._tasks.append(loop.create_task(self._worker()))
+
+    def _remember(self, job: Dict[str, Any]):
+        self._jobs[job["_id"]] = job
+        self._jobs.move_to_end(job["_id"])
+        if job.get("idempotency_key"):
+            self._keys[(job["user_id"], job["kind"], job["idempotency_key"])] = job["_id"]
+
+        if len(self._jobs) > JOB_MEMORY_MAX:
+            # Finished jobs are still in MongoDB (if configured) until they expire.
+            for job_id in [job_id for job_id, old in self._jobs.items() if old["status"] in FINISHED]:
+                self._forget(job_id)
+                if len(self._jobs) <= JOB_MEMORY_MAX:
+                    break
+
+    def _forget(self, job_id: str):
+        job = self._jobs.pop(job_id, None)
+        if job and job.get("idempotency_key"):
+            self._keys.pop((job["user_id"], job["kind"], job["idempotency_key"]), None)
+        self._done.pop(job_id, None)
+
+    def _live(self, job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if job is not None and job["expires_at"] <= datetime.utcnow():
+            self._forget(job["_id"])
+            return None
+        return job
+
+    async def submit(
+        self,
+        kind: str,
+        user_id: str,
+        params: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Returns (job, created); created is False for a repeated idempotency key."""
+        if kind not in _handlers:
+            raise KeyError(f"Unknown job kind '{kind}'")
+
+        if idempotency_key:
+            key = (user_id, kind, idempotency_key)
+            existing = self._live(self._jobs.get(self._keys.get(key, "")))
+            if existing is None:
+                existing = self._live(await find_job_by_key(user_id, kind, idempotency_key))
+                # Another request with this key may have submitted while we were looking.
+                existing = self._live(self._jobs.get(self._keys.get(key, ""))) or existing
+            if existing is not None:
+                self.counters["deduplicated"] += 1
+                return existing, False
+
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise JobQueueFull("Too many jobs queued; try again shortly.")
+
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "user_id": user_id,
+            "params": params,
+            "idempotency_key": idempotency_key,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": job_expiry(now),
+        }
+        self._remember(job)
+        if not await insert_job(job):
+            # Same key submitted through another worker process first.
+            self._forget(job["_id"])
+            existing = await find_job_by_key(user_id, kind, idempotency_key)
+            self.counters["deduplicated"] += 1
+            return existing, False
+
+        self._queue.put_nowait(job["_id"])
+        self.counters["submitted"] += 1
+        return job, True
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The job if it exists, has not expired and belongs to `user_id`."""
+        job = self._live(self._jobs.get(job_id))
+        if job is None:
+            job = self._live(await get_job(job_id))
+        if job is None or job["user_id"] != user_id:
+            return None
+        return job
+
+    async def wait(self, job_id: str, user_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """`get`, but first wait up to `timeout` seconds for a job running here to finish."""
+        job = await self.get(job_id, user_id)
+        if job is not None and job["status"] not in FINISHED and job_id in self._jobs and timeout > 0:
+            event = self._done.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(timeout, MAX_WAIT_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = await self.get(job_id, user_id)
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as exc:
+                # Claiming or bookkeeping failed (e.g. MongoDB went away). Fail
+                # the job so its waiters are released and keep this worker alive.
+                print(f"❌ Job {job_id} could not be run: {exc}")
+                await self._fail_unrun(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        claimed = await claim_job(job_id, self.worker_id)
+        if claimed is None:
+            # Another process claimed it (e.g. both resumed it after a restart).
+            return
+        job = claimed or self._jobs.get(job_id)
+        if job is None:
+            return
+
+        now = datetime.utcnow()
+        if not claimed:
+            job.update(status="running", worker=self.worker_id, started_at=now, updated_at=now, attempts=job["attempts"] + 1)
+        self._remember(job)
+        self._wait_seconds += (now - job["created_at"]).total_seconds()
+
+        handler, error_message = _handlers.get(job["kind"], (None, "Unknown job kind."))
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise KeyError(job["kind"])
+            if job["attempts"] > JOB_MAX_ATTEMPTS:
+                raise RuntimeError("interrupted too many times")
+            result = await handler(job["user_id"], job["params"])
+            fields = {"status": "succeeded", "result": result, "error": None}
+        except Exception as exc:
+            print(f"❌ Job {job_id} ({job['kind']}) failed: {exc}")
+            # HTTPExceptions raised by shared route helpers carry a client-facing detail.
+            fields = {"status": "failed", "error": getattr(exc, "detail", None) or error_message}
+        self._run_seconds += time.perf_counter() - start
+        await self._finish(job_id, job, fields)
+
+    async def _fail_unrun(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            event = self._done.pop(job_id, None)
+            if event is not None:
+                event.set()
+            return
+        _, error_message = _handlers.get(job["kind"], (None, "Unknown job kind."))
+        await self._finish(job_id, job, {"status": "failed", "error": error_message})
+
+    async def _finish(self, job_id: str, job: Dict[str, Any], fields: Dict[str, Any]):
+        now = datetime.utcnow()
+        fields.update(updated_at=now, finished_at=now, expires_at=job_expiry(now))
+        job.update(fields)
+        self.counters[fields["status"]] += 1
+        try:
+            await update_job(job_id, fields)
+        except Exception as exc:
+            print(f"⚠ Could not persist job {job_id}: {exc}")
+
+        event = self._done.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def start(self):
+        """Resume jobs that were queued, or left running by a dead worker, before a restart."""
+        self._stopping = False
+        self._ensure_started()
+        for job in await requeue_stale_jobs(JOB_STALE_SECONDS):
+            if job["_id"] not in self._jobs:
+                self._remember(job)
+                self._queue.put_nowait(job["_id"])
+                self.counters["resumed"] += 1
+        if self.counters["resumed"]:
+            print(f"🤖 Resumed {self.counters['resumed']} queued jobs")
+
+    async def stop(self):
+        """Stop the workers. Interrupted jobs go back to queued for the next start."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for job_id, job in self._jobs.items():
+            if job["status"] == "running":
+                job["status"] = "queued"
+                await update_job(job_id, {"status": "queued", "updated_at": datetime.utcnow()})
+
+    def stats(self) -> Dict[str, Any]:
+        started = self.counters["succeeded"] + self.counters["failed"]
+        return {
+            **self.counters,
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": sum(1 for job in self._jobs.values() if job["status"] == "running"),
+            "avg_wait_seconds": round(self._wait_seconds / started, 3) if started else 0.0,
+            "avg_run_seconds": round(self._run_seconds / started, 3) if started else 0.0,
+        }
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """What GET /jobs/{id} returns: no params, owner or bookkeeping fields."""
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_MAX_QUEUE)
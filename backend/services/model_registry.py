@@ -0,0 +1,91 @@
+# services/model_registry.py
+
+from typing import Any, Callable, Dict, Tuple
+
+import google.generativeai as genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from config import GEMINI_API_KEY, llm
+
+# Shared, long-lived model clients and chains. Building these is not free
+# (client setup, format-instruction rendering, schema generation), so they are
+# created once and reused by every request.
+_chat_models: Dict[Tuple[str, float, bool], ChatGoogleGenerativeAI] = {}
+_generative_models: Dict[Tuple[str, bool], genai.GenerativeModel] = {}
+_chain_builders: Dict[str, Tuple[str, float, bool, Callable[[ChatGoogleGenerativeAI], Any]]] = {}
+_chains: Dict[str, Any] = {}
+
+# JSON mode: Gemini returns a bare JSON document (no fences, no prose around it).
+JSON_MIME_TYPE = "application/json"
+
+# The config-level LLM is the default text model; reuse it instead of a twin.
+if llm is not None:
+    _chat_models[(llm.model.replace("models/", ""), llm.temperature, False)] = llm
+
+
+def get_chat_model(model: str, temperature: float, json_mode: bool = False) -> ChatGoogleGenerativeAI:
+    """Return the LangChain chat model for (model, temperature, json_mode), building it once."""
+    key = (model, temperature, json_mode)
+    chat_model = _chat_models.get(key)
+    if chat_model is None:
+        chat_model = ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=GEMINI_API_KEY,
+            response_mime_type=JSON_MIME_TYPE if json_mode else None,
+        )
+        _chat_models[key] = chat_model
+    return chat_model
+
+
+def get_generative_model(model_name: str, json_mode: bool = False) -> genai.GenerativeModel:
+    """Return the google.generativeai model used for multimodal (image) calls."""
+    key = (model_name, json_mode)
+    model = _generative_models.get(key)
+    if model is None:
+        model = genai.GenerativeModel(
+            model_name,
+            generation_config={"response_mime_type": JSON_MIME_TYPE} if json_mode else None,
+        )
+        _generative_models[key] = model
+    return model
+
+
+def register_chain(
+    name: str,
+    model: str,
+    temperature: float,
+    build: Callable[[ChatGoogleGenerativeAI], Any],
+    json_mode: bool = False,
+):
+    """
+    Register how to build a named chain (e.g. `prompt | llm | parser`).
+    The chain itself is built lazily, or eagerly by `warm_up()` at startup.
+    """
+    _chain_builders[name] = (model, temperature, json_mode, build)
+    _chains.pop(name, None)
+
+
+def chain_model(name: str) -> str:
+    """Model name a registered chain runs on."""
+    return _chain_builders[name][0]
+
+
+def get_chain(name: str):
+    chain = _chains.get(name)
+    if chain is None:
+        model, temperature, json_mode, build = _chain_builders[name]
+        chain = build(get_chat_model(model, temperature, json_mode))
+        _chains[name] = chain
+    return chain
+
+
+def warm_up(vision_models=(("gemini-2.0-flash", False), ("gemini-2.0-flash", True))):
+    """Build every registered chain and the vision models before the first request."""
+    if not GEMINI_API_KEY:
+        return
+
+    for name in _chain_builders:
+        get_chain(name)
+    for model_name, json_mode in vision_models:
+        get_generative_model(model_name, json_mode)
@@ -0,0 +1,110 @@
+# services/notes_cache.py
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database.notes_cache_model import get_cached_notes, save_cached_notes
+from services.image_cache import load_scan_image
+
+NOTES_CACHE_MAX_ENTRIES = int(os.getenv("NOTES_CACHE_MAX_ENTRIES", "512"))
+
+_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+async def image_content_hash(local_path: Optional[Path]) -> str:
+    """
+    Scans are stored under their SHA-256 (see services/storage), so the file
+    stem is the content hash. Older uuid-named scans are hashed on demand.
+    """
+    if local_path is None:
+        return ""
+    if _SHA256_HEX.match(local_path.stem):
+        return local_path.stem
+
+    data, _ = await load_scan_image(local_path)
+    return hashlib.sha256(data).hexdigest()
+
+
+def notes_cache_key(topic: str, variables: List[str], prompt_version: str, image_hash: str) -> str:
+    key_material = json.dumps(
+        {
+            "topic": _normalize(topic),
+            "variables": sorted({_normalize(v) for v in variables or []}),
+            "prompt_version": prompt_version,
+            "image": image_hash,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class NotesCache:
+    """In-process LRU in front of the MongoDB `notes_cache` collection."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.seconds_saved = 0.0
+        # Running average of a real generation, used to estimate time saved per hit.
+        self._avg_generate_seconds = 0.0
+        self._generations = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        notes = self._entries.get(key)
+        if notes is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            self.seconds_saved += self._avg_generate_seconds
+            return notes
+
+        notes = await get_cached_notes(key)
+        if notes is not None:
+            self._remember(key, notes)
+            self.db_hits += 1
+            self.seconds_saved += self._avg_generate_seconds
+            return notes
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, notes: Dict[str, Any], meta: Dict[str, Any], generate_seconds: float):
+        self._generations += 1
+        self._avg_generate_seconds += (generate_seconds - self._avg_generate_seconds) / self._generations
+        self._remember(key, notes)
+        await save_cached_notes(key, notes, meta)
+
+    def _remember(self, key: str, notes: Dict[str, Any]):
+        self._entries[key] = notes
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "avg_generate_seconds": round(self._avg_generate_seconds, 3),
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+notes_cache = NotesCache(NOTES_CACHE_MAX_ENTRIES)
@@ -0,0 +1,162 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from services.semantic_cache import vectorize
+from utils.token_utils import estimate_tokens
+
+# Upper bound on the (estimated) tokens of previous notes sent with a follow-up.
+NOTES_FOLLOWUP_TOKEN_BUDGET = int(os.getenv("NOTES_FOLLOWUP_TOKEN_BUDGET", "1200"))
+
+NOTE_SECTIONS = (
+    "summary",
+    "formulas",
+    "variable_breakdown",
+    "explanation",
+    "example",
+    "mistakes",
+    "practice_questions",
+    "resources",
+)
+# Keys clients send back inside previous_notes that are not note content.
+META_KEYS = frozenset({"image_path", "followup_depth"})
+# Nudges on top of relevance to the question: formulas and symbols are usually
+# worth keeping, links and old practice questions rarely are.
+SECTION_PRIOR = {
+    "formulas": 0.15,
+    "variable_breakdown": 0.1,
+    "resources": -0.2,
+    "practice_questions": -0.1,
+}
+MAX_CHUNK_CHARS = 400
+MAX_DEPTH_BUCKET = 10
+
+
+def _chunks(text: str) -> List[str]:
+    """Split prose into paragraph/sentence chunks of at most ~MAX_CHUNK_CHARS."""
+    out = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph.strip()):
+            if current and len(current) + len(sentence) + 1 > MAX_CHUNK_CHARS:
+                out.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            out.append(current)
+    return out
+
+
+def _section_items(value: Any) -> List[str]:
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return _chunks(str(value)) if value else []
+
+
+def followup_depth(previous_notes: Dict[str, Any]) -> int:
+    """How many follow-ups deep the next answer is (the first follow-up is 1)."""
+    try:
+        return int(previous_notes.get("followup_depth", 0)) + 1
+    except (TypeError, ValueError, AttributeError):
+        return 1
+
+
+def compact_notes_context(
+    previous_notes: Dict[str, Any],
+    user_prompt: str,
+    budget: int = NOTES_FOLLOWUP_TOKEN_BUDGET,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Render the parts of `previous_notes` that matter for `user_prompt` within
+    `budget` estimated tokens. The notes' own summary goes in first as the
+    recap of everything earlier; the remaining chunks (explanation sentences,
+    single formulas, mistakes, ...) are added by relevance to the question
+    until the budget is spent. Output keeps the original section order.
+    Returns (context_text, info).
+    """
+    sections = [name for name in NOTE_SECTIONS if name in previous_notes]
+    sections += [name for name in previous_notes if name not in NOTE_SECTIONS and name not in META_KEYS]
+    items = {name: _section_items(previous_notes[name]) for name in sections}
+
+    query = vectorize(user_prompt)
+    candidates = []
+    for name in sections:
+        for index, text in enumerate(items[name]):
+            if name == "summary":
+                priority = float("inf")
+            else:
+                priority = float(vectorize(text) @ query) + SECTION_PRIOR.get(name, 0.0)
+            candidates.append((priority, name, index, text))
+    candidates.sort(key=lambda item: -item[0])
+
+    used = 0
+    kept: Dict[str, set] = {name: set() for name in sections}
+    for _, name, index, text in candidates:
+        # Each item costs its text plus a bullet and a newline.
+        cost = estimate_tokens(text) + 1
+        if used + cost > budget:
+            continue
+        kept[name].add(index)
+        used += cost
+
+    lines = []
+    dropped = 0
+    for name in sections:
+        if not kept[name]:
+            dropped += len(items[name])
+            continue
+        lines.append(f"{name}:")
+        lines.extend(f"- {text}" for index, text in enumerate(items[name]) if index in kept[name])
+        omitted = len(items[name]) - len(kept[name])
+        if omitted:
+            lines.append(f"  ({omitted} more omitted)")
+            dropped += omitted
+
+    context = "\n".join(lines)
+    info = {
+        "raw_tokens": estimate_tokens(str(previous_notes)),
+        "context_tokens": estimate_tokens(context),
+        "kept_items": sum(len(indices) for indices in kept.values()),
+        "dropped_items": dropped,
+    }
+    return context, info
+
+
+# depth -> totals, for spotting prompts that grow with conversation length.
+followup_stats: Dict[int, Dict[str, float]] = {}
+
+
+def record_followup(depth: int, info: Dict[str, int], prompt_tokens: int, seconds: float):
+    bucket = followup_stats.setdefault(
+        min(depth, MAX_DEPTH_BUCKET),
+        {"calls": 0, "raw_tokens": 0, "prompt_tokens": 0, "seconds": 0.0},
+    )
+    bucket["calls"] += 1
+    bucket["raw_tokens"] += info["raw_tokens"]
+    bucket["prompt_tokens"] += prompt_tokens
+    bucket["seconds"] += seconds
+    print(
+        f"📝 Follow-up depth {depth}: ~{prompt_tokens} prompt tokens "
+        f"(notes {info['raw_tokens']} -> {info['context_tokens']}), {seconds:.2f}s"
+    )
+
+
+def followup_summary() -> Dict[str, Dict[str, float]]:
+    """Per-depth averages of prompt tokens and latency."""
+    return {
+        str(depth): {
+            "calls": bucket["calls"],
+            "avg_raw_notes_tokens": round(bucket["raw_tokens"] / bucket["calls"]),
+            "avg_prompt_tokens": round(bucket["prompt_tokens"] / bucket["calls"]),
+            "avg_seconds": round(bucket["seconds"] / bucket["calls"], 3),
+        }
+        for depth, bucket in sorted(followup_stats.items())
+    }
+
+
+def notes_payload(notes: Dict[str, Any], depth: int) -> Dict[str, Any]:
+    """Notes as returned to the client, tagged with their follow-up depth so it comes back next round."""
+    return {**notes, "followup_depth": depth}
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+# Cosine similarity a new question needs with a stored one to reuse its answer.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.75"))
+SEMANTIC_CACHE_MAX_PER_TOPIC = int(os.getenv("SEMANTIC_CACHE_MAX_PER_TOPIC", "200"))
+SEMANTIC_CACHE_MAX_TOPICS = int(os.getenv("SEMANTIC_CACHE_MAX_TOPICS", "256"))
+
+# 2 KB per stored question; a full cache is max_topics * max_per_topic of them.
+DIMENSIONS = 512
+NEGATIONS = frozenset({"not", "no", "never", "without"})
+# Direction and comparison words, mapped to one form per word. Opposites
+# ("increase" vs "decrease") barely move the vector but flip the answer.
+DIRECTIONS = {
+    "increase": "increase", "increases": "increase", "increased": "increase", "increasing": "increase",
+    "decrease": "decrease", "decreases": "decrease", "decreased": "decrease", "decreasing": "decrease",
+    "raise": "raise", "raises": "raise", "raised": "raise", "raising": "raise",
+    "lower": "lower", "lowers": "lower", "lowered": "lower", "lowering": "lower",
+    "higher": "higher", "more": "more", "less": "less", "fewer": "less",
+    "faster": "faster", "slower": "slower",
+    "double": "double", "doubles": "double", "doubled": "double", "doubling": "double",
+    "halve": "halve", "halves": "halve", "halved": "halve", "halving": "halve", "half": "halve",
+}
+STOP_WORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "be", "does", "do", "did", "it", "its", "this", "that", "of", "to",
+    "in", "on", "at", "for", "with", "me", "my", "i", "we", "please", "can", "could", "you", "what", "whats",
+    "how", "happens", "happen", "about", "get", "give", "tell", "there", "s",
+})
+# Words students use interchangeably in physics questions, mapped to one form.
+SYNONYMS = {
+    "equation": "formula", "calculate": "formula", "compute": "formula", "find": "formula", "expression": "formula",
+    "speed": "velocity", "fast": "velocity",
+    "maximum": "max", "highest": "max", "largest": "max", "biggest": "max", "greatest": "max", "top": "max",
+    "trajectory": "path", "curved": "curve", "curves": "curve", "curving": "curve", "parabola": "curve",
+    "upside": "inverted", "flip": "inverted", "flipped": "inverted",
+    "mean": "define", "meaning": "define", "defined": "define", "definition": "define", "explain": "define",
+    "affect": "change", "affects": "change", "matter": "change", "depend": "change", "depends": "change", "effect": "change",
+    "shm": "simple harmonic motion",
+}
+
+
+def normalize_question(text: str) -> str:
+    text = text.lower().replace("’", "'").replace("n't", " not")
+    # Keep decimal points ("9.81"), drop every other punctuation mark.
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    return " ".join(re.sub(r"[^a-z0-9.\s]+", " ", text).split())
+
+
+def _bucket(feature: str) -> Tuple[int, float]:
+    # crc32 rather than hash(): stable across processes, so vectors are reproducible.
+    code = zlib.crc32(feature.encode("utf-8"))
+    return code % DIMENSIONS, 1.0 if code & 0x80000000 else -1.0
+
+
+def vectorize(text: str) -> np.ndarray:
+    """
+    Hashed bag of words, word bigrams and character trigrams, L2-normalized.
+    Trigrams make paraphrases and small typos land close together.
+    """
+    words = [
+        canonical
+        for word in normalize_question(text).split()
+        for canonical in SYNONYMS.get(word, word).split()
+        if canonical not in STOP_WORDS
+    ]
+    features: List[Tuple[str, float]] = [(word, 1.0) for word in words]
+    features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for feature, weight in features:
+        index, sign = _bucket(feature)
+        vector[index] += sign * weight
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _guards(text: str) -> Tuple[FrozenSet[str], bool, FrozenSet[str]]:
+    """
+    Numbers, negation and direction words change the answer even when the
+    wording barely changes ("at 30 degrees" vs "at 60 degrees", "why does" vs
+    "why doesn't", "increase" vs "decrease"), so all must match exactly for a hit.
+    """
+    words = normalize_question(text).split()
+    numbers = frozenset(word for word in words if re.fullmatch(r"\d+(?:\.\d+)?", word))
+    directions = frozenset(DIRECTIONS[word] for word in words if word in DIRECTIONS)
+    return numbers, any(word in NEGATIONS for word in words), directions
+
+
+class _TopicIndex:
+    """Matrix of question vectors, grown on demand up to `capacity`, with LRU slot reuse."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(8, capacity), DIMENSIONS), dtype=np.float32)
+        self.entries: List[Dict[str, Any]] = []
+
+    def best(self, vector: np.ndarray) -> Tuple[int, float]:
+        if not self.entries:
+            return -1, 0.0
+        scores = self.vectors[: len(self.entries)] @ vector
+        index = int(np.argmax(scores))
+        return index, float(scores[index])
+
+    def put(self, vector: np.ndarray, entry: Dict[str, Any], replace: int) -> bool:
+        """Store at `replace` (>= 0), append, or evict the least recently used. True if evicted."""
+        evicted = False
+        if replace < 0:
+            if len(self.entries) < self.capacity:
+                if len(self.entries) == len(self.vectors):
+                    grown = np.zeros((min(2 * len(self.vectors), self.capacity), DIMENSIONS), dtype=np.float32)
+                    grown[: len(self.vectors)] = self.vectors
+                    self.vectors = grown
+                replace = len(self.entries)
+                self.entries.append(entry)
+            else:
+                replace = min(range(len(self.entries)), key=lambda i: self.entries[i]["used"])
+                evicted = True
+        self.entries[replace] = entry
+        self.vectors[replace] = vector
+        return evicted
+
+
+class SemanticAnswerCache:
+    """
+    Per-topic nearest-neighbour cache of model explanations. A question whose
+    vector is within `threshold` cosine similarity of a stored one (and has the
+    same numbers, negation and direction words) gets the stored answer without a model call.
+    Runs entirely in-process: no embedding service or model download.
+    """
+
+    def __init__(self, threshold: float, max_per_topic: int, max_topics: int):
+        self.threshold = threshold
+        self.max_per_topic = max_per_topic
+        self.max_topics = max_topics
+        self._topics: "OrderedDict[Tuple[str, ...], _TopicIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def scope(
+        topic: Optional[str],
+        template_id: Optional[str],
+        image_path: Optional[str],
+        current_params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, ...]:
+        # Scan paths are content hashes, so the same handout shares a scope.
+        # The simulation parameters are part of the prompt ("why does it go
+        # higher now?"), so answers for other slider values must not match.
+        params = json.dumps(current_params, sort_keys=True, default=str) if current_params else ""
+        params_key = hashlib.sha256(params.encode("utf-8")).hexdigest()[:16] if params else ""
+        return (normalize_question(topic or ""), template_id or "", image_path or "", params_key)
+
+    def lookup(self, scope: Tuple[str, ...], question: str) -> Optional[Dict[str, Any]]:
+        index = self._topics.get(scope)
+        if index is not None:
+            self._topics.move_to_end(scope)
+            slot, score = index.best(vectorize(question))
+            if slot >= 0 and score >= self.threshold and index.entries[slot]["guards"] == _guards(question):
+                entry = index.entries[slot]
+                entry["used"] = time.monotonic()
+                entry["hits"] += 1
+                self.hits += 1
+                return entry["answer"]
+
+        self.misses += 1
+        return None
+
+    def store(self, scope: Tuple[str, ...], question: str, answer: Dict[str, Any]):
+        index = self._topics.get(scope)
+        if index is None:
+            if len(self._topics) >= self.max_topics:
+                self._topics.popitem(last=False)
+            index = self._topics[scope] = _TopicIndex(self.max_per_topic)
+        self._topics.move_to_end(scope)
+
+        vector = vectorize(question)
+        guards = _guards(question)
+        slot, score = index.best(vector)
+        # A near-duplicate of a stored question refreshes that entry instead of adding one.
+        replace = slot if slot >= 0 and score >= self.threshold and index.entries[slot]["guards"] == guards else -1
+
+        entry = {"question": question, "answer": answer, "guards": guards, "used": time.monotonic(), "hits": 0}
+        if index.put(vector, entry, replace):
+            self.evictions += 1
+        self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "topics": len(self._topics),
+            "entries": sum(len(index.entries) for index in self._topics.values()),
+        }
+
+
+answer_cache = SemanticAnswerCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_PER_TOPIC, SEMANTIC_CACHE_MAX_TOPICS)
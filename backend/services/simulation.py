@@ -0,0 +1,195 @@
+import base64
+import math
+import os
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+# Points per sampled series. Clients interpolate between them when animating.
+SIMULATION_SAMPLES = int(os.getenv("SIMULATION_SAMPLES", "240"))
+MAX_SIMULATION_SAMPLES = 2000
+SERIES_ENCODING = "float32-le-base64"
+
+Arrays = Dict[str, np.ndarray]
+# Parameters arrive as (B, 1) columns so every template evaluates B parameter
+# sets at once; the result is (B, N) series and (B,) summary values.
+Simulator = Callable[[Arrays, np.ndarray], Tuple[Arrays, Arrays]]
+
+
+def _projectile_motion(p: Arrays, s: np.ndarray) -> Tuple[Arrays, Arrays]:
+    theta = np.radians(p["theta"])
+    vx0, vy0, g = p["U"] * np.cos(theta), p["U"] * np.sin(theta), p["g"]
+    flight_time = 2 * vy0 / g
+    t = flight_time * s
+    vy = vy0 - g * t
+    series = {
+        "t": t,
+        "x": vx0 * t,
+        "y": vy0 * t - 0.5 * g * t ** 2,
+        "v": np.hypot(vx0, vy),
+    }
+    summary = {
+        "time_of_flight": flight_time,
+        "range": vx0 * flight_time,
+        "max_height": vy0 ** 2 / (2 * g),
+        "apex_time": flight_time / 2,
+    }
+    return series, summary
+
+
+def _free_fall(p: Arrays, s: np.ndarray) -> Tuple[Arrays, Arrays]:
+    fall_time = np.sqrt(2 * p["h"] / p["g"])
+    t = fall_time * s
+    series = {"t": t, "y": p["h"] - 0.5 * p["g"] * t ** 2, "v": -p["g"] * t}
+    summary = {"fall_time": fall_time, "impact_speed": p["g"] * fall_time}
+    return series, summary
+
+
+def _shm(p: Arrays, s: np.ndarray) -> Tuple[Arrays, Arrays]:
+    omega = np.sqrt(p["k"] / p["m"])
+    period = 2 * np.pi / omega
+    t = period * s
+    x = p["A"] * np.cos(omega * t)
+    series = {"t": t, "x": x, "v": -p["A"] * omega * np.sin(omega * t), "a": -omega ** 2 * x}
+    summary = {
+        "omega": omega,
+        "period": period,
+        "max_speed": p["A"] * omega,
+        "energy": 0.5 * p["k"] * p["A"] ** 2,
+    }
+    return series, summary
+
+
+def _kinematics_1d(p: Arrays, s: np.ndarray) -> Tuple[Arrays, Arrays]:
+    t = p["t_max"] * s
+    series = {"t": t, "x": p["u"] * t + 0.5 * p["a"] * t ** 2, "v": p["u"] + p["a"] * t}
+    summary = {"final_position": series["x"][:, -1:], "final_velocity": series["v"][:, -1:]}
+    return series, summary
+
+
+def _optics_lens(p: Arrays, s: np.ndarray) -> Tuple[Arrays, Arrays]:
+    # Object at -u on the axis, lens at 0: 1/f = 1/v - 1/u  =>  v = u*f / (u - f).
+    f, u, h_o = p["f"], p["u"], p["h_o"]
+    # u == f puts the image at infinity; those values come out non-finite.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = u * f / (u - f)
+        magnification = -v / u
+        h_i = magnification * h_o
+
+        # Ray through the optical centre, sampled from the object tip to the image
+        # tip (for a virtual image the ray is traced back, so x runs the other way).
+        series = {"x": -u + (v + u) * s, "y": h_o + (h_i - h_o) * s}
+    summary = {
+        "image_distance": v,
+        "magnification": magnification,
+        "image_height": h_i,
+        "real_image": (u > f).astype(np.float64),
+    }
+    return series, summary
+
+
+SIMULATORS: Dict[str, Simulator] = {
+    "projectile_motion": _projectile_motion,
+    "free_fall": _free_fall,
+    "shm": _shm,
+    "kinematics_1d": _kinematics_1d,
+    "optics_lens": _optics_lens,
+}
+
+
+def supports(template_id: str) -> bool:
+    return template_id in SIMULATORS
+
+
+def parameter_value(raw: Any, spec: Mapping[str, Any]) -> float:
+    """
+    Accept either a bare number or a template-style {"value": ...} entry,
+    fall back to the template default, and clamp to [min, max].
+    """
+    if isinstance(raw, Mapping):
+        raw = raw.get("value")
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        value = float(spec["value"])
+    if not math.isfinite(value):
+        value = float(spec["value"])
+    return min(max(value, float(spec["min"])), float(spec["max"]))
+
+
+def simulate_batch(template_id: str, params: Mapping[str, np.ndarray], samples: int) -> Tuple[Arrays, Arrays]:
+    """
+    Evaluate B parameter sets in one vectorized pass. `params` maps each
+    parameter to a (B,) array of already clamped values.
+    Returns ((B, samples) series, (B,) summary).
+    """
+    columns = {name: np.asarray(values, dtype=np.float64).reshape(-1, 1) for name, values in params.items()}
+    s = np.linspace(0.0, 1.0, samples)[None, :]
+    series, summary = SIMULATORS[template_id](columns, s)
+
+    batch = next(iter(columns.values())).shape[0]
+    series = {name: np.broadcast_to(values, (batch, samples)) for name, values in series.items()}
+    summary = {name: np.broadcast_to(values, (batch, 1)).reshape(batch) for name, values in summary.items()}
+    return series, summary
+
+
+def encode_series(values: np.ndarray) -> str:
+    """Little-endian float32, base64: 4 bytes per sample before encoding."""
+    with np.errstate(invalid="ignore", over="ignore"):
+        packed = np.ascontiguousarray(values, dtype="<f4")
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _scalar(value: float) -> Optional[float]:
+    value = float(value)
+    return round(value, 6) if math.isfinite(value) else None
+
+
+def simulate(template: Mapping[str, Any], parameters: Optional[Mapping[str, Any]] = None,
+             samples: int = SIMULATION_SAMPLES) -> Optional[Dict[str, Any]]:
+    """
+    Sampled trajectory and key figures for one template + parameter set, ready to
+    put in a JSON response. None for templates without a simulator.
+    """
+    template_id = template["template_id"]
+    if not supports(template_id):
+        return None
+
+    parameters = parameters or {}
+    samples = max(2, min(samples, MAX_SIMULATION_SAMPLES))
+    values = {
+        name: parameter_value(parameters.get(name), spec)
+        for name, spec in template["parameters"].items()
+    }
+    series, summary = simulate_batch(template_id, {name: [value] for name, value in values.items()}, samples)
+
+    return {
+        "parameters": values,
+        "samples": samples,
+        "encoding": SERIES_ENCODING,
+        "series": {name: encode_series(column[0]) for name, column in series.items()},
+        "summary": {name: _scalar(column[0]) for name, column in summary.items()},
+    }
+
+
+def to_json_list(values: np.ndarray) -> list:
+    """Rounded floats with non-finite entries as None."""
+    rounded = np.round(np.asarray(values, dtype=np.float64), 6)
+    if np.isfinite(rounded).all():
+        return rounded.tolist()
+    return [value if math.isfinite(value) else None for value in rounded.tolist()]
+
+
+def grid_block(axes: Mapping[str, np.ndarray], fixed: Mapping[str, float], offset: int, count: int) -> Arrays:
+    """
+    Parameter columns for combinations [offset, offset + count) of the cartesian
+    product of `axes` (row-major, last axis fastest), plus `fixed` broadcast to
+    the same length. Only this block is materialized, never the whole grid.
+    """
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+    flat = np.arange(offset, offset + count)
+    block = {name: axes[name][index] for name, index in zip(names, np.unravel_index(flat, shape))}
+    for name, value in fixed.items():
+        block[name] = np.full(count, value)
+    return block
@@ -1,12 +1,26 @@
+import asyncio
+import hashlib
 import os
-import uuid
+import tempfile
+
+from utils.metrics import file_save_seconds
 
 ALLOWED_CONTENT_TYPES = {"image/png", "image/jpeg", "image/jpg"}
 MAX_SCAN_BYTES = 5 * 1024 * 1024  # 5 MB
 SCANS_DIR = "static/scans/"
+CHUNK_SIZE = 256 * 1024
 
 
 async def save_scan(file):
+    """
+    Validate and store an uploaded scan under its SHA-256 content hash.
+    Returns (relative_path, content_hash).
+    """
+    with file_save_seconds.time():
+        return await _save_scan(file)
+
+
+async def _save_scan(file):
     os.makedirs(SCANS_DIR, exist_ok=True)
 
     # Read first 1KB to check magic bytes
@@ -22,24 +36,51 @@ async def save_scan(file):
     # We still use the extension for the filename, but based on detection
     ext = ".png" if is_png else ".jpg"
 
-    filename = f"{uuid.uuid4()}{ext}"
-    file_path = os.path.join(SCANS_DIR, filename)
-
-    contents = bytearray()
+    # Stream chunks straight into a temp file next to the final location, so
+    # only one chunk is held in memory and the rename below stays atomic.
+    fd, tmp_path = tempfile.mkstemp(dir=SCANS_DIR, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
     total_bytes = 0
-    while True:
-        chunk = await file.read(1024 * 1024)
-        if not chunk:
-            break
-        total_bytes += len(chunk)
-        if total_bytes > MAX_SCAN_BYTES:
-            raise ValueError("File too large. Maximum allowed size is 5 MB.")
-        contents.extend(chunk)
-
-    if total_bytes == 0:
-        raise ValueError("Uploaded file is empty.")
-
-    with open(file_path, "wb") as f:
-        f.write(contents)
-
-    return f"static/scans/{filename}"
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                total_bytes += len(chunk)
+                if total_bytes > MAX_SCAN_BYTES:
+                    raise ValueError("File too large. Maximum allowed size is 5 MB.")
+                # Hashing and disk writes run on a worker thread.
+                await asyncio.to_thread(_write_chunk, out, digest, chunk)
+
+        if total_bytes == 0:
+            raise ValueError("Uploaded file is empty.")
+
+        content_hash = digest.hexdigest()
+        filename = f"{content_hash}{ext}"
+        await asyncio.to_thread(_finalize, tmp_path, os.path.join(SCANS_DIR, filename))
+    except BaseException:
+        await asyncio.to_thread(_discard, tmp_path)
+        raise
+
+    return f"static/scans/{filename}", content_hash
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _finalize(tmp_path: str, file_path: str):
+    # Content-addressed: a re-upload of the same image reuses the existing file.
+    if os.path.exists(file_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, file_path)
+
+
+def _discard(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
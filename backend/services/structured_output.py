@@ -0,0 +1,391 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from config import is_ai_enabled
+from services.ai_gateway import ainvoke_model
+from services.model_registry import get_chat_model
+from utils.metrics import json_parse_seconds
+from utils.token_utils import estimate_tokens
+
+# Model + temperature used to regenerate only the fields a response got wrong.
+SECTION_RETRY_MODEL = (os.getenv("STRUCTURED_RETRY_MODEL", "gemini-2.0-flash"), 0.3)
+STRUCTURED_SECTION_RETRIES = int(os.getenv("STRUCTURED_SECTION_RETRIES", "1"))
+
+_FENCE = re.compile(r"```(?:json|JSON)?")
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class StructuredOutputError(ValueError):
+    """The model output could not be turned into the schema, even after section retries."""
+
+
+class _Truncated(Exception):
+    """Input ended inside a value."""
+
+
+class _TolerantParser:
+    """
+    Recursive-descent JSON reader that accepts what models actually send:
+    trailing or missing commas, single quotes, bare keys, raw newlines in
+    strings, Python literals and comments. It works on any prefix of the
+    output: a value cut off by the token limit is dropped, while every
+    member completed before the cut is kept.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.repaired = False
+
+    def _skip(self):
+        text = self.text
+        while self.pos < len(text):
+            ch = text[self.pos]
+            if ch.isspace():
+                self.pos += 1
+            elif text.startswith("//", self.pos):
+                end = text.find("\n", self.pos)
+                self.pos = len(text) if end < 0 else end + 1
+                self.repaired = True
+            elif text.startswith("/*", self.pos):
+                end = text.find("*/", self.pos + 2)
+                self.pos = len(text) if end < 0 else end + 2
+                self.repaired = True
+            else:
+                return
+
+    def _peek(self) -> str:
+        self._skip()
+        if self.pos >= len(self.text):
+            raise _Truncated()
+        return self.text[self.pos]
+
+    def value(self) -> Any:
+        ch = self._peek()
+        if ch == "{":
+            return self._container("}", {})
+        if ch == "[":
+            return self._container("]", [])
+        if ch in "\"'":
+            return self._string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            if self.pos >= len(self.text):
+                # A number at the very end may be missing digits.
+                raise _Truncated()
+            number = match.group()
+            return float(number) if any(c in number for c in ".eE") else int(number)
+        word = re.match(r"[A-Za-z_][A-Za-z0-9_]*", self.text[self.pos:])
+        if word and word.group() in _LITERALS:
+            self.pos += word.end()
+            if word.group() not in ("true", "false", "null"):
+                self.repaired = True
+            return _LITERALS[word.group()]
+        if word and self.pos + word.end() >= len(self.text):
+            raise _Truncated()
+        raise ValueError(f"unexpected {ch!r} at {self.pos}")
+
+    def _container(self, close: str, out):
+        """Object or array; on truncation, `_Truncated.partial` carries the complete members."""
+        self.pos += 1
+        while True:
+            try:
+                ch = self._peek()
+            except _Truncated as exc:
+                exc.partial = out
+                raise
+            if ch == close:
+                self.pos += 1
+                return out
+            if ch == ",":
+                # Leading, doubled or trailing comma.
+                self.pos += 1
+                self.repaired = True
+                continue
+            if ch in "}]":
+                # Mismatched closer: treat it as ours.
+                self.pos += 1
+                self.repaired = True
+                return out
+
+            try:
+                if isinstance(out, dict):
+                    key = self._key()
+                    if self._peek() == ":":
+                        self.pos += 1
+                    else:
+                        self.repaired = True
+                    out[key] = self.value()
+                else:
+                    out.append(self.value())
+            except _Truncated as exc:
+                exc.partial = out
+                raise
+
+            try:
+                ch = self._peek()
+            except _Truncated as exc:
+                exc.partial = out
+                raise
+            if ch == ",":
+                self.pos += 1
+            elif ch != close:
+                self.repaired = True
+
+    def _key(self) -> str:
+        if self._peek() in "\"'":
+            return self._string()
+        match = re.match(r"[^\s:,{}\[\]\"']+", self.text[self.pos:])
+        if not match:
+            raise ValueError(f"expected a key at {self.pos}")
+        self.pos += match.end()
+        self.repaired = True
+        return match.group()
+
+    def _string(self) -> str:
+        text = self.text
+        quote = text[self.pos]
+        if quote == "'":
+            self.repaired = True
+        i = self.pos + 1
+        out = []
+        while i < len(text):
+            ch = text[i]
+            if ch == quote:
+                self.pos = i + 1
+                return "".join(out)
+            if ch != "\\":
+                if ch in "\n\r\t":
+                    self.repaired = True
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(text):
+                break
+            code = text[i + 1]
+            if code == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[i + 2 : i + 6]):
+                out.append(chr(int(text[i + 2 : i + 6], 16)))
+                i += 6
+            elif code in _ESCAPES:
+                out.append(_ESCAPES[code])
+                i += 2
+            else:
+                # LaTeX in formulas ("\omega", "\alpha") is a common invalid escape: keep it verbatim.
+                out.append("\\" + code)
+                self.repaired = True
+                i += 2
+        raise _Truncated()
+
+
+def strip_fences(text: str) -> str:
+    return _FENCE.sub("", text or "").strip()
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], bool, bool]:
+    """
+    Parse model output as JSON. Returns (value, repaired, truncated); value is
+    None when there is no JSON object or array in the text at all.
+    """
+    with json_parse_seconds.time():
+        return _repair_json(text)
+
+
+def _repair_json(text: str) -> Tuple[Optional[Any], bool, bool]:
+    text = strip_fences(text)
+    try:
+        return json.loads(text), False, False
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return None, True, False
+    parser = _TolerantParser(text)
+    parser.pos = min(starts)
+    try:
+        return parser.value(), True, False
+    except _Truncated as exc:
+        return getattr(exc, "partial", None), True, True
+    except ValueError:
+        return None, True, False
+
+
+_adapters: Dict[Tuple[type, str], TypeAdapter] = {}
+_json_schemas: Dict[type, Dict[str, Any]] = {}
+
+
+def _field_adapter(schema: Type[BaseModel], name: str) -> TypeAdapter:
+    key = (schema, name)
+    adapter = _adapters.get(key)
+    if adapter is None:
+        adapter = _adapters[key] = TypeAdapter(schema.model_fields[name].annotation)
+    return adapter
+
+
+def _coerce(value: Any) -> List[Any]:
+    """Near-miss shapes worth trying before declaring a field invalid."""
+    if isinstance(value, str):
+        return [[line.strip(" -•*") for line in value.splitlines() if line.strip(" -•*")]]
+    if isinstance(value, list):
+        return ["\n".join(str(item) for item in value)]
+    if isinstance(value, dict):
+        return ["\n".join(f"{key}: {item}" for key, item in value.items()), [f"{key}: {item}" for key, item in value.items()]]
+    return [str(value)] if value is not None else []
+
+
+def _validate_field(schema: Type[BaseModel], name: str, value: Any) -> Tuple[bool, Any]:
+    adapter = _field_adapter(schema, name)
+    for candidate in [value, *_coerce(value)]:
+        try:
+            return True, adapter.validate_python(candidate)
+        except ValidationError:
+            continue
+    return False, None
+
+
+@dataclass
+class StructuredResult:
+    data: Dict[str, Any]
+    # Required fields that are absent, cut off or fail validation.
+    missing: List[str] = field(default_factory=list)
+    repaired: bool = False
+    truncated: bool = False
+
+
+def parse_structured(text: str, schema: Type[BaseModel], fields: Optional[List[str]] = None) -> StructuredResult:
+    """
+    Field-by-field parse of `text` against `schema` (or just `fields` of it).
+    Valid fields are kept even when others are broken, so only those need
+    regenerating.
+    """
+    value, repaired, truncated = repair_json(text)
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if not isinstance(value, dict):
+        value = {}
+
+    result = StructuredResult(data={}, repaired=repaired, truncated=truncated)
+    for name, info in schema.model_fields.items():
+        if fields is not None and name not in fields:
+            continue
+        ok = False
+        if name in value:
+            ok, parsed = _validate_field(schema, name, value[name])
+            if ok:
+                result.data[name] = parsed
+        if not ok and info.is_required():
+            result.missing.append(name)
+    return result
+
+
+# label -> counters, e.g. "notes", "chat".
+structured_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _stats(label: str) -> Dict[str, int]:
+    return structured_stats.setdefault(label, {
+        "parses": 0,
+        "clean": 0,
+        "repaired": 0,
+        "truncated": 0,
+        "section_retries": 0,
+        "failures": 0,
+        "wasted_tokens": 0,
+        "retry_tokens": 0,
+    })
+
+
+def structured_summary() -> Dict[str, Dict[str, Any]]:
+    """Counters plus parse-failure rate per label."""
+    summary = {}
+    for label, stats in structured_stats.items():
+        parses = stats["parses"]
+        summary[label] = {
+            **stats,
+            "failure_rate": round(stats["failures"] / parses, 4) if parses else 0.0,
+            "retry_rate": round(stats["section_retries"] / parses, 4) if parses else 0.0,
+        }
+    return summary
+
+
+SECTION_RETRY_PROMPT = """
+{context}
+
+An earlier JSON response for this request was missing or had invalid values for these fields: {fields}.
+Fields already generated (keep consistent with them, do not repeat them):
+{present}
+
+Generate ONLY the missing fields. Return ONLY a JSON object with exactly the keys {fields}, matching this JSON schema:
+{schema}
+"""
+
+
+def _section_prompt(schema: Type[BaseModel], data: Dict[str, Any], missing: List[str], context: str) -> str:
+    full = _json_schemas.get(schema)
+    if full is None:
+        full = _json_schemas[schema] = schema.model_json_schema()
+    subset = {
+        "type": "object",
+        "properties": {name: full["properties"][name] for name in missing},
+        "required": missing,
+    }
+    present = json.dumps(data, ensure_ascii=False, default=str)
+    if len(present) > 1500:
+        present = present[:1500] + " ..."
+    return SECTION_RETRY_PROMPT.format(
+        context=context.strip(),
+        fields=", ".join(missing),
+        present=present,
+        schema=json.dumps(subset, ensure_ascii=False),
+    )
+
+
+async def parse_model_output(text: str, schema: Type[BaseModel], label: str, context: str = "") -> BaseModel:
+    """
+    Turn raw model output into `schema`. Broken or cut-off fields are
+    regenerated on their own (a small JSON-mode call listing just those
+    fields) instead of repeating the whole request. Raises
+    StructuredOutputError when fields are still missing after that.
+    """
+    stats = _stats(label)
+    stats["parses"] += 1
+    result = parse_structured(text, schema)
+    stats["repaired" if result.repaired else "clean"] += 1
+    stats["truncated"] += int(result.truncated)
+    if result.missing:
+        kept = estimate_tokens(json.dumps(result.data, ensure_ascii=False, default=str)) if result.data else 0
+        stats["wasted_tokens"] += max(0, estimate_tokens(text or "") - kept)
+
+    data, missing = result.data, result.missing
+    attempts = 0
+    while missing and attempts < STRUCTURED_SECTION_RETRIES and is_ai_enabled():
+        attempts += 1
+        stats["section_retries"] += 1
+        print(f"⚠ Regenerating {label} fields {missing} (output {'truncated' if result.truncated else 'invalid'})")
+        prompt = _section_prompt(schema, data, missing, context)
+        try:
+            response = await ainvoke_model(
+                get_chat_model(*SECTION_RETRY_MODEL), [HumanMessage(content=prompt)], json_mode=True
+            )
+        except Exception as exc:
+            stats["failures"] += 1
+            raise StructuredOutputError(f"Invalid JSON from Gemini ({label}); section retry failed: {exc}") from exc
+        stats["retry_tokens"] += estimate_tokens(prompt) + estimate_tokens(response.content)
+
+        retry = parse_structured(response.content, schema, fields=missing)
+        data = {**data, **retry.data}
+        missing = retry.missing
+
+    if missing:
+        stats["failures"] += 1
+        raise StructuredOutputError(f"Invalid JSON from Gemini ({label}): missing or invalid {', '.join(missing)}")
+    return schema(**data)
@@ -1,40 +1,282 @@
-import os
+import asyncio
+import difflib
 import json
-from typing import Dict, Any, Optional
+import os
+import re
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from services.simulation import simulate
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "templates", "visualiser")
 
+# Poll the templates directory and swap in a fresh registry when a file changes.
+# 0 disables the watcher (templates then only load at startup).
+TEMPLATE_RELOAD_SECONDS = float(os.getenv("TEMPLATE_RELOAD_SECONDS", "0"))
+
+# Extra ways detect_topic and users name a template, on top of each template's
+# id, file name and title (which are indexed automatically).
 TOPIC_TO_TEMPLATE = {
     "projectile motion": "projectile_motion.json",
-    "projectile_motion": "projectile_motion.json",
     "projectile": "projectile_motion.json",
+    "trajectory": "projectile_motion.json",
     "free fall": "free_fall.json",
-    "free_fall": "free_fall.json",
+    "falling body": "free_fall.json",
     "shm": "shm.json",
     "simple harmonic motion": "shm.json",
-    "harmonic": "shm.json"
+    "harmonic": "shm.json",
+    "oscillation": "shm.json",
+    "mass spring": "shm.json",
+    "kinematics": "kinematics.json",
+    "linear motion": "kinematics.json",
+    "uniformly accelerated motion": "kinematics.json",
+    "constant acceleration": "kinematics.json",
+    "suvat": "kinematics.json",
+    "optics": "optics.json",
+    "lens": "optics.json",
+    "convex lens": "optics.json",
+    "lens formula": "optics.json",
+    "image formation": "optics.json",
 }
 
-def _load_template(filename: str) -> Dict[str, Any]:
-    path = os.path.join(TEMPLATES_DIR, filename)
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+FILLER_WORDS = frozenset({"a", "an", "and", "the", "of", "in", "on", "to", "for", "with", "by", "under"})
+# Tokens that say nothing about which simulation fits ("linear algebra",
+# "constant velocity"), so they never score a template on their own.
+STOP_WORDS = FILLER_WORDS | frozenset({
+    "physics", "motion", "1d", "2d", "simple", "linear", "constant", "uniform", "uniformly",
+    "free", "body", "mass", "image", "formula",
+})
+# Unknown words are only corrected to index terms at least this long and at
+# most one letter longer or shorter ("projectle"), not to any near word
+# ("kinetics" is not "kinematics").
+FUZZY_CUTOFF = 0.85
+FUZZY_MIN_LENGTH = 6
+# Free-text topics that needed the token/fuzzy path are remembered per registry.
+RESOLVED_CACHE_MAX = 4096
 
-async def get_template_by_topic(topic: str) -> Optional[Dict[str, Any]]:
-    if not topic:
-        return None
 
-    key = topic.strip().lower()
-    filename = TOPIC_TO_TEMPLATE.get(key)
+def normalize_topic(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def _tokens(text: str) -> List[str]:
+    return [token for token in normalize_topic(text).split() if token not in STOP_WORDS]
+
+
+def _words(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in normalize_topic(text).split() if word not in FILLER_WORDS)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def validate_template(raw: Any, filename: str):
+    """Raises ValueError describing the first problem found."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{filename}: expected a JSON object")
+
+    for field in ("template_id", "title", "animation_type"):
+        if not isinstance(raw.get(field), str) or not raw[field]:
+            raise ValueError(f"{filename}: missing '{field}'")
+
+    parameters = raw.get("parameters")
+    if not isinstance(parameters, dict) or not parameters:
+        raise ValueError(f"{filename}: 'parameters' must be a non-empty object")
+
+    for name, spec in parameters.items():
+        bounds = [spec.get(key) for key in ("min", "value", "max")] if isinstance(spec, dict) else []
+        if len(bounds) != 3 or not all(isinstance(bound, (int, float)) for bound in bounds):
+            raise ValueError(f"{filename}: parameter '{name}' needs numeric min, value and max")
+        if not bounds[0] <= bounds[1] <= bounds[2]:
+            raise ValueError(f"{filename}: parameter '{name}' value is outside [min, max]")
+
+
+@dataclass(frozen=True)
+class VisualiserTemplate:
+    template_id: str
+    filename: str
+    data: Mapping[str, Any]
+    # Serialized /visualiser/generate response, built once at load time.
+    generate_body: bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A mutable copy callers may change freely."""
+        return _thaw(self.data)
+
+
+@dataclass(frozen=True)
+class TemplateRegistry:
+    templates: Mapping[str, VisualiserTemplate]
+    aliases: Mapping[str, str]
+    token_index: Mapping[str, FrozenSet[str]]
+    # (words of an alias, template id); a query must contain every word of one.
+    phrases: Tuple[Tuple[FrozenSet[str], str], ...]
+    signature: Tuple[Tuple[str, int, int], ...]
+    _resolved: Dict[str, Optional[str]] = field(default_factory=dict, compare=False, repr=False)
+
+    def resolve(self, topic: str) -> Optional[VisualiserTemplate]:
+        """
+        Exact alias hit in O(1); otherwise only templates with a whole alias
+        among the query words ("free fall under gravity") are candidates, and
+        ties between them are broken by the query tokens they are indexed
+        under (rarer tokens count more). Misspelt long terms are corrected
+        first.
+        """
+        key = normalize_topic(topic or "")
+        if not key:
+            return None
+
+        template_id = self.aliases.get(key)
+        if template_id is None:
+            if key in self._resolved:
+                template_id = self._resolved[key]
+            else:
+                template_id = self._match_tokens(key)
+                if len(self._resolved) < RESOLVED_CACHE_MAX:
+                    self._resolved[key] = template_id
+        return self.templates[template_id] if template_id else None
+
+    def _correct(self, word: str) -> str:
+        if word in self.token_index or len(word) < FUZZY_MIN_LENGTH - 1:
+            return word
+        terms = [
+            term for term in self.token_index
+            if len(term) >= FUZZY_MIN_LENGTH and abs(len(term) - len(word)) <= 1
+        ]
+        close = difflib.get_close_matches(word, terms, n=1, cutoff=FUZZY_CUTOFF)
+        return close[0] if close else word
 
-    if not filename:
-        return None
+    def _match_tokens(self, key: str) -> Optional[str]:
+        words = frozenset(self._correct(word) for word in _words(key))
+        candidates = {template_id for phrase, template_id in self.phrases if phrase <= words}
+        if len(candidates) < 2:
+            return next(iter(candidates), None)
 
-    try:
-        return _load_template(filename)
-    except FileNotFoundError:
-        return None
+        scores = dict.fromkeys(candidates, 0.0)
+        for token in words - STOP_WORDS:
+            postings = self.token_index.get(token, ())
+            for candidate in postings:
+                if candidate in scores:
+                    scores[candidate] += 1.0 / len(postings)
 
-def fill_template_defaults(template: Dict[str, Any], variables=None):
-    out = dict(template)
-    return out
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+
+def _directory_signature() -> Tuple[Tuple[str, int, int], ...]:
+    entries = []
+    for entry in os.scandir(TEMPLATES_DIR):
+        if entry.name.endswith(".json") and entry.is_file():
+            stat = entry.stat()
+            entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(entries))
+
+
+def build_registry() -> TemplateRegistry:
+    signature = _directory_signature()
+    templates: Dict[str, VisualiserTemplate] = {}
+    by_filename: Dict[str, str] = {}
+
+    for filename, _, size in signature:
+        if size == 0:
+            print(f"⚠ Skipping visualiser template {filename}: empty file")
+            continue
+        try:
+            with open(os.path.join(TEMPLATES_DIR, filename), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            validate_template(raw, filename)
+        except (OSError, ValueError) as exc:
+            print(f"⚠ Skipping visualiser template {filename}: {exc}")
+            continue
+
+        template_id = raw["template_id"]
+        # Default-parameter trajectory is part of the precomputed body too.
+        body = json.dumps(
+            {"template_id": template_id, "template": raw, "simulation": simulate(raw)},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        templates[template_id] = VisualiserTemplate(template_id, filename, _freeze(raw), body)
+        by_filename[filename] = template_id
+
+    aliases: Dict[str, str] = {}
+    for template in templates.values():
+        for name in (template.template_id, template.filename[: -len(".json")], template.data["title"]):
+            aliases.setdefault(normalize_topic(name), template.template_id)
+    for alias, filename in TOPIC_TO_TEMPLATE.items():
+        if filename in by_filename:
+            aliases[normalize_topic(alias)] = by_filename[filename]
+
+    token_index: Dict[str, set] = {}
+    for alias, template_id in aliases.items():
+        for token in _tokens(alias):
+            token_index.setdefault(token, set()).add(template_id)
+
+    return TemplateRegistry(
+        templates=MappingProxyType(templates),
+        aliases=MappingProxyType(aliases),
+        token_index=MappingProxyType({token: frozenset(ids) for token, ids in token_index.items()}),
+        phrases=tuple((_words(alias), template_id) for alias, template_id in aliases.items() if _words(alias)),
+        signature=signature,
+    )
+
+
+_registry: Optional[TemplateRegistry] = None
+_watch_task: Optional[asyncio.Task] = None
+
+
+def load_templates() -> TemplateRegistry:
+    """(Re)build the registry from disk. Readers keep using the old one until the swap."""
+    global _registry
+    _registry = build_registry()
+    print(f"Loaded {len(_registry.templates)} visualiser templates")
+    return _registry
+
+
+def get_registry() -> TemplateRegistry:
+    return _registry if _registry is not None else load_templates()
+
+
+def resolve_template(topic: str) -> Optional[VisualiserTemplate]:
+    return get_registry().resolve(topic)
+
+
+def get_template(template_id: str) -> Optional[VisualiserTemplate]:
+    return get_registry().templates.get(template_id)
+
+
+async def _watch_templates():
+    while True:
+        await asyncio.sleep(TEMPLATE_RELOAD_SECONDS)
+        try:
+            if _directory_signature() != get_registry().signature:
+                load_templates()
+        except OSError as exc:
+            print(f"⚠ Template reload failed: {exc}")
+
+
+def start_template_watcher():
+    global _watch_task
+    if TEMPLATE_RELOAD_SECONDS > 0 and _watch_task is None:
+        _watch_task = asyncio.get_running_loop().create_task(_watch_templates())
+
+
+async def get_template_by_topic(topic: str) -> Optional[Dict[str, Any]]:
+    """Deprecated: use resolve_template(). Kept for callers of the old loader API."""
+    template = resolve_template(topic)
+    return template.to_dict() if template else None
@@ -0,0 +1,95 @@
+import json
+import re
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonStringFieldStream:
+    """
+    Incrementally decode one string field (e.g. "response") out of a JSON
+    object that is still being generated token by token.
+
+    `feed()` takes the next raw chunk and returns only the newly decoded part
+    of the field's value, so it can be forwarded to the client straight away.
+    """
+
+    def __init__(self, field: str):
+        self._field_start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ""
+        self._pos = None  # index in buffer of the next undecoded value char
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if self._pos is None:
+            match = self._field_start.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+
+            # Escape sequence: wait for the rest of it if it was split across chunks.
+            if i + 1 >= len(buf):
+                break
+            code = buf[i + 1]
+            if code == "u":
+                if i + 6 > len(buf):
+                    break
+                try:
+                    codepoint = int(buf[i + 2 : i + 6], 16)
+                except ValueError:
+                    codepoint = 0xFFFD
+                step = 6
+                if 0xD800 <= codepoint <= 0xDBFF:
+                    # High surrogate: combine with the following \uXXXX low surrogate.
+                    if i + 12 > len(buf):
+                        break
+                    if buf[i + 6 : i + 8] == "\\u":
+                        try:
+                            low = int(buf[i + 8 : i + 12], 16)
+                        except ValueError:
+                            low = 0
+                        if 0xDC00 <= low <= 0xDFFF:
+                            codepoint = 0x10000 + ((codepoint - 0xD800) << 10) + (low - 0xDC00)
+                            step = 12
+                if 0xD800 <= codepoint <= 0xDFFF:
+                    codepoint = 0xFFFD
+                out.append(chr(codepoint))
+                i += step
+            else:
+                out.append(_ESCAPES.get(code, code))
+                i += 2
+
+        self._pos = i
+        return "".join(out)
+
+
+async def ndjson_lines(frames):
+    """Serialize an async iterator of dict frames as newline-delimited JSON."""
+    async for frame in frames:
+        yield json.dumps(frame, default=str) + "\n"
@@ -0,0 +1,274 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.routing import Mount, compile_path
+
+# Prometheus text-format metrics for GET /metrics, without a client library.
+# Everything runs on the event loop thread, so plain dicts are enough.
+
+# Seconds; spans a Mongo insert (ms) up to a slow Gemini call (tens of s).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ROUTE_CACHE_MAX = 4096
+
+_metrics: List["_Metric"] = []
+# (component, stats function, label for nested dicts, label for top-level keys)
+_collectors: List[Tuple[str, Callable[[], Dict[str, Any]], str, Optional[str]]] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts (non-cumulative, last one is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, seconds: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        entry[1] += seconds
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[Dict[str, Any]]:
+        """
+        Observe the duration of the `with` block. Labels can still be changed
+        through the yielded dict (e.g. an outcome known only at the end).
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def register_stats(
+    component: str,
+    get_stats: Callable[[], Dict[str, Any]],
+    label: str = "key",
+    by: Optional[str] = None,
+):
+    """
+    Expose an existing `stats()` dict as `stemly_<component>_<stat>` gauges.
+    A nested dict under a stat ({"depth_by_collection": {"notes": 3}}) becomes
+    one sample per inner key, labelled `label`. With `by`, the top-level keys
+    are themselves label values ({"notes": {"parses": 3}} for by="label").
+    """
+    _collectors.append((component, get_stats, label, by))
+
+
+def _collect(component: str, stats: Dict[str, Any], label: str, by: Optional[str]) -> Dict[str, List[Tuple[str, float]]]:
+    samples: Dict[str, List[Tuple[str, float]]] = {}
+
+    def add(stat: str, labels: str, value: Any):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return
+        samples.setdefault(f"stemly_{component}_{stat}", []).append((labels, value))
+
+    for key, value in stats.items():
+        if by is not None and isinstance(value, dict):
+            labels = _labels((by,), (str(key),))
+            for stat, inner in value.items():
+                add(stat, labels, inner)
+        elif isinstance(value, dict):
+            for inner_key, inner in value.items():
+                add(key, _labels((label,), (str(inner_key),)), inner)
+        else:
+            add(key, "", value)
+    return samples
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    for component, get_stats, label, by in _collectors:
+        try:
+            stats = get_stats()
+        except Exception as exc:
+            print(f"⚠ Could not collect {component} stats: {exc}")
+            continue
+        for name, samples in _collect(component, stats, label, by).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{labels} {_number(value)}" for labels, value in samples)
+
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# Stage timings (observed in the modules that do the work)
+# ----------------------------
+http_requests = Counter(
+    "stemly_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_request_seconds = Histogram(
+    "stemly_http_request_duration_seconds",
+    "Time to the last byte of the response, streamed bodies included.",
+    ("method", "route"),
+)
+http_in_flight = Gauge("stemly_http_requests_in_flight", "Requests being handled.", ("method", "route"))
+file_save_seconds = Histogram("stemly_file_save_seconds", "Validating, hashing and storing an uploaded scan.")
+gemini_call_seconds = Histogram(
+    "stemly_gemini_call_seconds",
+    "One Gemini API call (per attempt; whole stream for streamed calls).",
+    ("model", "mode", "outcome"),
+)
+gemini_queue_seconds = Histogram(
+    "stemly_gemini_queue_seconds", "Wait for a gateway concurrency slot before a Gemini call.", ("model",)
+)
+json_parse_seconds = Histogram(
+    "stemly_json_parse_seconds", "Parsing (and repairing) model JSON output.", buckets=(
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    )
+)
+mongo_insert_seconds = Histogram("stemly_mongo_insert_seconds", "MongoDB inserts.", ("collection",))
+token_verify_seconds = Histogram(
+    "stemly_token_verify_seconds", "Firebase ID token verification.", ("result",), buckets=(
+        0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+    )
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts and in-flight
+    requests. Routes are labelled by their path template (/jobs/{job_id}), so
+    ids don't multiply the series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+        # Raw path -> template, for the paths clients hit over and over.
+        self._seen: Dict[str, str] = {}
+
+    def _route(self, scope) -> str:
+        app = scope.get("app")
+        if app is None:
+            return "unmatched"
+        if self._routes is None:
+            # Full templates (router prefixes included) as the OpenAPI schema
+            # lists them; static paths before parameterised ones.
+            paths = sorted(app.openapi().get("paths", {}), key=lambda path: path.count("{"))
+            self._routes = [(compile_path(path)[0], path) for path in paths]
+            self._mounts = [route.path for route in app.router.routes if isinstance(route, Mount)]
+
+        path = scope["path"]
+        template = self._seen.get(path)
+        if template is not None:
+            return template
+
+        template = next((template for regex, template in self._routes if regex.match(path)), None)
+        if template is None:
+            template = next((prefix for prefix in self._mounts if path.startswith(prefix + "/")), "unmatched")
+        if len(self._seen) >= ROUTE_CACHE_MAX:
+            self._seen.clear()
+        self._seen[path] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method=method, route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method=method, route=route)
+            http_request_seconds.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status["code"]))